@@ -1,32 +1,98 @@
+import io
+import json
+import logging
 import os
-from typing import List, Dict
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Tuple
 
 import streamlit as st
 import pandas as pd
-from dotenv import load_dotenv
-from supabase import create_client, Client
 import streamlit.components.v1 as components
 
+from content_pack import DEFAULT_PACK, ContentPack, list_packs, load_pack
+from db import (
+    DUPLICATE,
+    READ_CACHE,
+    SIMILAR,
+    SupabaseConfigError,
+    check_health,
+    find_similar_quiz_questions,
+    get_client,
+    insert_quiz_question_to_supabase,
+    load_latest_quiz_questions_from_supabase,
+    load_learning_note,
+    load_learning_notes_page,
+    load_quiz_question,
+    load_quiz_questions_from_supabase,
+)
+from metrics import ACTIVE_SESSIONS, RERUN_DURATION, RERUNS, register_cache, start_exporter
+from note_spool import FAILED, PENDING, get_note_spool
+from profiling import (
+    discard_trace,
+    finish_trace,
+    flame_html,
+    section,
+    span,
+    start_trace,
+    to_chrome_trace,
+)
+from quiz import QuizQuestion, QuizSession, validate_quiz_question
+from quiz_import import DEFAULT_BATCH_SIZE, ImportReport, detect_format, import_quiz_questions
+from term_filter import ALL_CATEGORIES, TermFilter
+from term_graph import TermGraph
+from term_list import BUTTON_LIST_MAX, build_list_items, list_key, virtual_term_list
+from term_store import TermStore
+
+# 各モジュールのログをコンソールに出す（LOG_LEVEL、既定は INFO）
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
 # ==============================
-# Supabase クライアント初期化
+# メトリクス（METRICS_PORT / METRICS_TEXTFILE のときに公開）
 # ==============================
-load_dotenv()
+@st.cache_resource
+def init_metrics() -> None:
+    """プロセスで1回だけ公開を開始する"""
+    start_exporter()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-print("DEBUG SUPABASE_URL:", SUPABASE_URL)
-print("DEBUG SUPABASE_KEY:", SUPABASE_KEY)
+init_metrics()
+# 接続中のセッション数は直近に再実行のあったセッションで数える
+if "metrics_session_key" not in st.session_state:
+    st.session_state.metrics_session_key = uuid.uuid4().hex
+ACTIVE_SESSIONS.touch(st.session_state.metrics_session_key)
+rerun_started = time.perf_counter()
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    st.error("SUPABASE_URL / SUPABASE_KEY が .env / Secrets に設定されていません。")
-    st.stop()
+# ==============================
+# 再実行のプロファイリング（PROFILE_RERUNS=1 か ?profile=1 のときだけ）
+# ==============================
+# 保持する直近の再実行トレースの数
+PROFILE_HISTORY = 20
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+profile_reruns = os.getenv("PROFILE_RERUNS") == "1" or st.query_params.get("profile") == "1"
+# 前回の実行が st.rerun() などで中断されていたら、そのトレースはここで捨てる
+discard_trace()
+if profile_reruns:
+    start_trace("再実行")
+
+# ==============================
+# Supabase クライアント（プロセス共有、初回のみ生成）
+# ==============================
+section("クライアント")
+try:
+    get_client()
+except SupabaseConfigError as e:
+    st.error(str(e))
+    st.stop()
 
 # ==============================
 # ページ設定
 # ==============================
+section("ページ設定")
 st.set_page_config(
     page_title="Git用語辞典",
     page_icon="📚",
@@ -37,6 +103,7 @@ st.set_page_config(
 # ==============================
 # カスタムCSS（全体用）
 # ==============================
+section("CSS")
 st.markdown(
     """
 <style>
@@ -216,357 +283,18 @@ st.markdown(
 )
 
 # ==============================
-# 用語データ
-# ==============================
-TERMS = [
-    {
-        "id": "repository",
-        "name": "リポジトリ (Repository)",
-        "category": "基本概念",
-        "short_description": "プロジェクトのファイルと履歴を保存する場所",
-        "full_description": "リポジトリは、Gitでプロジェクトを管理するための保管場所です。ファイルやディレクトリの状態を記録し、その変更履歴を保存します。ローカルリポジトリ（自分のPC上）とリモートリポジトリ（GitHubなどのサーバー上）の2種類があります。",
-        "examples": [
-            "git init でローカルリポジトリを作成",
-            "git clone でリモートリポジトリを複製",
-        ],
-        "related_terms": ["commit", "clone", "remote"],
-    },
-    {
-        "id": "commit",
-        "name": "コミット (Commit)",
-        "category": "基本操作",
-        "short_description": "変更を記録すること",
-        "full_description": "コミットは、ファイルの変更をリポジトリに記録する操作です。スナップショットのように、その時点のプロジェクトの状態を保存します。各コミットには一意のIDが付与され、いつでもその状態に戻ることができます。コミットメッセージを付けることで、何を変更したかを記録できます。",
-        "examples": [
-            "git add . で変更をステージング",
-            'git commit -m "メッセージ" でコミット',
-        ],
-        "related_terms": ["staging", "push", "log"],
-    },
-    {
-        "id": "branch",
-        "name": "ブランチ (Branch)",
-        "category": "基本概念",
-        "short_description": "作業を分岐させる機能",
-        "full_description": "ブランチは、開発作業を本流から分岐させる機能です。新機能の開発やバグ修正を、メインの開発ラインに影響を与えずに行えます。作業が完了したら、マージして本流に統合します。複数人での並行開発に不可欠な機能です。",
-        "examples": [
-            "git branch feature/new-feature で新しいブランチ作成",
-            "git checkout -b feature/new-feature でブランチ作成と切り替えを同時に実行",
-        ],
-        "related_terms": ["merge", "checkout", "main"],
-    },
-    {
-        "id": "merge",
-        "name": "マージ (Merge)",
-        "category": "基本操作",
-        "short_description": "ブランチを統合すること",
-        "full_description": "マージは、異なるブランチの変更を統合する操作です。feature ブランチでの開発が完了したら、main ブランチにマージして変更を反映させます。自動的に統合できない場合はコンフリクトが発生し、手動で解決する必要があります。",
-        "examples": [
-            "git merge feature/new-feature で現在のブランチにマージ",
-            "git merge --no-ff でマージコミットを必ず作成",
-        ],
-        "related_terms": ["branch", "conflict", "rebase"],
-    },
-    {
-        "id": "push",
-        "name": "プッシュ (Push)",
-        "category": "基本操作",
-        "short_description": "ローカルの変更をリモートに送信",
-        "full_description": "プッシュは、ローカルリポジトリのコミットをリモートリポジトリに送信する操作です。これにより、他の開発者と変更を共有できます。プッシュする前に、リモートの最新状態を取得（pull）することが推奨されます。",
-        "examples": [
-            "git push origin main でmainブランチをプッシュ",
-            "git push -u origin feature でブランチを初回プッシュ",
-        ],
-        "related_terms": ["pull", "remote", "commit"],
-    },
-    {
-        "id": "pull",
-        "name": "プル (Pull)",
-        "category": "基本操作",
-        "short_description": "リモートの変更をローカルに取り込む",
-        "full_description": "プルは、リモートリポジトリの変更をローカルリポジトリに取り込む操作です。fetch（取得）とmerge（統合）を同時に行います。チーム開発では、作業開始前に必ずpullして最新状態にすることが重要です。",
-        "examples": [
-            "git pull origin main でリモートの変更を取得",
-            "git pull --rebase でリベースしながら取得",
-        ],
-        "related_terms": ["push", "fetch", "merge"],
-    },
-    {
-        "id": "clone",
-        "name": "クローン (Clone)",
-        "category": "基本操作",
-        "short_description": "リモートリポジトリを複製",
-        "full_description": "クローンは、リモートリポジトリ全体をローカルにコピーする操作です。GitHubなどからプロジェクトをダウンロードして開発を始める際に使用します。履歴も含めて完全にコピーされます。",
-        "examples": [
-            "git clone https://github.com/user/repo.git",
-            "git clone git@github.com:user/repo.git でSSH経由でクローン",
-        ],
-        "related_terms": ["repository", "remote", "fetch"],
-    },
-    {
-        "id": "staging",
-        "name": "ステージング (Staging)",
-        "category": "基本概念",
-        "short_description": "コミット対象を準備するエリア",
-        "full_description": "ステージングエリア（インデックス）は、次のコミットに含める変更を準備する場所です。git addコマンドでファイルをステージングし、git commitで実際にコミットします。この仕組みにより、変更の一部だけをコミットすることができます。",
-        "examples": [
-            "git add file.txt で特定のファイルをステージング",
-            "git add . ですべての変更をステージング",
-            "git reset HEAD file.txt でステージングを取り消し",
-        ],
-        "related_terms": ["commit", "add", "status"],
-    },
-    {
-        "id": "conflict",
-        "name": "コンフリクト (Conflict)",
-        "category": "トラブルシューティング",
-        "short_description": "変更が競合している状態",
-        "full_description": "コンフリクトは、同じファイルの同じ箇所を異なる方法で変更した際に発生します。Gitが自動的にマージできない場合、手動で解決する必要があります。コンフリクトマーカー（<<<<<<<, =======, >>>>>>>）が挿入されるので、どちらの変更を採用するか決定します。",
-        "examples": [
-            "コンフリクトマーカーを確認",
-            "必要な変更を残して不要な部分を削除",
-            "git add で解決済みをマーク",
-            "git commit でマージを完了",
-        ],
-        "related_terms": ["merge", "rebase", "diff"],
-    },
-    {
-        "id": "remote",
-        "name": "リモート (Remote)",
-        "category": "基本概念",
-        "short_description": "リモートリポジトリへの参照",
-        "full_description": "リモートは、ネットワーク上のリポジトリへの参照です。通常「origin」という名前が付けられます。複数のリモートを設定することも可能で、チーム開発では必須の概念です。",
-        "examples": [
-            "git remote -v でリモート一覧を表示",
-            "git remote add origin <URL> でリモートを追加",
-            "git remote rename old new で名前変更",
-        ],
-        "related_terms": ["push", "pull", "clone"],
-    },
-    {
-        "id": "fetch",
-        "name": "フェッチ (Fetch)",
-        "category": "基本操作",
-        "short_description": "リモートの情報を取得（マージはしない）",
-        "full_description": "フェッチは、リモートリポジトリの最新情報を取得しますが、ローカルのブランチには自動的にマージしません。pullと異なり、安全に確認してからマージできます。",
-        "examples": [
-            "git fetch origin でリモートの情報を取得",
-            "git fetch --all ですべてのリモートから取得",
-        ],
-        "related_terms": ["pull", "remote", "merge"],
-    },
-    {
-        "id": "rebase",
-        "name": "リベース (Rebase)",
-        "category": "応用操作",
-        "short_description": "コミット履歴を整理",
-        "full_description": "リベースは、コミット履歴を別のベース上に付け替える操作です。mergeと異なり、履歴を一直線に保つことができます。ただし、既に共有されているコミットには使用すべきではありません。",
-        "examples": [
-            "git rebase main で現在のブランチをmainの最新に付け替え",
-            "git rebase -i HEAD~3 で対話的にコミットを整理",
-        ],
-        "related_terms": ["merge", "commit", "interactive"],
-    },
-    {
-        "id": "stash",
-        "name": "スタッシュ (Stash)",
-        "category": "応用操作",
-        "short_description": "作業中の変更を一時退避",
-        "full_description": "スタッシュは、コミットせずに作業中の変更を一時的に退避させる機能です。ブランチを切り替える必要があるが、まだコミットしたくない場合に便利です。",
-        "examples": [
-            "git stash で変更を退避",
-            "git stash pop で退避した変更を復元",
-            "git stash list で退避一覧を表示",
-        ],
-        "related_terms": ["commit", "checkout", "branch"],
-    },
-    {
-        "id": "tag",
-        "name": "タグ (Tag)",
-        "category": "応用操作",
-        "short_description": "特定のコミットに印をつける",
-        "full_description": "タグは、特定のコミットに名前をつけて記録する機能です。主にリリースバージョンを記録するために使用されます（v1.0.0など）。軽量タグと注釈付きタグの2種類があります。",
-        "examples": [
-            "git tag v1.0.0 で軽量タグを作成",
-            'git tag -a v1.0.0 -m "Release 1.0" で注釈付きタグ',
-            "git push origin v1.0.0 でタグをプッシュ",
-        ],
-        "related_terms": ["commit", "release", "version"],
-    },
-    {
-        "id": "checkout",
-        "name": "チェックアウト (Checkout)",
-        "category": "基本操作",
-        "short_description": "ブランチやコミットを切り替える",
-        "full_description": "チェックアウトは、作業するブランチを切り替えたり、過去のコミットの状態を確認したりする操作です。Git 2.23以降では、switch（ブランチ切り替え）とrestore（ファイル復元）に分割されました。",
-        "examples": [
-            "git checkout main でmainブランチに切り替え",
-            "git checkout -b new-branch で新ブランチ作成と切り替え",
-            "git checkout <commit-id> で特定のコミットを確認",
-        ],
-        "related_terms": ["branch", "switch", "restore"],
-    },
-]
-
-CATEGORIES = ["基本概念", "基本操作", "応用操作", "トラブルシューティング"]
-
-# ==============================
-# 学習ノート（Supabase learning_notes）
-# ==============================
-def save_learning_note_to_supabase(note_text: str) -> None:
-    """learning_notes テーブルにノートを1件追加"""
-    supabase.table("learning_notes").insert({"note_text": note_text}).execute()
-
-
-def load_learning_notes_from_supabase(limit: int = 50) -> List[Dict]:
-    """learning_notes テーブルからノート履歴を取得（新しい順）"""
-    res = (
-        supabase.table("learning_notes")
-        .select("*")
-        .order("id", desc=True)  # id 降順で新しい順
-        .limit(limit)
-        .execute()
-    )
-    return res.data or []
-
-# ==============================
-# クイズ問題（Supabase git_quiz_questions）
-# ==============================
-def load_quiz_questions_from_supabase(limit: int = 5) -> List[Dict]:
-    """git_quiz_questions からクイズ問題を取得"""
-    res = (
-        supabase.table("git_quiz_questions")
-        .select("*")
-        .limit(limit)
-        .execute()
-    )
-    return res.data or []
-
-
-def insert_quiz_question_to_supabase(
-    question_text: str,
-    choice_1: str,
-    choice_2: str,
-    choice_3: str,
-    choice_4: str,
-    correct_choice: int,
-    explanation: str,
-) -> None:
-    """git_quiz_questions にクイズ問題を追加"""
-    supabase.table("git_quiz_questions").insert(
-        {
-            "question_text": question_text,
-            "choice_1": choice_1,
-            "choice_2": choice_2,
-            "choice_3": choice_3,
-            "choice_4": choice_4,
-            "correct_choice": correct_choice,
-            "explanation": explanation,
-        }
-    ).execute()
-
+# 定数
 # ==============================
-# セッション状態
-# ==============================
-if "selected_term_id" not in st.session_state:
-    st.session_state.selected_term_id = "repository"
-
-if "search_query" not in st.session_state:
-    st.session_state.search_query = ""
-
-if "learning_note_input" not in st.session_state:
-    st.session_state.learning_note_input = ""
-
-# ==============================
-# タイトル & サマリ
-# ==============================
-st.title("📚 Git用語ミニ辞典")
-
-top_col1, top_col2 = st.columns([3, 1])
-
-with top_col1:
-    st.markdown(
-        "Git の基本用語を日本語でざっと確認できるミニ辞典です。"
-        "検索・カテゴリフィルタ・使用例・関連用語をひとつの画面で確認できます。"
-    )
-
-with top_col2:
-    total_terms = len(TERMS)
-    total_categories = len(set(t["category"] for t in TERMS))
-    st.metric("登録用語数", total_terms)
-    st.metric("カテゴリ数", total_categories)
-
-st.info("💡 左のサイドバーから表示モードやフィルタ条件を変更できます。")
-
-# ==============================
-# サイドバー
-# ==============================
-with st.sidebar:
-    st.subheader("⚙ 表示設定")
-
-    mode = st.radio(
-        "学習モード",
-        options=["辞書モード", "クイズに挑戦", "クイズ登録"],
-        index=0,
-    )
-
-    category_filter = st.selectbox(
-        "カテゴリフィルタ",
-        options=["すべて"] + CATEGORIES,
-        index=0,
-    )
+# ノート履歴の1ページあたりの件数
+NOTES_PAGE_SIZE = 20
 
-    include_advanced = st.checkbox("応用操作・トラブルシューティングも含める", value=True)
-
-    max_items = st.slider("最大表示件数", min_value=5, max_value=50, value=20, step=5)
+# 学習ルートのゴールとして選択肢に出す検索結果の件数
+LEARNING_PATH_CANDIDATES = 20
 
 # ==============================
-# 辞書モード
+# Gitとは？（ストーリー HTML）
 # ==============================
-if mode == "辞書モード":
-    # 検索バー
-    search_col1, search_col2 = st.columns([3, 1])
-
-    with search_col1:
-        search_query = st.text_input(
-            "🔍 用語を検索...",
-            value=st.session_state.search_query,
-            placeholder="用語名や一言説明で検索",
-        )
-        st.session_state.search_query = search_query
-
-    with search_col2:
-        st.caption("※ 大文字小文字は区別されません")
-
-    # フィルタリング
-    filtered_terms = TERMS
-
-    if category_filter != "すべて":
-        filtered_terms = [t for t in filtered_terms if t["category"] == category_filter]
-
-    if not include_advanced:
-        filtered_terms = [
-            t for t in filtered_terms
-            if t["category"] not in ("応用操作", "トラブルシューティング")
-        ]
-
-    if search_query:
-        q = search_query.lower()
-        filtered_terms = [
-            t for t in filtered_terms
-            if q in t["name"].lower() or q in t["short_description"].lower()
-        ]
-
-    filtered_terms = filtered_terms[:max_items]
-
-    # タブ（Gitとは？ を追加）
-    tab_git, tab_dict, tab_table, tab_memo = st.tabs(
-        ["📖 Gitとは？", "📋 辞書ビュー", "📊 一覧表", "📝 ノート"]
-    )
-
-    # --- Gitとは？ビュー ---
-    with tab_git:
-        story_html = """<!DOCTYPE html>
+STORY_HTML = """<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
@@ -973,13 +701,190 @@ git push origin feature/add-login-page
 </html>
         """
 
-        components.html(story_html, height=900, scrolling=True)
+# ==============================
+# 用語検索・一覧表（プロセス内キャッシュ）
+# ==============================
+@st.cache_resource
+def get_content_pack(pack_name: str) -> ContentPack:
+    """用語パック（選ばれたときに初めて読み込み、以降はプロセス内で共有）"""
+    return load_pack(pack_name)
+
+
+@st.cache_resource
+def get_term_store(pack_name: str) -> TermStore:
+    """id で引ける用語ストア（パックごとに1回だけ構築）"""
+    return TermStore(get_content_pack(pack_name).terms)
+
+
+@st.cache_resource
+def get_term_graph(pack_name: str) -> TermGraph:
+    """関連用語グラフ（存在しない用語への参照はパックの読み込み時にログへ出し、ここでは除く）"""
+    return TermGraph(get_term_store(pack_name))
+
+
+@st.cache_resource
+def get_term_filter(pack_name: str) -> TermFilter:
+    """用語フィルタ（検索インデックス・一覧表の DataFrame を含め、パックごとに1回だけ構築）"""
+    pack = get_content_pack(pack_name)
+    term_filter = TermFilter(get_term_store(pack_name), pack.categories, pack.advanced_categories)
+    register_cache("term_filter", lambda: term_filter.filter.cache_info()._asdict(), {"pack": pack_name})
+    return term_filter
+
+# ==============================
+# セッション状態
+# ==============================
+section("セッション状態・用語パック")
+if "selected_term_id" not in st.session_state:
+    st.session_state.selected_term_id = None
+
+# サイドバーの「用語パック」（ウィジェットより前のサマリでも使うので先に決める）
+if "content_pack" not in st.session_state:
+    st.session_state.content_pack = DEFAULT_PACK
+
+content_pack = get_content_pack(st.session_state.content_pack)
+term_store = get_term_store(content_pack.name)
+
+if "search_query" not in st.session_state:
+    st.session_state.search_query = ""
+
+if "learning_note_input" not in st.session_state:
+    st.session_state.learning_note_input = ""
+
+# 読み込み済みのノート履歴ページ（新しい順）
+if "note_pages" not in st.session_state:
+    st.session_state.note_pages = []
+
+# このセッションでスプールに保存したノートのローカル id と、未送信があったかどうか
+if "spooled_note_ids" not in st.session_state:
+    st.session_state.spooled_note_ids = []
+
+if "note_sync_pending" not in st.session_state:
+    st.session_state.note_sync_pending = False
+
+# ==============================
+# タイトル & サマリ
+# ==============================
+section("タイトル")
+st.title("📚 Git用語ミニ辞典")
+
+top_col1, top_col2 = st.columns([3, 1])
+
+with top_col1:
+    st.markdown(
+        "Git の基本用語を日本語でざっと確認できるミニ辞典です。"
+        "検索・カテゴリフィルタ・使用例・関連用語をひとつの画面で確認できます。"
+    )
+
+with top_col2:
+    total_terms = len(term_store)
+    total_categories = len(content_pack.categories)
+    st.metric("登録用語数", total_terms)
+    st.metric("カテゴリ数", total_categories)
+
+st.info("💡 左のサイドバーから表示モードやフィルタ条件を変更できます。")
+
+# ==============================
+# サイドバー
+# ==============================
+section("サイドバー")
+with st.sidebar:
+    st.subheader("⚙ 表示設定")
+
+    mode = st.radio(
+        "学習モード",
+        options=["辞書モード", "クイズに挑戦", "クイズ登録"],
+        index=0,
+    )
+
+    pack_names = list(list_packs())
+    if len(pack_names) > 1:
+        st.selectbox("用語パック", options=pack_names, key="content_pack")
+
+    category_filter = st.selectbox(
+        "カテゴリフィルタ",
+        options=[ALL_CATEGORIES] + content_pack.categories,
+        index=0,
+    )
+
+    include_advanced = st.checkbox(
+        f"{'・'.join(content_pack.advanced_categories) or '応用用語'}も含める",
+        value=True,
+        key="include_advanced",
+    )
+
+    # 辞書ビューは件数が多いとウィンドウ表示のリストになるので上限を大きくとる
+    max_items = st.select_slider(
+        "最大表示件数",
+        options=[5, 10, 20, 30, 50, 100, 500, 1000, 5000, 10000, 50000],
+        value=20,
+    )
+
+    with st.expander("🩺 接続状態"):
+        if st.button("Supabase 接続チェック"):
+            health = check_health()
+            if health["ok"]:
+                st.success(f"接続OK（{health['latency_ms']:.0f} ms）")
+            else:
+                st.error(f"接続エラー: {health['error']}")
+
+        cache_stats = READ_CACHE.stats()
+        st.caption(
+            f"読み取りキャッシュ: ヒット率 {cache_stats['hit_ratio']:.0%}"
+            f"（{cache_stats['hits']} / {cache_stats['hits'] + cache_stats['misses']}）"
+        )
+
+# ==============================
+# 辞書モード
+# ==============================
+section(mode)
+if mode == "辞書モード":
+    # 検索バー
+    search_col1, search_col2 = st.columns([3, 1])
+
+    with search_col1:
+        # 打つ手が止まってから 250ms 後に反映（途中の1文字ごとには再実行しない）
+        search_query = st.text_input(
+            "🔍 用語を検索...",
+            key="search_query",
+            placeholder="用語名・読み（ローマ字）・説明・使用例で検索",
+            live="250ms",
+        )
+
+    with search_col2:
+        st.caption("※ 全角半角・大文字小文字・カタカナとひらがなは区別されません")
+
+    # フィルタリング（検索時はインデックスのスコア順、同じ条件の結果はキャッシュ）
+    with span("フィルタ"):
+        term_filter = get_term_filter(content_pack.name)
+        filtered_positions = term_filter.filter(
+            category_filter, include_advanced, search_query, max_items
+        )
+        filtered_terms = term_filter.terms_at(filtered_positions)
+
+    # タブ（Gitとは？ を追加）
+    # on_change="rerun" で選択中のタブだけ中身（通信・表の構築・iframe）を実行する
+    tab_git, tab_dict, tab_table, tab_memo = st.tabs(
+        ["📖 Gitとは？", "📋 辞書ビュー", "📊 一覧表", "📝 ノート"],
+        key="dictionary_tab",
+        on_change="rerun",
+    )
+
+    # --- Gitとは？ビュー ---
+    with tab_git:
+        if tab_git.open:
+            with span("Gitとは？"):
+                components.html(STORY_HTML, height=900, scrolling=True)
 
 
 
 
     # --- 辞書ビュー ---
-    with tab_dict:
+    def select_term(term_id: str) -> None:
+        st.session_state.selected_term_id = term_id
+
+    # 用語ボタンのクリックでは一覧と詳細だけを再実行する（ページ全体・通信は走らない）
+    @st.fragment
+    def render_dictionary_view(filtered_terms: List[Dict], filter_conditions: Tuple) -> None:
         # 左右 1:2 の2カラム
         col_left, col_right = st.columns([1, 2])
 
@@ -994,46 +899,57 @@ git push origin feature/add-login-page
                 horizontal=True,
             )
 
-            st.markdown('<div class="term-button-container">', unsafe_allow_html=True)
-
-            if list_mode == "名前順":
-                terms_for_view = sorted(filtered_terms, key=lambda t: t["name"])
-                for term in terms_for_view:
-                    if st.button(
-                        f"{term['name']}：{term['short_description']}",
-                        key=f"term_{term['id']}",
-                        use_container_width=True,
-                    ):
-                        st.session_state.selected_term_id = term["id"]
+            if len(filtered_terms) > BUTTON_LIST_MAX:
+                # 件数が多いときは見えている行だけを描画するリスト（ウィジェット1つ）
+                items, headers = build_list_items(
+                    filtered_terms, list_mode, content_pack.categories
+                )
+                clicked_id = virtual_term_list(
+                    items,
+                    headers,
+                    st.session_state.selected_term_id,
+                    key=list_key(content_pack.name, filter_conditions, list_mode),
+                )
+                if clicked_id:
+                    st.session_state.selected_term_id = clicked_id
             else:
-                for category in CATEGORIES:
-                    cat_terms = [
-                        t for t in filtered_terms if t["category"] == category
-                    ]
-                    if not cat_terms:
-                        continue
+                st.markdown('<div class="term-button-container">', unsafe_allow_html=True)
 
-                    st.markdown(
-                        f"<div class='category-header'>{category}</div>",
-                        unsafe_allow_html=True,
-                    )
-                    for term in cat_terms:
+                if list_mode == "名前順":
+                    terms_for_view = sorted(filtered_terms, key=lambda t: t["name"])
+                    for term in terms_for_view:
                         if st.button(
                             f"{term['name']}：{term['short_description']}",
                             key=f"term_{term['id']}",
                             use_container_width=True,
                         ):
                             st.session_state.selected_term_id = term["id"]
-                            break
-
-            st.markdown("</div>", unsafe_allow_html=True)
+                else:
+                    for category in content_pack.categories:
+                        cat_terms = [
+                            t for t in filtered_terms if t["category"] == category
+                        ]
+                        if not cat_terms:
+                            continue
+
+                        st.markdown(
+                            f"<div class='category-header'>{category}</div>",
+                            unsafe_allow_html=True,
+                        )
+                        for term in cat_terms:
+                            if st.button(
+                                f"{term['name']}：{term['short_description']}",
+                                key=f"term_{term['id']}",
+                                use_container_width=True,
+                            ):
+                                st.session_state.selected_term_id = term["id"]
+                                break
+
+                st.markdown("</div>", unsafe_allow_html=True)
 
         # 右カラム：用語詳細
         with col_right:
-            selected_term = next(
-                (t for t in TERMS if t["id"] == st.session_state.selected_term_id),
-                TERMS[0],
-            )
+            selected_term = term_store.get(st.session_state.selected_term_id) or term_store[0]
 
             st.subheader("📖 用語詳細")
             st.markdown(
@@ -1056,23 +972,134 @@ git push origin feature/add-login-page
                 unsafe_allow_html=True,
             )
 
+            # 関連用語（クリックでその用語の詳細へ移動）
+            term_graph = get_term_graph(content_pack.name)
+            related = term_graph.related(selected_term.id)
+            referenced_by = term_graph.referenced_by(selected_term.id)
+            if related or referenced_by:
+                st.markdown("#### 関連用語")
+            for key_prefix, label, terms in (
+                ("related", "関連", related),
+                ("referenced_by", "この用語を挙げている用語", referenced_by),
+            ):
+                if not terms:
+                    continue
+                st.caption(label)
+                cols = st.columns(min(len(terms), 4))
+                for i, term in enumerate(terms):
+                    cols[i % len(cols)].button(
+                        term.name,
+                        key=f"{key_prefix}_{term.id}",
+                        on_click=select_term,
+                        args=(term.id,),
+                        use_container_width=True,
+                    )
+
+            with st.expander("🧭 学習ルート"):
+                # ゴールの候補は検索で絞る（全用語を選択肢にすると再実行ごとに用語数ぶん重くなる）
+                goal_query = st.text_input(
+                    "ゴールの用語を検索",
+                    key="learning_path_query",
+                    placeholder="例: rebase / りべーす",
+                )
+                if goal_query.strip():
+                    goal_positions = get_term_filter(content_pack.name).filter(
+                        ALL_CATEGORIES, True, goal_query, LEARNING_PATH_CANDIDATES
+                    )
+                    goal_ids = [term_store[pos].id for pos in goal_positions]
+                else:
+                    goal_ids = [t.id for t in related]
+                # 選択中のゴールは検索語を変えても残す
+                current_target = st.session_state.get("learning_path_target")
+                if current_target in term_store and current_target not in goal_ids:
+                    goal_ids.insert(0, current_target)
+
+                if not goal_ids:
+                    st.caption("ゴールにしたい用語を検索してください。")
+                else:
+                    target_id = st.selectbox(
+                        "ゴールの用語",
+                        options=goal_ids,
+                        format_func=lambda term_id: term_store.get(term_id).name,
+                        key="learning_path_target",
+                    )
+                    path = term_graph.learning_path(selected_term.id, target_id)
+                    if path is None:
+                        st.info("関連用語をたどって到達できません。")
+                    elif len(path) > 1:
+                        st.markdown(" → ".join(t.name for t in path))
+                        next_term = path[1]
+                        st.button(
+                            f"次へ：{next_term.name}",
+                            key="learning_path_next",
+                            on_click=select_term,
+                            args=(next_term.id,),
+                        )
+
+    with tab_dict:
+        if tab_dict.open:
+            with span("辞書ビュー"):
+                render_dictionary_view(
+                    filtered_terms, (category_filter, include_advanced, search_query, max_items)
+                )
+
     # --- 一覧表 ---
     with tab_table:
-        st.subheader("📊 用語一覧（表形式）")
-        table_data = [
-            {
-                "ID": t["id"],
-                "用語": t["name"],
-                "カテゴリ": t["category"],
-                "一言説明": t["short_description"],
-            }
-            for t in filtered_terms
-        ]
-        df = pd.DataFrame(table_data)
-        st.dataframe(df, use_container_width=True)
+        if tab_table.open:
+            with span("一覧表"):
+                st.subheader("📊 用語一覧（表形式）")
+                df = term_filter.table(filtered_positions)
+                st.dataframe(df, use_container_width=True)
 
     # --- 学習ノート ---
-    with tab_memo:
+    # 入力・保存・履歴表示はこの部分だけで再実行する
+    def load_more_notes(before_id: int) -> None:
+        """「さらに読み込む」: 最後に表示したノートより古いページを追加"""
+        st.session_state.note_pages.append(
+            load_learning_notes_page(before_id, NOTES_PAGE_SIZE)
+        )
+
+    def spooled_note_statuses() -> Dict[int, Dict]:
+        return get_note_spool().statuses(st.session_state.spooled_note_ids)
+
+    # このセッションで保存したノートの送信状態。未送信がある間だけ数秒ごとに更新する
+    # （run_every はスクリプト全体の再実行でしか反映されないので、保存後は全体を再実行する）
+    @st.fragment(
+        run_every="3s"
+        if any(v["status"] == PENDING for v in spooled_note_statuses().values())
+        else None
+    )
+    def render_note_sync_status() -> None:
+        statuses = spooled_note_statuses()
+        if not statuses:
+            return
+
+        failed = [local_id for local_id, v in statuses.items() if v["status"] == FAILED]
+        if failed:
+            last_error = statuses[failed[-1]]["last_error"]
+            st.error(f"❌ 送信できなかったノート {len(failed)} 件（{last_error}）")
+            if st.button("🔁 もう一度送信する", key="retry_failed_notes"):
+                get_note_spool().retry_failed(failed)
+                st.rerun(scope="app")
+
+        pending = [v for v in statuses.values() if v["status"] == PENDING]
+        if pending:
+            retrying = sum(1 for v in pending if v["attempts"])
+            st.caption(
+                f"⏳ 送信待ち {len(pending)} 件"
+                + (f"（再試行中 {retrying} 件）" if retrying else "")
+            )
+        elif st.session_state.note_sync_pending:
+            # 送信が終わったら履歴を読み直して全体を再描画する
+            st.session_state.note_sync_pending = False
+            st.session_state.note_pages = []
+            st.rerun()
+        elif not failed:
+            st.caption(f"✅ このセッションで保存した {len(statuses)} 件はすべて同期済みです。")
+        st.session_state.note_sync_pending = bool(pending)
+
+    @st.fragment
+    def render_learning_notes() -> None:
         st.subheader("📝 学習ノート（Supabase 保存）")
 
         st.markdown(
@@ -1090,18 +1117,30 @@ Git やこの辞典を使って気づいたこと・疑問点・
         )
 
         # 黒＋ピンクボタン（デフォルトスタイル）
+        # 保存はローカルのスプールに書くだけで、Supabase への送信はバックグラウンドで行う
         if st.button("✏️ ノートを保存"):
             if new_note.strip():
-                save_learning_note_to_supabase(new_note.strip())
-                st.success("Supabase の learning_notes テーブルに保存しました。")
+                local_id = get_note_spool().enqueue(new_note.strip())
+                st.session_state.spooled_note_ids.append(local_id)
                 st.session_state.learning_note_input = ""
+                st.session_state.note_saved = True
+                # 送信状態の自動更新（run_every）を始めるため全体を再実行する
+                st.rerun(scope="app")
             else:
                 st.warning("テキストを入力してください。")
+        if st.session_state.pop("note_saved", False):
+            st.success("ノートを保存しました。Supabase へはバックグラウンドで送信します。")
+
+        render_note_sync_status()
 
         st.markdown("---")
-        st.markdown("#### 📚 ノート履歴（新しい順 最大50件）")
+        st.markdown("#### 📚 ノート履歴（新しい順）")
+
+        # 読み込み済みのページはセッションに保持し、続きは id < 最後に見た id だけ取得する
+        if not st.session_state.note_pages:
+            st.session_state.note_pages = [load_learning_notes_page(None, NOTES_PAGE_SIZE)]
 
-        notes = load_learning_notes_from_supabase(limit=50)
+        notes = [row for page in st.session_state.note_pages for row in page]
         if not notes:
             st.info("まだ learning_notes にノートがありません。最初の1件を書いてみましょう。")
         else:
@@ -1111,75 +1150,108 @@ Git やこの辞典を使って気づいたこと・疑問点・
                     date_str = str(created_at).replace("T", " ").split(".")[0][:16]
                 else:
                     date_str = f"ID: {row.get('id', '?')}"
-                st.markdown(f"**{date_str}**  \n{row.get('note_text', '')}")
+                preview = row.get("note_preview") or ""
+                st.markdown(f"**{date_str}**  \n{preview}")
+                # 長いノートは展開したときだけ全文を取得する
+                if (row.get("note_length") or 0) > len(preview):
+                    full_note = st.expander(
+                        "全文を表示", key=f"note_full_{row['id']}", on_change="rerun"
+                    )
+                    if full_note.open:
+                        note = load_learning_note(row["id"])
+                        full_note.markdown(note["note_text"] if note else "（削除されました）")
                 st.markdown("---")
 
+            if len(st.session_state.note_pages[-1]) == NOTES_PAGE_SIZE:
+                st.button(
+                    "⬇ さらに読み込む",
+                    on_click=load_more_notes,
+                    args=(notes[-1]["id"],),
+                )
+            else:
+                st.caption(f"全 {len(notes)} 件を表示しています。")
+
+    with tab_memo:
+        if tab_memo.open:
+            with span("ノート"):
+                render_learning_notes()
+
 # ==============================
 # クイズに挑戦モード
 # ==============================
 elif mode == "クイズに挑戦":
     st.title("🧩 Git クイズに挑戦")
 
-    questions = load_quiz_questions_from_supabase(limit=5)
+    if "quiz_seen_ids" not in st.session_state:
+        st.session_state.quiz_seen_ids = set()
+
+    quiz_col1, quiz_col2 = st.columns([1, 3])
+    with quiz_col2:
+        exclude_seen = st.checkbox("出題済みの問題を除く", value=True)
+        st.caption("※ 出題カテゴリはサイドバーのカテゴリフィルタに従います")
+
+    # 問題セットはセッションに固定し、「新しいクイズ」を押したときだけ取得し直す
+    with quiz_col1:
+        new_quiz = st.button("🔄 新しいクイズ")
+    if new_quiz or "quiz_session" not in st.session_state:
+        st.session_state.quiz_session = QuizSession.start(
+            lambda: load_quiz_questions_from_supabase(
+                limit=5,
+                category=None if category_filter == ALL_CATEGORIES else category_filter,
+                exclude_ids=st.session_state.quiz_seen_ids if exclude_seen else (),
+            )
+        )
+        st.session_state.quiz_seen_ids.update(
+            q.id for q in st.session_state.quiz_session.questions
+        )
 
-    if not questions:
+    quiz_session: QuizSession = st.session_state.quiz_session
+    questions = quiz_session.questions
+
+    if not questions and exclude_seen and st.session_state.quiz_seen_ids:
+        st.info("未出題の問題がなくなりました。")
+        if st.button("出題履歴をリセット"):
+            st.session_state.quiz_seen_ids = set()
+            del st.session_state.quiz_session
+            st.rerun()
+    elif not questions:
         st.warning("Supabase の git_quiz_questions に問題が登録されていません。")
     else:
         st.markdown("Supabase に登録された問題から、ランダムに最大5問を出題します。")
 
-        if "quiz_answers" not in st.session_state:
-            st.session_state.quiz_answers = {}
-
-        for idx, q in enumerate(questions):
-            st.markdown(f"### Q{idx + 1}. {q['question_text']}")
-            options = [
-                q["choice_1"],
-                q["choice_2"],
-                q["choice_3"],
-                q["choice_4"],
-            ]
-            user_answer = st.radio(
+        # 回答の選択ではその問題だけを再実行する
+        @st.fragment
+        def render_quiz_question(idx: int, q: QuizQuestion) -> None:
+            st.markdown(f"### Q{idx + 1}. {q.question_text}")
+            st.radio(
                 "選択肢を選んでください",
-                options,
-                key=f"quiz_q_{q['id']}",
+                q.choices,
+                key=quiz_session.answer_key(q),
             )
-            st.session_state.quiz_answers[q["id"]] = user_answer
             st.write("---")
 
+        for idx, q in enumerate(questions):
+            render_quiz_question(idx, q)
+
         # 黒＋ピンクボタン（デフォルトスタイル）
         if st.button("採点する"):
-            score = 0
-            results = []
-
-            for q in questions:
-                correct_index = (q.get("correct_choice") or 1) - 1
-                correct_index = max(0, min(correct_index, 3))
-                correct_text = [
-                    q["choice_1"],
-                    q["choice_2"],
-                    q["choice_3"],
-                    q["choice_4"],
-                ][correct_index]
-
-                user_answer = st.session_state.quiz_answers.get(q["id"])
-                is_correct = (user_answer == correct_text)
-                if is_correct:
-                    score += 1
-
-                results.append((q, is_correct, correct_text, user_answer))
-
-            st.subheader(f"結果: {score} / {len(questions)} 問 正解")
-
-            for idx, (q, is_correct, correct_text, user_answer) in enumerate(results):
-                st.markdown(f"#### Q{idx + 1}. {q['question_text']}")
-                if is_correct:
-                    st.success(f"✔ 正解！ あなたの回答: {user_answer}")
+            results = quiz_session.grade(
+                {quiz_session.answer_key(q): st.session_state.get(quiz_session.answer_key(q))
+                 for q in questions}
+            )
+
+            st.subheader(f"結果: {QuizSession.score(results)} / {len(questions)} 問 正解")
+
+            for idx, r in enumerate(results):
+                st.markdown(f"#### Q{idx + 1}. {r.question.question_text}")
+                if r.is_correct:
+                    st.success(f"✔ 正解！ あなたの回答: {r.user_answer}")
                 else:
                     st.error(
-                        f"✖ 不正解… あなたの回答: {user_answer} ／ 正解: {correct_text}"
+                        f"✖ 不正解… あなたの回答: {r.user_answer} ／ 正解: {r.question.correct_text}"
                     )
-                if q.get("explanation"):
-                    st.info(f"解説: {q['explanation']}")
+                if r.question.explanation:
+                    st.info(f"解説: {r.question.explanation}")
                 st.write("---")
 
 # ==============================
@@ -1212,42 +1284,193 @@ git_quiz_questions テーブルにクイズ問題を登録します。
             index=0,
         )
 
+        quiz_category = st.selectbox("カテゴリ", options=content_pack.categories, index=0)
+
         explanation = st.text_area("解説（任意）", height=120)
 
+        allow_similar = st.checkbox("似ている問題が登録済みでも登録する")
+
         # 黒＋ピンクボタン（デフォルトスタイル）
         submitted = st.form_submit_button("この内容でクイズを登録")
 
     if submitted:
-        if not question_text.strip():
-            st.warning("問題文を入力してください。")
-        elif not (choice_1.strip() and choice_2.strip() and choice_3.strip() and choice_4.strip()):
-            st.warning("4つすべての選択肢を入力してください。")
+        cleaned, error = validate_quiz_question(
+            {
+                "question_text": question_text,
+                "choice_1": choice_1,
+                "choice_2": choice_2,
+                "choice_3": choice_3,
+                "choice_4": choice_4,
+                "correct_choice": correct_choice,
+                "explanation": explanation,
+                "category": quiz_category,
+            }
+        )
+        if error:
+            st.warning(error)
         else:
-            insert_quiz_question_to_supabase(
-                question_text=question_text.strip(),
-                choice_1=choice_1.strip(),
-                choice_2=choice_2.strip(),
-                choice_3=choice_3.strip(),
-                choice_4=choice_4.strip(),
-                correct_choice=int(correct_choice),
-                explanation=explanation.strip(),
-            )
-            st.success("git_quiz_questions テーブルにクイズ問題を登録しました。")
+            result = insert_quiz_question_to_supabase(**cleaned, allow_similar=allow_similar)
+            if result.status == DUPLICATE:
+                st.info("同じ内容の問題がすでに登録されているため、登録しませんでした。")
+            elif result.status == SIMILAR:
+                st.warning(
+                    "似ている問題が登録済みのため、登録しませんでした。"
+                    "内容を確認して、それでも登録する場合は"
+                    "「似ている問題が登録済みでも登録する」にチェックしてください。"
+                )
+                for question_id, score in result.similar[:3]:
+                    similar_question = load_quiz_question(question_id)
+                    if similar_question:
+                        st.markdown(
+                            f"- 類似度 {score:.0%}: {similar_question['question_text']}"
+                        )
+            else:
+                st.success("git_quiz_questions テーブルにクイズ問題を登録しました。")
+
+    # --- 一括登録 ---
+    with st.expander("📥 CSV / JSONL から一括登録"):
+        st.markdown(
+            """
+列（キー）は `question_text`, `choice_1`〜`choice_4`, `correct_choice`（1〜4）,
+`explanation`（任意）, `category`（任意）です。  
+フォームと同じチェックに通った行だけを、指定件数ずつまとめて登録します。
+"""
+        )
+        upload = st.file_uploader("問題ファイル", type=["csv", "jsonl", "ndjson"])
+        batch_size = st.number_input(
+            "1回の送信件数", min_value=1, max_value=5000, value=DEFAULT_BATCH_SIZE, step=100
+        )
+        import_allow_similar = st.checkbox(
+            "似ている問題が登録済みでも登録する", key="import_allow_similar"
+        )
+
+        if upload is not None:
+            # 同じファイルで途中失敗していれば、続きの行から再開する
+            upload_key = (upload.name, upload.size)
+            checkpoints = st.session_state.setdefault("quiz_import_checkpoints", {})
+            start_after_row = checkpoints.get(upload_key, 0)
+            if start_after_row:
+                st.info(f"前回は {start_after_row} 行目まで登録済みです。続きから再開します。")
+
+            if st.button("一括登録を開始"):
+                progress = st.progress(0.0, text="登録中…")
+
+                def show_progress(report: ImportReport) -> None:
+                    progress.progress(
+                        min(1.0, upload.tell() / max(1, upload.size)),
+                        text=f"{report.last_committed_row} 行目まで完了"
+                        f"（{report.rows_per_sec:.0f} 行/秒）",
+                    )
+
+                report = import_quiz_questions(
+                    io.TextIOWrapper(upload, encoding="utf-8-sig", newline=""),
+                    detect_format(upload.name),
+                    batch_size=int(batch_size),
+                    start_after_row=start_after_row,
+                    on_progress=show_progress,
+                    similar_check=None if import_allow_similar else find_similar_quiz_questions,
+                )
+                progress.progress(1.0, text="完了")
+
+                if report.aborted:
+                    checkpoints[upload_key] = report.last_committed_row
+                    st.error(
+                        f"送信に失敗したため {report.last_committed_row} 行目で中断しました: "
+                        f"{report.aborted}（もう一度押すと続きから再開します）"
+                    )
+                else:
+                    checkpoints.pop(upload_key, None)
+                st.success(
+                    f"{report.inserted} 件を登録しました"
+                    f"（重複 {report.duplicates} 件 / {report.rows_read} 行 / {report.elapsed:.1f} 秒 / "
+                    f"{report.rows_per_sec:.0f} 行/秒）"
+                )
+                if report.errors:
+                    st.warning(f"{len(report.errors)} 行は登録できませんでした。")
+                    st.dataframe(
+                        pd.DataFrame(report.errors, columns=["行", "エラー"]),
+                        hide_index=True,
+                    )
 
     st.markdown("---")
     st.markdown("#### 最近登録された問題（確認用）")
 
-    latest_questions = load_quiz_questions_from_supabase(limit=5)
+    latest_questions = load_latest_quiz_questions_from_supabase(limit=5)
     if not latest_questions:
         st.info("まだクイズ問題が登録されていません。")
     else:
         for q in latest_questions:
-            st.markdown(f"- **{q['question_text']}**")
-
-
-
-
-
-
+            # 一覧は問題文の先頭だけ。選択肢・正解は展開したときに取得する
+            detail = st.expander(
+                f"**{q['question_preview']}**", key=f"quiz_detail_{q['id']}", on_change="rerun"
+            )
+            if detail.open:
+                full_question = load_quiz_question(q["id"])
+                if not full_question:
+                    detail.caption("（削除されました）")
+                else:
+                    detail.markdown(full_question["question_text"])
+                    for no in range(1, 5):
+                        mark = "✅" if full_question.get("correct_choice") == no else "・"
+                        detail.markdown(f"{mark} {no}. {full_question[f'choice_{no}']}")
+                    if full_question.get("explanation"):
+                        detail.info(f"解説: {full_question['explanation']}")
 
+# ==============================
+# 再実行の回数・時間（フラグメントだけの再実行と、途中で中断された実行は含まない）
+# ==============================
+RERUNS.labels(mode).inc()
+RERUN_DURATION.labels(mode).observe(time.perf_counter() - rerun_started)
 
+# ==============================
+# 再実行プロファイル（サイドバー）
+# ==============================
+# フラグメントだけの再実行はスクリプトの先頭を通らないので記録しない
+if profile_reruns:
+    trace = finish_trace()
+    if "profile_traces" not in st.session_state:
+        st.session_state.profile_traces = deque(maxlen=PROFILE_HISTORY)
+        st.session_state.profile_rerun_count = 0
+    if trace is not None:
+        st.session_state.profile_rerun_count += 1
+        trace.label = f"#{st.session_state.profile_rerun_count} {mode}"
+        st.session_state.profile_traces.append(trace)
+
+    traces = list(st.session_state.profile_traces)
+    with st.sidebar.expander("🐢 プロファイル", expanded=True):
+        if not traces:
+            st.caption("まだ記録された再実行がありません。")
+        else:
+            shown = st.selectbox(
+                "再実行",
+                options=range(len(traces) - 1, -1, -1),
+                format_func=lambda i: f"{traces[i].label} {traces[i].duration_ms:.0f} ms",
+            )
+            st.markdown(flame_html(traces[shown]), unsafe_allow_html=True)
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "区間": "　" * s.depth + s.name,
+                            "開始 (ms)": round(s.start_ms, 1),
+                            "時間 (ms)": round(s.duration_ms, 1),
+                        }
+                        for s in traces[shown].spans
+                    ]
+                ),
+                hide_index=True,
+                use_container_width=True,
+            )
+            st.download_button(
+                "JSON で保存",
+                data=json.dumps([t.to_dict() for t in traces], ensure_ascii=False, indent=2),
+                file_name="rerun_traces.json",
+                mime="application/json",
+            )
+            st.download_button(
+                "Chrome トレースで保存",
+                data=json.dumps(to_chrome_trace(traces)),
+                file_name="rerun_traces.chrome.json",
+                mime="application/json",
+                help="chrome://tracing や Perfetto で開けます",
+            )
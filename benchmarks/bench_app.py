@@ -0,0 +1,374 @@
+"""
+app.py 全体のベンチマーク（AppTest でヘッドレスに操作したときの再実行時間とメモリ確保量）
+
+ローカルバックエンド（DATA_BACKEND=sqlite）と合成の用語パックで、用語数と
+テーブル（学習ノート・クイズ問題）の行数を変えながら主な操作を計測する。
+
+    python -m benchmarks.bench_app                                   既定の組み合わせを計測
+    python -m benchmarks.bench_app --terms 16,1000 --rows 0 --check  デプロイ前のチェック
+    python -m benchmarks.bench_app --baseline old.json               前回の結果と比較
+
+1つの組み合わせごとに子プロセスを起こす（モジュールの設定値・st.cache_resource を
+持ち越さないため）。時間とメモリ確保量は別の子プロセスで測る（tracemalloc の
+オーバーヘッドを時間に含めないため）。結果は --output の JSON に書き出し、
+--check のときは benchmarks/bench_app_thresholds.json の上限を超えたら終了コード 1 にする。
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic import make_quiz_questions, make_terms
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_app_thresholds.json")
+
+PACK_NAME = "bench"
+CATEGORIES = ["基本概念", "基本操作", "応用操作", "トラブルシューティング"]
+SEARCH_WORD = "term12"
+
+TAB_GIT = "📖 Gitとは？"
+TAB_DICT = "📋 辞書ビュー"
+TAB_TABLE = "📊 一覧表"
+TAB_NOTES = "📝 ノート"
+
+
+# ==============================
+# 計測の準備（子プロセス）
+# ==============================
+def write_pack(pack_dir: str, n_terms: int) -> None:
+    terms = make_terms(n_terms)
+    pack = {
+        "name": PACK_NAME,
+        "title": f"ベンチマーク用（{n_terms} 語）",
+        "version": 1,
+        "categories": CATEGORIES,
+        "advanced_categories": CATEGORIES[2:],
+        "terms": terms,
+    }
+    with open(os.path.join(pack_dir, f"{PACK_NAME}.json"), "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False)
+
+
+def seed_tables(db_path: str, n_rows: int) -> None:
+    """learning_notes と git_quiz_questions に n_rows 行ずつ入れる"""
+    from local_backend import LocalBackend
+
+    LocalBackend(db_path)  # スキーマを作る
+    quiz_rows = make_quiz_questions(n_rows)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "insert into learning_notes (id, note_text) values (?, ?)",
+            ((i + 1, f"ベンチマーク用のノート {i}。" * (1 + i % 20)) for i in range(n_rows)),
+        )
+        if quiz_rows:
+            columns = list(quiz_rows[0])
+            conn.executemany(
+                f"insert into git_quiz_questions ({', '.join(columns)}) "
+                f"values ({', '.join('?' * len(columns))})",
+                ([row[c] for c in columns] for row in quiz_rows),
+            )
+    conn.close()
+
+
+def _prepare_env(workdir: str, n_terms: int, n_rows: int) -> None:
+    pack_dir = os.path.join(workdir, "packs")
+    os.makedirs(pack_dir)
+    db_path = os.path.join(workdir, "backend.sqlite3")
+    # app.py / db.py などが import 時に読む設定（モジュールを読み込む前に入れる）
+    os.environ.update(
+        {
+            "DATA_BACKEND": "sqlite",
+            "LOCAL_DB_PATH": db_path,
+            "CONTENT_PACK_DIR": pack_dir,
+            "CONTENT_PACK_CACHE_DIR": os.path.join(workdir, "pack_cache"),
+            "NOTE_SPOOL_PATH": os.path.join(workdir, "spool.sqlite3"),
+            "NEAR_DUP_INDEX_PATH": os.path.join(workdir, "near_dup.sqlite3"),
+        }
+    )
+    write_pack(pack_dir, n_terms)
+    seed_tables(db_path, n_rows)
+
+
+# ==============================
+# 操作のシナリオ（子プロセス）
+# ==============================
+class Recorder:
+    """1回の再実行ごとに時間（とメモリ確保量）を記録する"""
+
+    def __init__(self, trace_alloc: bool):
+        self.trace_alloc = trace_alloc
+        self.samples: Dict[str, List[float]] = {}
+
+    def run(self, interaction: str, at, prepare: Callable[[], None] = lambda: None) -> None:
+        prepare()
+        if self.trace_alloc:
+            tracemalloc.start()
+            at.run(timeout=600)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            value = peak / 1024 / 1024
+        else:
+            start = time.perf_counter()
+            at.run(timeout=600)
+            value = (time.perf_counter() - start) * 1000
+        if at.exception:
+            raise RuntimeError(f"{interaction}: {at.exception[0].message}")
+        self.samples.setdefault(interaction, []).append(value)
+
+
+def _set_tab(at, tab: str) -> None:
+    # AppTest はタブを操作できないので、タブの key に直接入れる
+    at.session_state["dictionary_tab"] = tab
+
+
+# 再実行のたびに要素は作り直されるので、操作の直前に毎回探す
+def _by_label(elements, label: str):
+    return next(e for e in elements if e.label == label)
+
+
+def _term_buttons(at) -> List:
+    return [b for b in at.button if (b.key or "").startswith("term_")]
+
+
+def _quiz_radios(at) -> List:
+    return [r for r in at.radio if r.label == "選択肢を選んでください"]
+
+
+def run_scenario(recorder: Recorder, repeat: int) -> None:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.session_state["content_pack"] = PACK_NAME
+
+    def dictionary(action: Callable[[], object] = lambda: None) -> Callable[[], None]:
+        return lambda: (_set_tab(at, TAB_DICT), action())
+
+    # 初回表示（用語パックの読み込み・インデックス構築を含む）
+    recorder.run("first_load", at, dictionary())
+
+    for _ in range(repeat):
+        # 検索語を1文字ずつ打つ（live 入力の反映ごとに1回の再実行）
+        for query in [SEARCH_WORD[:end] for end in range(1, len(SEARCH_WORD) + 1)] + [""]:
+            recorder.run(
+                "search", at, dictionary(lambda: at.text_input(key="search_query").set_value(query))
+            )
+
+        # カテゴリフィルタを切り替える
+        for option in CATEGORIES + ["すべて"]:
+            recorder.run(
+                "category_filter",
+                at,
+                dictionary(lambda: _by_label(at.sidebar.selectbox, "カテゴリフィルタ").set_value(option)),
+            )
+
+        # 用語ボタンをクリックする
+        for i in range(min(3, len(_term_buttons(at)))):
+            recorder.run("click_term", at, dictionary(lambda: _term_buttons(at)[i].click()))
+
+        # タブを切り替える
+        for tab in (TAB_TABLE, TAB_NOTES, TAB_GIT, TAB_DICT):
+            recorder.run("switch_tab", at, lambda: _set_tab(at, tab))
+
+        # ノートを保存する
+        recorder.run("open_notes", at, lambda: _set_tab(at, TAB_NOTES))
+        recorder.run(
+            "save_note",
+            at,
+            lambda: (
+                _set_tab(at, TAB_NOTES),
+                _by_label(at.text_area, "新しい学習メモを入力").set_value("ベンチマークのノート"),
+                _by_label(at.button, "✏️ ノートを保存").click(),
+            ),
+        )
+
+        # クイズに切り替えて、全問に答えて採点する
+        recorder.run(
+            "open_quiz", at, lambda: _by_label(at.sidebar.radio, "学習モード").set_value("クイズに挑戦")
+        )
+        for i in range(len(_quiz_radios(at))):
+            recorder.run(
+                "answer_quiz", at, lambda: _quiz_radios(at)[i].set_value(_quiz_radios(at)[i].options[0])
+            )
+        if any(b.label == "採点する" for b in at.button):
+            recorder.run("grade_quiz", at, lambda: _by_label(at.button, "採点する").click())
+        recorder.run("new_quiz", at, lambda: _by_label(at.button, "🔄 新しいクイズ").click())
+
+        recorder.run(
+            "back_to_dictionary",
+            at,
+            dictionary(lambda: _by_label(at.sidebar.radio, "学習モード").set_value("辞書モード")),
+        )
+
+
+def child_main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory(prefix="bench_app_") as workdir:
+        _prepare_env(workdir, args.child_terms, args.child_rows)
+        recorder = Recorder(trace_alloc=args.child_alloc)
+        run_scenario(recorder, args.repeat)
+    with open(args.child_output, "w", encoding="utf-8") as f:
+        json.dump(recorder.samples, f)
+
+
+# ==============================
+# 集計・しきい値チェック（親プロセス）
+# ==============================
+def _run_child(n_terms: int, n_rows: int, repeat: int, alloc: bool) -> Dict[str, List[float]]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    try:
+        command = [
+            sys.executable, "-m", "benchmarks.bench_app",
+            "--child-terms", str(n_terms),
+            "--child-rows", str(n_rows),
+            "--child-output", output,
+            "--repeat", str(repeat),
+        ]
+        if alloc:
+            command.append("--child-alloc")
+        # Streamlit の警告で出力が埋もれるので、子プロセスの出力は失敗したときだけ出す
+        proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr[-4000:])
+            raise RuntimeError(f"terms={n_terms} rows={n_rows} の計測に失敗しました")
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "median": round(statistics.median(ordered), 2),
+        # 最近傍順位法（サンプルが少なくても中央値より小さくならない）
+        "p95": round(ordered[max(math.ceil(len(ordered) * 0.95) - 1, 0)], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def measure(n_terms: int, n_rows: int, repeat: int) -> List[Dict]:
+    times = _run_child(n_terms, n_rows, repeat, alloc=False)
+    allocs = _run_child(n_terms, n_rows, repeat, alloc=True)
+    return [
+        {
+            "terms": n_terms,
+            "rows": n_rows,
+            "interaction": interaction,
+            "time_ms": _summary(samples),
+            "alloc_peak_mb": _summary(allocs.get(interaction, [0.0])),
+        }
+        for interaction, samples in times.items()
+    ]
+
+
+def _budget(budgets: Dict[str, Dict[str, float]], result: Dict) -> Optional[float]:
+    """しきい値は操作ごとに用語数別（なければ "*"）"""
+    per_size = budgets.get(result["interaction"], {})
+    return per_size.get(str(result["terms"]), per_size.get("*"))
+
+
+def check_thresholds(results: List[Dict], thresholds: Dict) -> List[str]:
+    failures = []
+    for result in results:
+        label = f"{result['interaction']} (terms={result['terms']}, rows={result['rows']})"
+        limit = _budget(thresholds.get("time_ms_p95", {}), result)
+        if limit is not None and result["time_ms"]["p95"] > limit:
+            failures.append(f"{label}: p95 {result['time_ms']['p95']:.0f} ms > {limit:.0f} ms")
+        limit = _budget(thresholds.get("alloc_peak_mb_max", {}), result)
+        if limit is not None and result["alloc_peak_mb"]["max"] > limit:
+            failures.append(f"{label}: 確保量 {result['alloc_peak_mb']['max']:.1f} MB > {limit:.1f} MB")
+    return failures
+
+
+def compare_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """前回の結果より中央値が tolerance 倍を超えて遅くなった操作"""
+    previous = {(r["terms"], r["rows"], r["interaction"]): r for r in baseline}
+    failures = []
+    for result in results:
+        old = previous.get((result["terms"], result["rows"], result["interaction"]))
+        if old is None:
+            continue
+        before, after = old["time_ms"]["median"], result["time_ms"]["median"]
+        # 数 ms の揺れで落ちないように、差が 5ms 未満なら見ない
+        if after > before * tolerance and after - before >= 5:
+            failures.append(
+                f"{result['interaction']} (terms={result['terms']}, rows={result['rows']}): "
+                f"median {before:.1f} → {after:.1f} ms"
+            )
+    return failures
+
+
+def _sizes(text: str) -> List[int]:
+    return [int(s) for s in text.split(",") if s.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", default="16,1000,10000,100000", help="用語数（カンマ区切り）")
+    parser.add_argument("--rows", default="0,10000", help="ノート・クイズ問題の行数（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=2, help="操作シナリオの繰り返し回数")
+    parser.add_argument("--output", default="bench_app_results.json")
+    parser.add_argument("--check", action="store_true", help="しきい値を超えたら終了コード 1")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--baseline", help="比較する前回の結果 JSON")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="前回比で許す倍率")
+    # 子プロセス用
+    parser.add_argument("--child-terms", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    parser.add_argument("--child-alloc", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_output:
+        child_main(args)
+        return
+
+    results: List[Dict] = []
+    for n_terms in _sizes(args.terms):
+        for n_rows in _sizes(args.rows):
+            start = time.perf_counter()
+            config_results = measure(n_terms, n_rows, args.repeat)
+            results.extend(config_results)
+            print(f"terms={n_terms} rows={n_rows}（{time.perf_counter() - start:.1f}s）")
+            for r in config_results:
+                print(
+                    f"  {r['interaction']:>20}: median {r['time_ms']['median']:8.1f} ms  "
+                    f"p95 {r['time_ms']['p95']:8.1f} ms  確保 {r['alloc_peak_mb']['max']:7.1f} MB"
+                )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"python": sys.version.split()[0], "created_at": time.time(), "results": results},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"結果: {args.output}")
+
+    failures: List[str] = []
+    if args.check:
+        with open(args.thresholds, encoding="utf-8") as f:
+            failures.extend(check_thresholds(results, json.load(f)))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures.extend(compare_baseline(results, json.load(f)["results"], args.tolerance))
+    for failure in failures:
+        print(f"NG {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
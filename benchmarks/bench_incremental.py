@@ -0,0 +1,52 @@
+"""
+インクリメンタル検索のベンチマーク（1文字ずつ打ったときの1打鍵あたりの時間）
+
+    python -m benchmarks.bench_incremental --terms 50000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import make_terms
+from term_filter import ALL_CATEGORIES, TermFilter
+from term_store import TermStore
+
+CATEGORIES = ["基本概念", "基本操作", "応用操作", "トラブルシューティング"]
+WORDS = ["アイウエ", "あいうえ", "aiue", "term4242", "ｔｅｒｍ１２", "変更する", "kakikuke", "存在しない語"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--max-items", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    term_filter = TermFilter(TermStore(make_terms(args.terms)), CATEGORIES, CATEGORIES[2:])
+    print(f"build: {args.terms} terms in {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for word in WORDS:
+        per_word = []
+        for end in range(1, len(word) + 1):
+            start = time.perf_counter()
+            positions = term_filter.filter(ALL_CATEGORIES, True, word[:end], args.max_items)
+            per_word.append((time.perf_counter() - start) * 1000)
+        timings.extend(per_word)
+        print(
+            f"{word!r:>14}: {len(positions):>3} hits  "
+            + " ".join(f"{t:6.2f}" for t in per_word)
+            + " ms"
+        )
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"1打鍵: median {statistics.median(timings):.2f} ms  p95 {p95:.2f} ms  "
+        f"max {timings[-1]:.2f} ms（目標 {args.budget_ms:.0f} ms）"
+    )
+
+
+if __name__ == "__main__":
+    main()
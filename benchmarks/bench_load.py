@@ -0,0 +1,468 @@
+"""
+同時アクセスの負荷試験（Streamlit の WebSocket セッションを N 本開いて学習者の操作を再生する）
+
+ローカルバックエンド（DATA_BACKEND=sqlite）で app.py の Streamlit サーバを起動し、
+ブラウザと同じプロトコル（/_stcore/stream の BackMsg / ForwardMsg）で操作する。
+
+    pip install -r benchmarks/requirements.txt   # websockets が追加で必要
+    python -m benchmarks.bench_load --sessions 200 --duration 60
+    python -m benchmarks.bench_load --sessions 50 --terms 10000 --latency-ms 10-80
+
+各セッションは次のシナリオを重み付きでランダムに繰り返す（操作の間に考える時間を入れる）。
+    browse  辞書ビューで用語を数件クリックし、一覧表タブを開く
+    search  検索語を1文字ずつ入力して、最初の結果をクリックする
+    quiz    クイズに挑戦モードで5問に答えて採点する
+    note    ノートタブで学習ノートを保存する
+
+再実行の時間は rerun_script を送ってから script_finished を受け取るまで。
+サーバの CPU・RSS は /proc から、バックエンドへのリクエスト数は
+ローカルバックエンドの集計（LOCAL_BACKEND_STATS_PATH）から出す。
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from benchmarks.bench_app import seed_tables, write_pack
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+SCENARIO_WEIGHTS = {"browse": 4, "search": 3, "quiz": 2, "note": 1}
+SEARCH_WORDS = ["commit", "ブランチ", "rebase", "まーじ", "push", "term12"]
+
+TAB_DICT = "📋 辞書ビュー"
+TAB_TABLE = "📊 一覧表"
+TAB_NOTES = "📝 ノート"
+
+_DONE = {
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+}
+
+
+# ==============================
+# 1セッション（ブラウザの代わり）
+# ==============================
+@dataclass
+class Widget:
+    kind: str
+    label: str
+    id: str
+    fragment_id: str = ""
+    options: Tuple[str, ...] = ()
+
+
+@dataclass
+class Rerun:
+    action: str
+    ms: float
+    ok: bool
+
+
+class Session:
+    """WebSocket 1本ぶんの Streamlit セッション"""
+
+    def __init__(self, url: str, rng: random.Random, think: Tuple[float, float]):
+        self.url = url
+        self.rng = rng
+        self.think_range = think
+        self.widgets: List[Widget] = []
+        self.tabs_id: Optional[str] = None
+        self.page_script_hash = ""
+        self.reruns: List[Rerun] = []
+        # ブラウザと同じく、一度設定した値は以降の再実行でも送り続ける
+        self._values: Dict[str, WidgetState] = {}
+        self._ws = None
+
+    async def __aenter__(self) -> "Session":
+        self._ws = await websockets.connect(
+            self.url, subprotocols=["streamlit"], max_size=None, open_timeout=60
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._ws.close()
+
+    async def think(self) -> None:
+        await asyncio.sleep(self.rng.uniform(*self.think_range))
+
+    # --- 画面の要素 ---
+    def find(self, kind: str, label: str) -> Optional[Widget]:
+        return next((w for w in self.widgets if w.kind == kind and w.label == label), None)
+
+    def term_buttons(self) -> List[Widget]:
+        return [w for w in self.widgets if w.kind == "button" and "-term_" in w.id]
+
+    def _collect(self, msg: ForwardMsg, fragment_id: str) -> None:
+        delta = msg.delta
+        kind = delta.WhichOneof("type")
+        if kind == "add_block" and delta.add_block.WhichOneof("type") == "tab_container":
+            if delta.add_block.tab_container.id:
+                self.tabs_id = delta.add_block.tab_container.id
+        if kind != "new_element":
+            return
+        element_type = delta.new_element.WhichOneof("type")
+        proto = getattr(delta.new_element, element_type)
+        fields = proto.DESCRIPTOR.fields_by_name
+        if "id" in fields and "label" in fields and proto.id:
+            options = tuple(proto.options) if "options" in fields else ()
+            self.widgets.append(Widget(element_type, proto.label, proto.id, fragment_id, options))
+
+    # --- 再実行 ---
+    async def rerun(
+        self, action: str, state: Optional[WidgetState] = None, fragment_id: str = ""
+    ) -> bool:
+        """state を反映して再実行し、終わるまで待つ（ボタンなどの trigger は1回だけ送る）"""
+        back = BackMsg()
+        client_state = back.rerun_script
+        client_state.page_script_hash = self.page_script_hash
+        if fragment_id:
+            client_state.fragment_id = fragment_id
+        if state is not None and not state.trigger_value:
+            self._values[state.id] = state
+        for value in self._values.values():
+            client_state.widget_states.widgets.append(value)
+        if state is not None and state.trigger_value:
+            client_state.widget_states.widgets.append(state)
+
+        if fragment_id:
+            self.widgets = [w for w in self.widgets if w.fragment_id != fragment_id]
+        else:
+            self.widgets = []
+        ok = True
+        start = time.perf_counter()
+        await self._ws.send(back.SerializeToString())
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self._ws.recv())
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = msg.new_session.page_script_hash
+            elif kind == "delta":
+                self._collect(msg, msg.delta.fragment_id)
+                if msg.delta.new_element.WhichOneof("type") == "exception":
+                    ok = False
+            elif kind == "script_finished" and msg.script_finished in _DONE:
+                ok = ok and msg.script_finished != ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+                break
+        self.reruns.append(Rerun(action, (time.perf_counter() - start) * 1000, ok))
+        return ok
+
+    async def set_string(self, action: str, widget: Optional[Widget], value: str) -> None:
+        if widget is not None:
+            await self.rerun(action, WidgetState(id=widget.id, string_value=value), widget.fragment_id)
+
+    async def click(self, action: str, widget: Optional[Widget]) -> None:
+        if widget is not None:
+            await self.rerun(action, WidgetState(id=widget.id, trigger_value=True), widget.fragment_id)
+
+    async def open_tab(self, action: str, label: str) -> None:
+        if self.tabs_id is not None:
+            await self.rerun(action, WidgetState(id=self.tabs_id, string_value=label))
+
+    def forget(self, widget: Optional[Widget]) -> None:
+        if widget is not None:
+            self._values.pop(widget.id, None)
+
+    # --- シナリオ ---
+    async def dictionary_mode(self) -> None:
+        mode = self.find("radio", "学習モード")
+        if mode is not None and self._values.get(mode.id, WidgetState()).string_value not in ("", "辞書モード"):
+            await self.set_string("mode", mode, "辞書モード")
+
+    async def browse(self) -> None:
+        await self.dictionary_mode()
+        await self.open_tab("tab", TAB_DICT)
+        for _ in range(self.rng.randint(1, 3)):
+            await self.think()
+            buttons = self.term_buttons()
+            if buttons:
+                await self.click("click_term", self.rng.choice(buttons))
+        await self.think()
+        await self.open_tab("tab", TAB_TABLE)
+
+    async def search(self) -> None:
+        await self.dictionary_mode()
+        await self.open_tab("tab", TAB_DICT)
+        word = self.rng.choice(SEARCH_WORDS)
+        # live 入力は 250ms 止まると反映されるので、数文字ずつまとめて送られる
+        end = 0
+        while end < len(word):
+            end = min(len(word), end + self.rng.randint(1, 3))
+            await self.think()
+            await self.set_string("search", self.find("text_input", "🔍 用語を検索..."), word[:end])
+        buttons = self.term_buttons()
+        if buttons:
+            await self.think()
+            await self.click("click_term", buttons[0])
+        await self.set_string("search", self.find("text_input", "🔍 用語を検索..."), "")
+
+    async def quiz(self) -> None:
+        await self.set_string("mode", self.find("radio", "学習モード"), "クイズに挑戦")
+        new_quiz = self.find("button", "🔄 新しいクイズ")
+        await self.click("new_quiz", new_quiz)
+        answers = [w for w in self.widgets if w.kind == "radio" and w.label == "選択肢を選んでください"]
+        for radio in answers:
+            await self.think()
+            await self.set_string("answer_quiz", radio, self.rng.choice(radio.options))
+        await self.think()
+        await self.click("grade_quiz", self.find("button", "採点する"))
+        for radio in answers:
+            self.forget(radio)
+
+    async def note(self) -> None:
+        await self.dictionary_mode()
+        await self.open_tab("tab", TAB_NOTES)
+        await self.think()
+        text_area = self.find("text_area", "新しい学習メモを入力")
+        await self.set_string("type_note", text_area, f"負荷試験のノート {self.rng.random():.6f}")
+        await self.click("save_note", self.find("button", "✏️ ノートを保存"))
+        self.forget(text_area)
+
+
+async def run_learner(url: str, seed: int, deadline: float, think: Tuple[float, float]) -> List[Rerun]:
+    rng = random.Random(seed)
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    session = Session(url, rng, think)
+    try:
+        async with session:
+            await session.rerun("first_load")
+            while time.monotonic() < deadline:
+                await getattr(session, rng.choices(scenarios, weights)[0])()
+                await session.think()
+    except (OSError, websockets.WebSocketException) as e:
+        session.reruns.append(Rerun(f"connection_error: {type(e).__name__}", 0.0, False))
+    return session.reruns
+
+
+# ==============================
+# サーバの起動と計測
+# ==============================
+class ProcessSampler(threading.Thread):
+    """サーバプロセスの CPU 使用率と RSS を /proc から定期的に読む"""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.cpu_percent: List[float] = []
+        self.rss_mb: List[float] = []
+        self._stopped = threading.Event()
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def _cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            # comm に空白が入ることがあるので ")" の後ろから数える（utime, stime）
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def _rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def run(self) -> None:
+        last_cpu, last_time = self._cpu_seconds(), time.monotonic()
+        while not self._stopped.wait(self.interval):
+            try:
+                cpu, now = self._cpu_seconds(), time.monotonic()
+                self.cpu_percent.append((cpu - last_cpu) / (now - last_time) * 100)
+                self.rss_mb.append(self._rss_mb())
+            except FileNotFoundError:
+                return
+            last_cpu, last_time = cpu, now
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def start_server(workdir: str, args: argparse.Namespace) -> subprocess.Popen:
+    # ポートが使われていると、別のサーバのヘルスチェックに応答されてしまう
+    with socket.socket() as probe:
+        if probe.connect_ex(("127.0.0.1", args.port)) == 0:
+            raise RuntimeError(f"ポート {args.port} は使用中です（--port で変更できます）")
+
+    env = dict(
+        os.environ,
+        DATA_BACKEND="sqlite",
+        LOCAL_DB_PATH=os.path.join(workdir, "backend.sqlite3"),
+        LOCAL_BACKEND_STATS_PATH=os.path.join(workdir, "backend_stats.json"),
+        LOCAL_BACKEND_LATENCY_MS=args.latency_ms,
+        NOTE_SPOOL_PATH=os.path.join(workdir, "spool.sqlite3"),
+        NEAR_DUP_INDEX_PATH=os.path.join(workdir, "near_dup.sqlite3"),
+        CONTENT_PACK_CACHE_DIR=os.path.join(workdir, "pack_cache"),
+    )
+    if args.terms:
+        pack_dir = os.path.join(workdir, "packs")
+        os.makedirs(pack_dir)
+        write_pack(pack_dir, args.terms)
+        env["CONTENT_PACK_DIR"] = pack_dir
+    seed_tables(env["LOCAL_DB_PATH"], args.rows)
+
+    command = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.headless", "true",
+        "--server.port", str(args.port),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    server = subprocess.Popen(
+        command,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=open(os.path.join(workdir, "server.log"), "w"),
+    )
+    health = f"http://127.0.0.1:{args.port}/_stcore/health"
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError(f"Streamlit サーバが起動できませんでした（{workdir}/server.log）")
+        try:
+            with urllib.request.urlopen(health, timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Streamlit サーバの起動がタイムアウトしました")
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return round(ordered[max(math.ceil(len(ordered) * q) - 1, 0)], 1)
+
+    return {"n": len(ordered), "p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 1)}
+
+
+async def run_load(url: str, args: argparse.Namespace) -> List[Rerun]:
+    deadline = time.monotonic() + args.ramp + args.duration
+    tasks = []
+    for i in range(args.sessions):
+        tasks.append(
+            asyncio.create_task(run_learner(url, args.seed + i, deadline, (args.think_min, args.think_max)))
+        )
+        # ramp 秒かけて全セッションを開く
+        await asyncio.sleep(args.ramp / max(args.sessions, 1))
+    results = await asyncio.gather(*tasks)
+    return [r for reruns in results for r in reruns]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="同時セッション数")
+    parser.add_argument("--duration", type=float, default=60, help="全セッションがそろってからの計測秒数")
+    parser.add_argument("--ramp", type=float, default=10, help="セッションを開き終えるまでの秒数")
+    parser.add_argument("--think-min", type=float, default=0.5)
+    parser.add_argument("--think-max", type=float, default=2.0)
+    parser.add_argument("--terms", type=int, default=0, help="合成の用語パックの用語数（0 なら同梱のパック）")
+    parser.add_argument("--rows", type=int, default=1000, help="ノート・クイズ問題の行数")
+    parser.add_argument("--latency-ms", default="0", help="バックエンドの遅延（例: 20, 10-80）")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果の JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_load_") as workdir:
+        server = start_server(workdir, args)
+        sampler = ProcessSampler(server.pid)
+        sampler.start()
+        client_start = resource.getrusage(resource.RUSAGE_SELF)
+        try:
+            start = time.perf_counter()
+            reruns = asyncio.run(run_load(f"ws://127.0.0.1:{args.port}/_stcore/stream", args))
+            elapsed = time.perf_counter() - start
+        finally:
+            try:
+                sampler.stop()
+            finally:
+                # 終了時にローカルバックエンドが集計を書き出す
+                server.terminate()
+                server.wait(timeout=30)
+        client_end = resource.getrusage(resource.RUSAGE_SELF)
+        stats_path = os.path.join(workdir, "backend_stats.json")
+        backend = {}
+        if os.path.exists(stats_path):
+            with open(stats_path, encoding="utf-8") as f:
+                backend = json.load(f)
+
+    ok = [r for r in reruns if r.ok]
+    by_action: Dict[str, List[float]] = {}
+    for r in ok:
+        by_action.setdefault(r.action, []).append(r.ms)
+    report = {
+        "sessions": args.sessions,
+        "duration_s": round(elapsed, 1),
+        "reruns": len(reruns),
+        "errors": len(reruns) - len(ok),
+        "reruns_per_s": round(len(reruns) / elapsed, 1),
+        "latency_ms": _percentiles([r.ms for r in ok]),
+        "latency_ms_by_action": {a: _percentiles(v) for a, v in sorted(by_action.items())},
+        "server": {
+            "cpu_percent_mean": round(statistics.mean(sampler.cpu_percent), 1) if sampler.cpu_percent else None,
+            "cpu_percent_max": round(max(sampler.cpu_percent), 1) if sampler.cpu_percent else None,
+            "rss_mb_max": round(max(sampler.rss_mb), 1) if sampler.rss_mb else None,
+            "rss_mb_last": round(sampler.rss_mb[-1], 1) if sampler.rss_mb else None,
+        },
+        # 負荷をかける側が詰まっていないかの確認用
+        "client_cpu_s": round(
+            (client_end.ru_utime + client_end.ru_stime) - (client_start.ru_utime + client_start.ru_stime), 1
+        ),
+        "backend": {
+            **backend,
+            "requests_per_rerun": round(backend.get("requests", 0) / max(len(reruns), 1), 2),
+        },
+    }
+
+    print(
+        f"{args.sessions} セッション / {report['duration_s']}s: 再実行 {report['reruns']} 回"
+        f"（{report['reruns_per_s']}/s、エラー {report['errors']}）"
+    )
+    latency = report["latency_ms"]
+    if latency["n"]:
+        print(f"  再実行: p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms")
+    for action, p in report["latency_ms_by_action"].items():
+        print(f"  {action:>12}: n={p['n']:>5}  p50 {p['p50']:>8} ms  p95 {p['p95']:>8} ms  p99 {p['p99']:>8} ms")
+    server_stats = report["server"]
+    print(
+        f"  サーバ: CPU 平均 {server_stats['cpu_percent_mean']}% 最大 {server_stats['cpu_percent_max']}%  "
+        f"RSS 最大 {server_stats['rss_mb_max']} MB"
+    )
+    print(
+        f"  バックエンド: {backend.get('requests', '?')} リクエスト"
+        f"（1再実行あたり {report['backend']['requests_per_rerun']}） {backend.get('by_table', {})}"
+    )
+    print(f"  負荷側の CPU 時間: {report['client_cpu_s']}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
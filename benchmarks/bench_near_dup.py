@@ -0,0 +1,51 @@
+"""
+類似重複インデックスのベンチマーク
+
+    python -m benchmarks.bench_near_dup --questions 100000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import make_quiz_questions
+from near_dup import NearDuplicateIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_quiz_questions(args.questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "near_dup.sqlite3")
+
+        start = time.perf_counter()
+        index = NearDuplicateIndex(path)
+        index.add_many(rows)
+        print(f"build: {len(index)} questions in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index = NearDuplicateIndex(path)
+        print(f"reload: {len(index)} questions in {time.perf_counter() - start:.2f}s")
+
+        # 言い換え（語尾の変更）を問い合わせる
+        timings = []
+        found = 0
+        for row in rows[:: max(1, len(rows) // args.queries)]:
+            paraphrased = dict(row, question_text=row["question_text"].replace("どれ？", "どれですか？"))
+            start = time.perf_counter()
+            similar = index.find_similar(paraphrased)
+            timings.append((time.perf_counter() - start) * 1000)
+            found += any(qid == row["id"] for qid, _ in similar)
+        print(
+            f"query: recall {found}/{len(timings)}  "
+            f"median {statistics.median(timings):.3f} ms  max {max(timings):.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
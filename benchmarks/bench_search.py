@@ -0,0 +1,46 @@
+"""
+検索インデックスのベンチマーク
+
+    python -m benchmarks.bench_search --terms 100000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import make_terms
+from search_index import NgramIndex
+
+QUERIES = [
+    "コミット", "変更", "履歴する", "term123", "git", "解決する、共有", "ア", "存在しない語",
+    # かな・全角・ローマ字・打ち間違い
+    "こみっと", "ｔｅｒｍ１２３", "term1234x", "koxtuki", "存在しないご",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50, help="取得件数（0 で全件）")
+    args = parser.parse_args()
+
+    terms = make_terms(args.terms)
+
+    start = time.perf_counter()
+    index = NgramIndex(terms)
+    print(f"build: {len(terms)} terms in {time.perf_counter() - start:.2f}s")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            hits = index.search_scored(query, limit=args.limit or None)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{query!r:>20}: {len(hits):>7} hits  "
+            f"median {statistics.median(timings):7.3f} ms  max {max(timings):7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
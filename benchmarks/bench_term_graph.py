@@ -0,0 +1,55 @@
+"""
+関連用語グラフのベンチマーク
+
+    python -m benchmarks.bench_term_graph --terms 50000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.synthetic import make_terms
+from term_graph import TermGraph
+from term_store import TermStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    store = TermStore(make_terms(args.terms))
+
+    start = time.perf_counter()
+    graph = TermGraph(store)
+    print(f"build: {len(store)} terms in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(0)
+    pairs = [
+        (f"term{rng.randrange(args.terms)}", f"term{rng.randrange(args.terms)}")
+        for _ in range(args.queries)
+    ]
+
+    timings = []
+    lengths = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = graph.learning_path(source, target)
+        timings.append((time.perf_counter() - start) * 1000)
+        if path:
+            lengths.append(len(path))
+    print(
+        f"learning_path: median {statistics.median(timings):.3f} ms  max {max(timings):.3f} ms  "
+        f"平均ルート長 {statistics.mean(lengths):.1f}（{len(lengths)}/{len(pairs)} 件到達）"
+    )
+
+    start = time.perf_counter()
+    for source, _ in pairs:
+        graph.related(source)
+        graph.referenced_by(source)
+    print(f"related + referenced_by: {(time.perf_counter() - start) * 1e6 / len(pairs):.2f} us / 用語")
+
+
+if __name__ == "__main__":
+    main()
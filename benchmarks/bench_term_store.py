@@ -0,0 +1,75 @@
+"""
+用語ストアのベンチマーク（dict のリストとのメモリ量・id 検索時間の比較）
+
+    python -m benchmarks.bench_term_store --terms 1000000
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_terms
+from term_store import TermStore
+
+
+def _traced_mb() -> float:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 1024 / 1024
+
+
+def _timings_us(fn, keys):
+    timings = []
+    for key in keys:
+        start = time.perf_counter()
+        fn(key)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(timings), max(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--linear-lookups", type=int, default=20, help="線形探索は遅いので回数を絞る")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    terms = make_terms(args.terms)
+    dict_mb = _traced_mb()
+    print(f"dict list : {dict_mb:8.1f} MB  (生成 {time.perf_counter() - start:.1f}s)")
+
+    tracemalloc.stop()
+    start = time.perf_counter()
+    store = TermStore(terms)
+    print(f"TermStore 構築 {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(0)
+    keys = [f"term{rng.randrange(args.terms)}" for _ in range(args.lookups)]
+
+    median, worst = _timings_us(
+        lambda key: next(t for t in terms if t["id"] == key), keys[:args.linear_lookups]
+    )
+    print(f"線形探索       : median {median:10.1f} us  max {worst:10.1f} us")
+
+    median, worst = _timings_us(store.get, keys)
+    print(f"store.get      : median {median:10.3f} us  max {worst:10.3f} us")
+
+    median, worst = _timings_us(lambda key: store.get(key).full_description, keys)
+    print(f"+ 詳細説明展開 : median {median:10.3f} us  max {worst:10.3f} us")
+
+    # 元の dict を捨ててストアだけ残したときの常駐量
+    del terms, store
+    tracemalloc.start()
+    terms = make_terms(args.terms)
+    store = TermStore(terms)
+    del terms
+    store_mb = _traced_mb()
+    tracemalloc.stop()
+    print(f"TermStore : {store_mb:8.1f} MB  ({store_mb / dict_mb:.0%} / 圧縮ブロック {len(store._blocks)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+ベンチマーク用の合成用語データ生成
+"""
+import random
+from typing import Dict, List
+
+_KATAKANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+_WORDS = [
+    "変更", "履歴", "記録", "保存", "取得", "統合", "分岐", "作業", "確認", "削除",
+    "追加", "参照", "競合", "解決", "共有", "送信", "複製", "退避", "復元", "整理",
+]
+_CATEGORIES = ["基本概念", "基本操作", "応用操作", "トラブルシューティング"]
+
+
+def _katakana_word(rng: random.Random) -> str:
+    return "".join(rng.choice(_KATAKANA) for _ in range(rng.randint(3, 6)))
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return "、".join(rng.choice(_WORDS) + "する" for _ in range(n_words)) + "。"
+
+
+def make_terms(n: int, seed: int = 0) -> List[Dict]:
+    """n 件の合成用語（TERMS と同じスキーマ）を生成する"""
+    rng = random.Random(seed)
+    terms = []
+    for i in range(n):
+        word = _katakana_word(rng)
+        term_id = f"term{i}"
+        terms.append(
+            {
+                "id": term_id,
+                "name": f"{word} (Term{i})",
+                "category": _CATEGORIES[i % len(_CATEGORIES)],
+                "short_description": _sentence(rng, 2),
+                "full_description": _sentence(rng, 8),
+                "examples": [f"git {word.lower()} {i}", _sentence(rng, 2)],
+                "related_terms": [f"term{rng.randrange(n)}" for _ in range(3)],
+            }
+        )
+    return terms
+
+
+def make_quiz_questions(n: int, seed: int = 0) -> List[Dict]:
+    """n 件の合成クイズ問題（git_quiz_questions と同じ列、id は 1 始まり）"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        word = _katakana_word(rng)
+        rows.append(
+            {
+                "id": i + 1,
+                "question_text": f"{word}を{rng.choice(_WORDS)}するときのコマンドはどれ？（{i}）",
+                "choice_1": f"git {word.lower()} --{rng.choice(_WORDS)}",
+                "choice_2": f"git {rng.choice(_WORDS)}",
+                "choice_3": f"git {rng.choice(_WORDS)} {i % 97}",
+                "choice_4": f"git {rng.choice(_WORDS)} -{i % 13}",
+                "correct_choice": rng.randint(1, 4),
+                "explanation": _sentence(rng, 3),
+                "category": _CATEGORIES[i % len(_CATEGORIES)],
+            }
+        )
+    return rows
@@ -0,0 +1,180 @@
+"""
+Supabase 読み取り用の TTL + LRU キャッシュ
+
+キーは (テーブル名, クエリ種別, パラメータ...) のタプル。
+書き込み時は invalidate(テーブル名) でそのテーブルのエントリをまとめて破棄する
+（破棄せずに差分だけ反映できる場合は update(テーブル名, 関数)）。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# 直前の get_or_load がキャッシュから返したか（スレッドごと、メトリクスの cached ラベル用）
+_last_lookup = threading.local()
+
+
+def take_lookup_hit() -> bool:
+    """このスレッドの直前の get_or_load がヒットだったかを返して、記録を消す"""
+    hit = getattr(_last_lookup, "hit", False)
+    _last_lookup.hit = False
+    return hit
+
+
+class _Load:
+    """実行中の loader（同じキーの読み込みを1回にまとめる）"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        # 読み込み中に update() された分（完了時に結果へ適用する）
+        self.updates: List[Callable[[Tuple[Hashable, ...], Any], Any]] = []
+
+
+class TTLCache:
+    """
+    有効期限つき LRU キャッシュ（スレッドセーフ）
+
+    同じキーのミスが同時に起きた場合は loader を1回だけ呼び、他は結果を待つ。
+    テーブルごとの世代番号を持ち、読み込み中に invalidate() されたら結果を保存しない
+    （書き込み前に読んだ古い内容を新しい期限で残さない）。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[Tuple[Hashable, ...], _Load] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_loads = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """キャッシュにあれば返し、なければ loader() の結果を保存して返す"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                _last_lookup.hit = True
+                return entry[1]
+            self.misses += 1
+            _last_lookup.hit = False
+            load = self._loading.get(key)
+            if load is None:
+                load = self._loading[key] = _Load(self._generations.get(key[0], 0))
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value
+
+        # 通信はロックの外で行う
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(key) is load:
+                    del self._loading[key]
+            load.error = e
+            load.done.set()
+            raise
+
+        with self._lock:
+            for update in load.updates:
+                value = update(key, value)
+            if self._loading.get(key) is load:
+                del self._loading[key]
+            if self._generations.get(key[0], 0) == load.generation:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.stale_loads += 1
+        load.value = value
+        load.done.set()
+        return value
+
+    def invalidate(self, table: str) -> int:
+        """指定テーブルのエントリを破棄し、破棄した件数を返す（読み込み中の結果も保存しない）"""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys = [k for k in self._data if k[0] == table]
+            for k in keys:
+                del self._data[k]
+            # 以降のミスは待ち合わせずに読み直す
+            for k in [k for k in self._loading if k[0] == table]:
+                del self._loading[k]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def update(self, table: str, func: Callable[[Tuple[Hashable, ...], Any], Any]) -> int:
+        """
+        指定テーブルのエントリを func(key, value) の結果に置き換え、置き換えた件数を返す
+
+        期限は変えない。読み込み中のエントリには完了時に適用するので、
+        func は同じ変更を2回適用しても結果が変わらないようにする。
+        """
+        with self._lock:
+            keys = [k for k in self._data if k[0] == table]
+            for k in keys:
+                expires, value = self._data[k]
+                self._data[k] = (expires, func(k, value))
+            for k, load in self._loading.items():
+                if k[0] == table:
+                    load.updates.append(func)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "coalesced": self.coalesced,
+                "stale_loads": self.stale_loads,
+                "size": len(self._data),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class RecentKeys:
+    """最近見たキーを上限つきで覚えておく集合（古いものから忘れる、スレッドセーフ）"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._keys: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._keys
+
+    def add(self, key: Hashable) -> None:
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
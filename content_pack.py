@@ -0,0 +1,166 @@
+"""
+用語コンテンツパック
+
+用語は content_packs/<name>.json（PyYAML があれば .yaml / .yml も可）に置く。
+初回の読み込み時にパックをチェックして pickle のキャッシュに変換し、2回目以降の
+起動ではキャッシュだけを読む。キャッシュはユーザーごとのキャッシュディレクトリに
+パックのパスごとに置き、元ファイルの更新時刻・サイズとスキーマのハッシュが
+一致するときだけ使う（形式を変えたら SCHEMA_VERSION を上げる）。
+
+パック形式:
+    {
+      "name": "git", "title": "Git", "version": 1,
+      "categories": [...], "advanced_categories": [...],
+      "terms": [{"id", "name", "category", "short_description",
+                 "full_description", "examples", "related_terms"}, ...]
+    }
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Dict, List
+
+try:
+    import yaml
+except ImportError:  # YAML のパックを使わないなら不要
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+PACK_DIR = os.getenv("CONTENT_PACK_DIR", os.path.join(os.path.dirname(__file__), "content_packs"))
+PACK_CACHE_DIR = os.getenv("CONTENT_PACK_CACHE_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "git-vocab-app",
+    "content_packs",
+)
+DEFAULT_PACK = "git"
+
+SCHEMA_VERSION = 1
+PACK_FIELDS = ("name", "title", "version", "categories", "advanced_categories", "terms")
+TERM_FIELDS = (
+    "id", "name", "category", "short_description", "full_description", "examples", "related_terms",
+)
+SCHEMA_HASH = hashlib.sha256(
+    json.dumps([SCHEMA_VERSION, PACK_FIELDS, TERM_FIELDS]).encode("utf-8")
+).hexdigest()[:16]
+
+_EXTENSIONS = (".json", ".yaml", ".yml")
+
+
+class ContentPackError(ValueError):
+    """パックの形式が正しくない"""
+
+
+@dataclass(frozen=True)
+class ContentPack:
+    name: str
+    title: str
+    version: int
+    categories: List[str]
+    advanced_categories: List[str]
+    terms: List[Dict]
+
+
+def list_packs(pack_dir: str = PACK_DIR) -> Dict[str, str]:
+    """{パック名: ファイルパス}（中身は読まない）"""
+    packs = {}
+    for filename in sorted(os.listdir(pack_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext in _EXTENSIONS and (ext == ".json" or yaml is not None):
+            packs.setdefault(stem, os.path.join(pack_dir, filename))
+    return packs
+
+
+def _read_source(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        if yaml is None:
+            raise ContentPackError(f"{path}: YAML のパックを読むには PyYAML が必要です。")
+        return yaml.safe_load(f)
+
+
+def _validate(data: Dict, path: str) -> ContentPack:
+    if not isinstance(data, dict):
+        raise ContentPackError(f"{path}: パックの先頭はオブジェクトにしてください。")
+    missing = [f for f in PACK_FIELDS if f not in data]
+    if missing:
+        raise ContentPackError(f"{path}: {', '.join(missing)} がありません。")
+
+    categories = list(data["categories"])
+    seen = set()
+    terms = []
+    for no, term in enumerate(data["terms"], start=1):
+        missing = [f for f in TERM_FIELDS if f not in term]
+        if missing:
+            raise ContentPackError(f"{path}: {no} 件目の用語に {', '.join(missing)} がありません。")
+        if term["id"] in seen:
+            raise ContentPackError(f"{path}: 用語 id {term['id']!r} が重複しています。")
+        if term["category"] not in categories:
+            raise ContentPackError(
+                f"{path}: 用語 {term['id']!r} のカテゴリ {term['category']!r} が categories にありません。"
+            )
+        seen.add(term["id"])
+        terms.append({f: term[f] for f in TERM_FIELDS})
+
+    return ContentPack(
+        name=data["name"],
+        title=data["title"],
+        version=int(data["version"]),
+        categories=categories,
+        advanced_categories=[c for c in data["advanced_categories"] if c in categories],
+        terms=terms,
+    )
+
+
+def _warn_dangling_related_terms(pack: ContentPack) -> None:
+    """パックにない用語を related_terms に挙げている用語をログに出す（関連用語グラフでは除かれる）"""
+    ids = {term["id"] for term in pack.terms}
+    for term in pack.terms:
+        missing = [r for r in term["related_terms"] if r not in ids]
+        if missing:
+            logger.warning(
+                "Content pack %s: %s の関連用語 %s が見つかりません", pack.name, term["id"], ", ".join(missing)
+            )
+
+
+def _cache_path(name: str, path: str) -> str:
+    """パックのパスごとのキャッシュファイル（別のチェックアウトの同名パックと混ざらない）"""
+    path_hash = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(PACK_CACHE_DIR, f"{name}-{path_hash}.pickle")
+
+
+def load_pack(name: str, pack_dir: str = PACK_DIR) -> ContentPack:
+    """パックを読み込む（有効なキャッシュがあればそれを使う）"""
+    packs = list_packs(pack_dir)
+    if name not in packs:
+        raise ContentPackError(f"コンテンツパック {name!r} が見つかりません。")
+    path = packs[name]
+    stat = os.stat(path)
+    source_key = (SCHEMA_HASH, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    cache_path = _cache_path(name, path)
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, pack = pickle.load(f)
+        if cached_key == source_key and isinstance(pack, ContentPack):
+            _warn_dangling_related_terms(pack)
+            return pack
+    except Exception:  # noqa: BLE001 - キャッシュがない・壊れている・古い形式なら作り直す
+        pass
+
+    pack = _validate(_read_source(path), path)
+    try:
+        os.makedirs(PACK_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((source_key, pack), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # 書き込めない環境でもパック自体は使える
+        logger.warning("Content pack cache write failed: %s", e)
+    _warn_dangling_related_terms(pack)
+    return pack
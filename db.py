@@ -0,0 +1,478 @@
+"""
+Supabase へのデータアクセス
+
+Streamlit は操作のたびに app.py を先頭から再実行するが、import したモジュールは
+プロセス内で1度しか読み込まれない。クライアントはここでプロセス共有の1インスタンス
+として作り、HTTP コネクションを keep-alive で使い回す。
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Collection, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from supabase import Client, ClientOptions, create_client
+
+from cache import RecentKeys, TTLCache
+from metrics import observed, register_cache
+from near_dup import NearDuplicateIndex
+from profiling import traced
+from quiz import quiz_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseConfigError(RuntimeError):
+    """SUPABASE_URL / SUPABASE_KEY が設定されていない"""
+
+
+# ==============================
+# 接続設定（環境変数で上書き可能）
+# ==============================
+load_dotenv()
+
+# "supabase"（既定）または "sqlite"（ネットワークなしで動かす local_backend）
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# 秒単位のタイムアウト
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+# コネクションプールの上限
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+
+# 読み取りキャッシュ（秒単位の TTL、最大エントリ数）
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30"))
+READ_CACHE_MAXSIZE = int(os.getenv("READ_CACHE_MAXSIZE", "256"))
+
+# 全セッションで共有する読み取りキャッシュ
+READ_CACHE = TTLCache(maxsize=READ_CACHE_MAXSIZE, ttl=READ_CACHE_TTL)
+
+# ランダム出題用の問題 id 一覧（カテゴリ別）。取得が重いので TTL は長め
+QUIZ_ID_POOL_TTL = float(os.getenv("QUIZ_ID_POOL_TTL", "600"))
+QUIZ_ID_POOL_CACHE = TTLCache(maxsize=16, ttl=QUIZ_ID_POOL_TTL)
+
+# キャッシュのヒット率をメトリクスとして書き出す
+register_cache("read", READ_CACHE.stats)
+register_cache("quiz_id_pool", QUIZ_ID_POOL_CACHE.stats)
+
+# 最近登録・確認したクイズの content_hash（重複を通信前に弾く）
+RECENT_QUIZ_HASHES = RecentKeys(maxsize=10000)
+
+# insert_quiz_question_to_supabase の結果
+INSERTED = "inserted"
+DUPLICATE = "duplicate"
+SIMILAR = "similar"
+
+# 類似重複インデックスに他プロセスの登録を取り込む間隔（秒）
+NEAR_DUP_SYNC_INTERVAL = float(os.getenv("NEAR_DUP_SYNC_INTERVAL", "60"))
+
+# PostgREST の max-rows に合わせた1リクエストあたりの取得件数
+PAGE_SIZE = 1000
+
+# 画面ごとの取得列（select("*") で不要な長文を転送しない）
+# note_preview / note_length / question_preview は migrations/002 の計算列
+NOTE_LIST_COLUMNS = "id,created_at,note_preview,note_length"
+QUIZ_COLUMNS = "id,question_text,choice_1,choice_2,choice_3,choice_4,correct_choice,explanation"
+QUIZ_LIST_COLUMNS = "id,question_preview"
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+_near_dup_index: Optional[NearDuplicateIndex] = None
+_near_dup_synced_at = 0.0
+_near_dup_lock = threading.Lock()
+
+
+class InsertResult(NamedTuple):
+    """クイズ登録の結果（status は INSERTED / DUPLICATE / SIMILAR）"""
+
+    status: str
+    # SIMILAR のときの似ている登録済み問題 (id, 推定類似度)
+    similar: Tuple[Tuple[int, float], ...] = ()
+
+
+# ==============================
+# クライアント（プロセス共有）
+# ==============================
+def _create_client() -> Client:
+    if DATA_BACKEND == "sqlite":
+        from local_backend import LocalBackend
+
+        backend = LocalBackend()
+        logger.info("Local backend initialized: %s", backend.path)
+        return backend
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise SupabaseConfigError(
+            "SUPABASE_URL / SUPABASE_KEY が .env / Secrets に設定されていません。"
+        )
+
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+        ),
+    )
+    logger.info("Supabase client initialized: %s", SUPABASE_URL)
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=ClientOptions(httpx_client=http_client),
+    )
+
+
+def get_client() -> Client:
+    """プロセス内で共有する Supabase クライアントを返す（初回のみ生成）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+@traced()
+def check_health() -> Dict:
+    """
+    learning_notes に軽いクエリを投げて疎通とレイテンシを確認する
+
+    結果に所要時間を含めて返すので、データアクセスのメトリクスには数えない。
+    """
+    start = time.perf_counter()
+    try:
+        get_client().table("learning_notes").select("id").limit(1).execute()
+    except Exception as e:  # noqa: BLE001 - 接続エラーの種類は問わず結果として返す
+        return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+    return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "error": None}
+
+
+# ==============================
+# 学習ノート（Supabase learning_notes）
+# ==============================
+@traced()
+@observed("learning_notes", "insert")
+def save_learning_note_to_supabase(note_text: str) -> None:
+    """learning_notes テーブルにノートを1件追加"""
+    get_client().table("learning_notes").insert({"note_text": note_text}).execute()
+    READ_CACHE.invalidate("learning_notes")
+
+
+@traced()
+@observed("learning_notes", "insert")
+def save_learning_notes_batch(notes: List[Dict]) -> None:
+    """
+    learning_notes テーブルにノートをまとめて追加（1リクエスト）
+
+    notes は note_text と client_id の辞書。client_id が登録済みのノートは追加しない
+    （同じバッチを送り直しても二重にならない。migrations/004）。
+    """
+    get_client().table("learning_notes").upsert(
+        [{"note_text": note["note_text"], "client_id": note["client_id"]} for note in notes],
+        on_conflict="client_id",
+        ignore_duplicates=True,
+    ).execute()
+    READ_CACHE.invalidate("learning_notes")
+
+
+@traced()
+@observed("learning_notes", "select", cached=True)
+def load_learning_notes_page(before_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+    """
+    learning_notes を新しい順に1ページ取得（id によるキーセットページング）
+
+    before_id を渡すとそれより古い（id が小さい）ノートだけを取得する。
+    OFFSET を使わないので、テーブルが大きくなってもページあたりのコストは一定。
+    一覧用に本文は先頭だけ（note_preview）を返す。全文は load_learning_note で取得する。
+    """
+
+    def fetch() -> List[Dict]:
+        query = get_client().table("learning_notes").select(NOTE_LIST_COLUMNS)
+        if before_id is not None:
+            query = query.lt("id", before_id)
+        res = (
+            query
+            .order("id", desc=True)  # id 降順で新しい順
+            .limit(limit)
+            .execute()
+        )
+        return res.data or []
+
+    return READ_CACHE.get_or_load(("learning_notes", "page", before_id, limit), fetch)
+
+
+def load_learning_notes_from_supabase(limit: int = 50) -> List[Dict]:
+    """learning_notes テーブルからノート履歴を取得（新しい順、本文はプレビューのみ）"""
+    return load_learning_notes_page(None, limit)
+
+
+@traced()
+@observed("learning_notes", "select", cached=True)
+def load_learning_note(note_id: int) -> Optional[Dict]:
+    """learning_notes から1件を全列で取得"""
+
+    def fetch() -> Optional[Dict]:
+        res = (
+            get_client().table("learning_notes")
+            .select("*")
+            .eq("id", note_id)
+            .limit(1)
+            .execute()
+        )
+        return res.data[0] if res.data else None
+
+    return READ_CACHE.get_or_load(("learning_notes", "row", note_id), fetch)
+
+
+# ==============================
+# クイズ問題（Supabase git_quiz_questions）
+# ==============================
+@traced()
+@observed("git_quiz_questions", "select")
+def _load_quiz_id_pool(category: Optional[str]) -> List[int]:
+    """出題対象の問題 id を id 列だけ keyset ページングで全件取得"""
+    ids: List[int] = []
+    last_id = None
+    while True:
+        query = get_client().table("git_quiz_questions").select("id")
+        if category:
+            query = query.eq("category", category)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(PAGE_SIZE).execute().data or []
+        ids.extend(row["id"] for row in rows)
+        if len(rows) < PAGE_SIZE:
+            return ids
+        last_id = rows[-1]["id"]
+
+
+def _add_to_quiz_id_pools(rows: List[Dict]) -> None:
+    """追加した問題の id をキャッシュ済みの id 一覧に足す（一覧を読み直さない）"""
+
+    def add(key: Tuple, pool: List[int]) -> List[int]:
+        category = key[2]
+        known = set(pool)
+        new_ids = [
+            row["id"] for row in rows
+            if (not category or row.get("category") == category) and row["id"] not in known
+        ]
+        return pool + new_ids if new_ids else pool
+
+    QUIZ_ID_POOL_CACHE.update("git_quiz_questions", add)
+
+
+@traced()
+@observed("git_quiz_questions", "select")
+def _fetch_quiz_questions_by_ids(ids: List[int]) -> List[Dict]:
+    """指定した id の問題を出題に使う列で取得（順序は不定）"""
+    res = (
+        get_client().table("git_quiz_questions")
+        .select(QUIZ_COLUMNS)
+        .in_("id", ids)
+        .execute()
+    )
+    return res.data or []
+
+
+@traced()
+def load_quiz_questions_from_supabase(
+    limit: int = 5,
+    category: Optional[str] = None,
+    exclude_ids: Collection[int] = (),
+) -> List[Dict]:
+    """
+    git_quiz_questions からランダムにクイズ問題を取得
+
+    id 一覧をプロセス内にキャッシュしてその中から抽選し、選んだ id の行だけを取得する
+    （ORDER BY random() の全件走査をしない）。exclude_ids の問題は出題しない。
+    """
+    pool = QUIZ_ID_POOL_CACHE.get_or_load(
+        ("git_quiz_questions", "id_pool", category),
+        lambda: _load_quiz_id_pool(category),
+    )
+    if exclude_ids:
+        excluded = set(exclude_ids)
+        pool = [i for i in pool if i not in excluded]
+    if not pool:
+        return []
+
+    picked = random.sample(pool, min(limit, len(pool)))
+    # 抽選順に並べ直す（削除済みの id は除かれる）
+    rows_by_id = {row["id"]: row for row in _fetch_quiz_questions_by_ids(picked)}
+    return [rows_by_id[i] for i in picked if i in rows_by_id]
+
+
+@traced()
+@observed("git_quiz_questions", "select", cached=True)
+def load_latest_quiz_questions_from_supabase(limit: int = 5) -> List[Dict]:
+    """git_quiz_questions から最近登録された問題を取得（新しい順、問題文はプレビューのみ）"""
+
+    def fetch() -> List[Dict]:
+        res = (
+            get_client().table("git_quiz_questions")
+            .select(QUIZ_LIST_COLUMNS)
+            .order("id", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return res.data or []
+
+    return READ_CACHE.get_or_load(("git_quiz_questions", "latest", limit), fetch)
+
+
+@traced()
+@observed("git_quiz_questions", "select", cached=True)
+def load_quiz_question(question_id: int) -> Optional[Dict]:
+    """git_quiz_questions から1件を全列で取得"""
+
+    def fetch() -> Optional[Dict]:
+        res = (
+            get_client().table("git_quiz_questions")
+            .select("*")
+            .eq("id", question_id)
+            .limit(1)
+            .execute()
+        )
+        return res.data[0] if res.data else None
+
+    return READ_CACHE.get_or_load(("git_quiz_questions", "row", question_id), fetch)
+
+
+@traced()
+@observed("git_quiz_questions", "select")
+def _fetch_quiz_questions_since(last_id: int) -> List[Dict]:
+    """id > last_id の問題を id 昇順で1ページ（類似判定に使う列だけ）"""
+    res = (
+        get_client().table("git_quiz_questions")
+        .select("id,question_text,choice_1,choice_2,choice_3,choice_4,content_hash")
+        .gt("id", last_id)
+        .order("id")
+        .limit(PAGE_SIZE)
+        .execute()
+    )
+    return res.data or []
+
+
+@traced()
+def get_near_dup_index() -> NearDuplicateIndex:
+    """類似重複インデックス（保存済みの分を読み、新しい問題だけを定期的に取り込む）"""
+    global _near_dup_index, _near_dup_synced_at
+    with _near_dup_lock:
+        if _near_dup_index is None:
+            _near_dup_index = NearDuplicateIndex()
+        if time.monotonic() - _near_dup_synced_at > NEAR_DUP_SYNC_INTERVAL:
+            _near_dup_index.sync(_fetch_quiz_questions_since)
+            _near_dup_synced_at = time.monotonic()
+        return _near_dup_index
+
+
+@traced()
+def find_similar_quiz_questions(row: Dict) -> List[Tuple[int, float]]:
+    """
+    row と似ている登録済みの問題 (id, 推定類似度) を返す
+
+    同じ内容の問題が登録済みなら空を返す（登録すると DUPLICATE になるので、
+    「似ている問題」として扱わない）。
+    """
+    index = get_near_dup_index()
+    if index.find_duplicate(row) is not None:
+        return []
+    return index.find_similar(row)
+
+
+@traced()
+@observed("git_quiz_questions", "upsert")
+def _upsert_quiz_rows(rows: List[Dict]) -> List[Dict]:
+    """content_hash が既存の行は無視して追加し、実際に追加された行を返す"""
+    res = (
+        get_client().table("git_quiz_questions")
+        .upsert(rows, on_conflict="content_hash", ignore_duplicates=True)
+        .execute()
+    )
+    return res.data or []
+
+
+def _insert_quiz_rows(rows: List[Dict]) -> List[Dict]:
+    """行を追加し、追加できた行をキャッシュ・類似重複インデックスに反映して返す"""
+    inserted = _upsert_quiz_rows(rows)
+    if inserted:
+        READ_CACHE.invalidate("git_quiz_questions")
+        _add_to_quiz_id_pools(inserted)
+        get_near_dup_index().add_many(inserted)
+    return inserted
+
+
+@traced()
+def insert_quiz_question_to_supabase(
+    question_text: str,
+    choice_1: str,
+    choice_2: str,
+    choice_3: str,
+    choice_4: str,
+    correct_choice: int,
+    explanation: str,
+    category: Optional[str] = None,
+    allow_similar: bool = False,
+) -> InsertResult:
+    """
+    git_quiz_questions にクイズ問題を追加
+
+    同じ内容（quiz_content_hash が同じ）の問題は追加せず DUPLICATE を返す。
+    言い換えなどで似ている問題があれば、allow_similar=True でない限り追加せず
+    SIMILAR と似ている問題を返す。
+    """
+    row = {
+        "question_text": question_text,
+        "choice_1": choice_1,
+        "choice_2": choice_2,
+        "choice_3": choice_3,
+        "choice_4": choice_4,
+        "correct_choice": correct_choice,
+        "explanation": explanation,
+        "category": category,
+    }
+    row["content_hash"] = quiz_content_hash(row)
+    # 直前に登録・確認したものなら通信せずに重複と判定
+    if row["content_hash"] in RECENT_QUIZ_HASHES:
+        return InsertResult(DUPLICATE)
+
+    if not allow_similar:
+        similar = find_similar_quiz_questions(row)
+        if similar:
+            return InsertResult(SIMILAR, tuple(similar))
+
+    inserted = _insert_quiz_rows([row])
+    RECENT_QUIZ_HASHES.add(row["content_hash"])
+    return InsertResult(INSERTED if inserted else DUPLICATE)
+
+
+@traced()
+def insert_quiz_questions_batch(rows: List[Dict]) -> int:
+    """
+    git_quiz_questions にクイズ問題をまとめて追加（1リクエスト）し、追加した件数を返す
+
+    登録済み・バッチ内で重複する内容の問題は追加しない。
+    類似判定はここでは行わない（一括登録側で行ごとに find_similar_quiz_questions を使う）。
+    """
+    new_rows = []
+    seen = set()
+    for row in rows:
+        content_hash = quiz_content_hash(row)
+        if content_hash in seen or content_hash in RECENT_QUIZ_HASHES:
+            continue
+        seen.add(content_hash)
+        new_rows.append({**row, "content_hash": content_hash})
+    if not new_rows:
+        return 0
+
+    inserted = _insert_quiz_rows(new_rows)
+    for content_hash in seen:
+        RECENT_QUIZ_HASHES.add(content_hash)
+    return len(inserted)
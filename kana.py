@@ -0,0 +1,94 @@
+"""
+かな変換（検索キー用）
+
+カタカナ → ひらがなの折りたたみと、ひらがなのローマ字化（ヘボン式ベース）。
+かな以外の文字はそのまま残す。
+"""
+import re
+from typing import Dict
+
+_KATAKANA_START = 0x30A1  # ァ
+_KATAKANA_END = 0x30F6    # ヶ
+_KANA_OFFSET = 0x60
+
+_HIRAGANA_TABLE = str.maketrans(
+    {chr(c): chr(c - _KANA_OFFSET) for c in range(_KATAKANA_START, _KATAKANA_END + 1)}
+)
+
+_ROMAJI: Dict[str, str] = {
+    "あ": "a", "い": "i", "う": "u", "え": "e", "お": "o",
+    "か": "ka", "き": "ki", "く": "ku", "け": "ke", "こ": "ko",
+    "さ": "sa", "し": "shi", "す": "su", "せ": "se", "そ": "so",
+    "た": "ta", "ち": "chi", "つ": "tsu", "て": "te", "と": "to",
+    "な": "na", "に": "ni", "ぬ": "nu", "ね": "ne", "の": "no",
+    "は": "ha", "ひ": "hi", "ふ": "fu", "へ": "he", "ほ": "ho",
+    "ま": "ma", "み": "mi", "む": "mu", "め": "me", "も": "mo",
+    "や": "ya", "ゆ": "yu", "よ": "yo",
+    "ら": "ra", "り": "ri", "る": "ru", "れ": "re", "ろ": "ro",
+    "わ": "wa", "ゐ": "i", "ゑ": "e", "を": "o", "ん": "n",
+    "が": "ga", "ぎ": "gi", "ぐ": "gu", "げ": "ge", "ご": "go",
+    "ざ": "za", "じ": "ji", "ず": "zu", "ぜ": "ze", "ぞ": "zo",
+    "だ": "da", "ぢ": "ji", "づ": "zu", "で": "de", "ど": "do",
+    "ば": "ba", "び": "bi", "ぶ": "bu", "べ": "be", "ぼ": "bo",
+    "ぱ": "pa", "ぴ": "pi", "ぷ": "pu", "ぺ": "pe", "ぽ": "po",
+    "ゔ": "vu",
+    "ぁ": "a", "ぃ": "i", "ぅ": "u", "ぇ": "e", "ぉ": "o",
+    "ゃ": "ya", "ゅ": "yu", "ょ": "yo", "ゎ": "wa", "ゕ": "ka", "ゖ": "ke",
+    # 拗音
+    "きゃ": "kya", "きゅ": "kyu", "きょ": "kyo",
+    "しゃ": "sha", "しゅ": "shu", "しぇ": "she", "しょ": "sho",
+    "ちゃ": "cha", "ちゅ": "chu", "ちぇ": "che", "ちょ": "cho",
+    "にゃ": "nya", "にゅ": "nyu", "にょ": "nyo",
+    "ひゃ": "hya", "ひゅ": "hyu", "ひょ": "hyo",
+    "みゃ": "mya", "みゅ": "myu", "みょ": "myo",
+    "りゃ": "rya", "りゅ": "ryu", "りょ": "ryo",
+    "ぎゃ": "gya", "ぎゅ": "gyu", "ぎょ": "gyo",
+    "じゃ": "ja", "じゅ": "ju", "じぇ": "je", "じょ": "jo",
+    "びゃ": "bya", "びゅ": "byu", "びょ": "byo",
+    "ぴゃ": "pya", "ぴゅ": "pyu", "ぴょ": "pyo",
+    # 外来語の表記
+    "てぃ": "ti", "でぃ": "di", "とぅ": "tu", "どぅ": "du",
+    "ふぁ": "fa", "ふぃ": "fi", "ふぇ": "fe", "ふぉ": "fo",
+    "うぃ": "wi", "うぇ": "we", "うぉ": "wo",
+    "ゔぁ": "va", "ゔぃ": "vi", "ゔぇ": "ve", "ゔぉ": "vo",
+    "つぁ": "tsa", "いぇ": "ye",
+}
+
+_KANA_RUN = re.compile("[ぁ-ゖー]+")
+
+
+def katakana_to_hiragana(text: str) -> str:
+    return text.translate(_HIRAGANA_TABLE)
+
+
+def _kana_run_to_romaji(run: str) -> str:
+    out = []
+    double_next = False
+    i = 0
+    while i < len(run):
+        char = run[i]
+        if char == "っ":
+            double_next = True
+            i += 1
+            continue
+        if char == "ー":
+            # 長音は入力のゆれが大きいので読みから外す（マージ → maji）
+            i += 1
+            continue
+        pair = run[i:i + 2]
+        if len(pair) == 2 and pair in _ROMAJI:
+            romaji = _ROMAJI[pair]
+            i += 2
+        else:
+            romaji = _ROMAJI.get(char, char)
+            i += 1
+        if double_next and romaji[0] not in "aiueon":
+            romaji = ("t" if romaji.startswith("ch") else romaji[0]) + romaji
+        double_next = False
+        out.append(romaji)
+    return "".join(out)
+
+
+def to_romaji(text: str) -> str:
+    """ひらがな（とカタカナ）の部分をローマ字にする"""
+    return _KANA_RUN.sub(lambda m: _kana_run_to_romaji(m.group()), katakana_to_hiragana(text))
@@ -0,0 +1,342 @@
+"""
+ローカル実行用のデータバックエンド（SQLite、プロセス内）
+
+db.py が使っている Supabase クライアントの呼び出し
+（table / select / insert / upsert / update / eq / lt / gt / is_ / in_ / order / limit / execute）
+だけを同じ形で SQLite に対して実行する。DATA_BACKEND=sqlite で db.get_client() が
+これを返すので、ネットワークや Supabase の認証情報なしで負荷試験・ベンチマークを動かせる。
+
+遅延と失敗は環境変数で注入できる（1リクエストごと）。
+    LOCAL_BACKEND_LATENCY_MS=20        固定 20ms
+    LOCAL_BACKEND_LATENCY_MS=10-80     10〜80ms の一様乱数
+    LOCAL_BACKEND_FAILURE_RATE=0.05    5% のリクエストを APIError にする
+
+LOCAL_BACKEND_STATS_PATH を指定すると、プロセス終了時にテーブル・操作ごとの
+リクエスト数を JSON で書き出す（負荷試験の集計用）。
+"""
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from postgrest.exceptions import APIError
+
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", ".local_backend.sqlite3")
+LOCAL_BACKEND_LATENCY_MS = os.getenv("LOCAL_BACKEND_LATENCY_MS", "0")
+LOCAL_BACKEND_FAILURE_RATE = float(os.getenv("LOCAL_BACKEND_FAILURE_RATE", "0"))
+LOCAL_BACKEND_STATS_PATH = os.getenv("LOCAL_BACKEND_STATS_PATH")
+
+_NOW = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+# Supabase 側のテーブル定義（migrations/ の変更も反映済み）
+_SCHEMA = f"""
+create table if not exists learning_notes (
+    id integer primary key autoincrement,
+    created_at text not null default {_NOW},
+    note_text text not null,
+    client_id text
+);
+create table if not exists git_quiz_questions (
+    id integer primary key autoincrement,
+    created_at text not null default {_NOW},
+    question_text text not null,
+    choice_1 text not null,
+    choice_2 text not null,
+    choice_3 text not null,
+    choice_4 text not null,
+    correct_choice integer not null,
+    explanation text,
+    category text,
+    content_hash text
+);
+create index if not exists git_quiz_questions_category_id_idx
+    on git_quiz_questions (category, id);
+create unique index if not exists git_quiz_questions_content_hash_key
+    on git_quiz_questions (content_hash);
+"""
+
+# 既存のファイルに後から足した列と索引（migrations/004）
+_ADDED_COLUMNS = {"learning_notes": {"client_id": "text"}}
+_ADDED_INDEXES = """
+create unique index if not exists learning_notes_client_id_key
+    on learning_notes (client_id);
+"""
+
+# migrations/002 の計算列
+_COMPUTED_COLUMNS: Dict[str, Dict[str, str]] = {
+    "learning_notes": {
+        "note_preview": "substr(note_text, 1, 120)",
+        "note_length": "length(note_text)",
+    },
+    "git_quiz_questions": {
+        "question_preview": "substr(question_text, 1, 120)",
+    },
+}
+
+
+def _parse_latency(spec: str) -> Tuple[float, float]:
+    """"20" / "10-80"（ミリ秒）を (最小, 最大) 秒にする"""
+    low, _, high = spec.partition("-")
+    low_s = float(low or 0) / 1000
+    return low_s, (float(high) / 1000 if high else low_s)
+
+
+class LocalResponse:
+    """postgrest の APIResponse と同じく data / count を持つ結果"""
+
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    """1テーブルへのクエリ（Supabase のクエリビルダーと同じメソッドチェーン）"""
+
+    def __init__(self, backend: "LocalBackend", table: str):
+        if table not in backend.columns:
+            raise APIError({"message": f'relation "{table}" does not exist', "code": "42P01"})
+        self._backend = backend
+        self._table = table
+        self._action = "select"
+        self._select = "*"
+        self._rows: List[Dict] = []
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._where: List[str] = []
+        self._params: List[Any] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+
+    # --- 操作 ---
+    def select(self, columns: str = "*") -> "LocalQuery":
+        self._action = "select"
+        self._select = columns
+        return self
+
+    def insert(self, rows: Union[Dict, List[Dict]]) -> "LocalQuery":
+        self._action = "insert"
+        self._rows = [rows] if isinstance(rows, dict) else list(rows)
+        return self
+
+    def upsert(
+        self,
+        rows: Union[Dict, List[Dict]],
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+    ) -> "LocalQuery":
+        self._action = "upsert"
+        self._rows = [rows] if isinstance(rows, dict) else list(rows)
+        self._on_conflict = on_conflict or "id"
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: Dict) -> "LocalQuery":
+        """絞り込み条件に合う行の列を values で書き換える（eq などと組み合わせる）"""
+        self._action = "update"
+        self._rows = [values]
+        return self
+
+    # --- 絞り込み・並び順 ---
+    def _filter(self, column: str, op: str, value: Any) -> "LocalQuery":
+        self._where.append(f"{self._column(column)} {op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, "!=", value)
+
+    def lt(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, "<=", value)
+
+    def gt(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, ">=", value)
+
+    def is_(self, column: str, value: Any) -> "LocalQuery":
+        """is.null / is.true などの判定（PostgREST と同じく値は "null" / "true" / "false"）"""
+        keyword = {"null": "null", "true": "1", "false": "0"}.get(str(value).lower())
+        if keyword is None:
+            raise APIError({"message": f"invalid is value: {value}", "code": "22P02"})
+        self._where.append(f"{self._column(column)} is {keyword}")
+        return self
+
+    def in_(self, column: str, values: Sequence[Any]) -> "LocalQuery":
+        values = list(values)
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{self._column(column)} in ({', '.join('?' * len(values))})")
+        self._params.extend(values)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "LocalQuery":
+        self._order.append(f"{self._column(column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, size: int) -> "LocalQuery":
+        self._limit = int(size)
+        return self
+
+    # --- 実行 ---
+    def _column(self, name: str) -> str:
+        """列名（計算列は SQL 式）。未知の列は PostgREST と同じくエラー"""
+        name = name.strip()
+        if name in self._backend.columns[self._table]:
+            return name
+        computed = _COMPUTED_COLUMNS.get(self._table, {})
+        if name in computed:
+            return computed[name]
+        raise APIError(
+            {"message": f"column {self._table}.{name} does not exist", "code": "42703"}
+        )
+
+    def _select_list(self, columns: str) -> str:
+        if columns.strip() == "*":
+            return "*"
+        return ", ".join(
+            f"{self._column(c)} as {c.strip()}" for c in columns.split(",") if c.strip()
+        )
+
+    def _where_sql(self) -> str:
+        return f" where {' and '.join(self._where)}" if self._where else ""
+
+    def execute(self) -> LocalResponse:
+        self._backend.inject(self._table, self._action)
+        if self._action == "select":
+            sql = f"select {self._select_list(self._select)} from {self._table}{self._where_sql()}"
+            if self._order:
+                sql += " order by " + ", ".join(self._order)
+            if self._limit is not None:
+                sql += f" limit {self._limit}"
+            return LocalResponse(self._backend.query(sql, self._params))
+        if self._action == "update":
+            return LocalResponse(self._update())
+        return LocalResponse(self._write())
+
+    def _check_columns(self, columns: List[str]) -> None:
+        for column in columns:
+            if column not in self._backend.columns[self._table]:
+                raise APIError(
+                    {"message": f"column {self._table}.{column} does not exist", "code": "42703"}
+                )
+
+    def _update(self) -> List[Dict]:
+        values = self._rows[0]
+        columns = list(values)
+        if not columns:
+            return []
+        self._check_columns(columns)
+        sql = (
+            f"update {self._table} set {', '.join(f'{c} = ?' for c in columns)}"
+            f"{self._where_sql()} returning *"
+        )
+        return self._backend.write(sql, [[values[c] for c in columns] + self._params])
+
+    def _write(self) -> List[Dict]:
+        if not self._rows:
+            return []
+        columns = list(dict.fromkeys(c for row in self._rows for c in row))
+        self._check_columns(columns)
+        sql = (
+            f"insert into {self._table} ({', '.join(columns)}) "
+            f"values ({', '.join('?' * len(columns))})"
+        )
+        if self._action == "upsert":
+            conflict = self._column(self._on_conflict)
+            if self._ignore_duplicates:
+                sql += f" on conflict ({conflict}) do nothing"
+            else:
+                updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != conflict)
+                sql += f" on conflict ({conflict}) do update set {updates}"
+        sql += " returning *"
+        return self._backend.write(sql, [[row.get(c) for c in columns] for row in self._rows])
+
+
+class LocalBackend:
+    """Supabase クライアントの代わりに get_client() が返す SQLite バックエンド"""
+
+    def __init__(
+        self,
+        path: str = LOCAL_DB_PATH,
+        latency_ms: str = LOCAL_BACKEND_LATENCY_MS,
+        failure_rate: float = LOCAL_BACKEND_FAILURE_RATE,
+        stats_path: Optional[str] = LOCAL_BACKEND_STATS_PATH,
+    ):
+        self.path = path
+        self.latency = _parse_latency(latency_ms)
+        self.failure_rate = failure_rate
+        self.request_count = 0
+        # "テーブル.操作" ごとのリクエスト数
+        self.request_counts: Dict[str, int] = {}
+        self._rng = random.Random()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("pragma journal_mode=wal")
+            self._conn.executescript(_SCHEMA)
+            for table, added in _ADDED_COLUMNS.items():
+                existing = {row[1] for row in self._conn.execute(f"pragma table_info({table})")}
+                for column, column_type in added.items():
+                    if column not in existing:
+                        self._conn.execute(f"alter table {table} add column {column} {column_type}")
+            self._conn.executescript(_ADDED_INDEXES)
+            self._conn.commit()
+            self.columns = {
+                table: [row[1] for row in self._conn.execute(f"pragma table_info({table})")]
+                for table in ("learning_notes", "git_quiz_questions")
+            }
+        if stats_path:
+            atexit.register(self.write_stats, stats_path)
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def inject(self, table: str, action: str) -> None:
+        """リクエストを数え、設定された遅延と失敗を入れる"""
+        key = f"{table}.{action}"
+        with self._lock:
+            self.request_count += 1
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+            delay = self._rng.uniform(*self.latency)
+            fail = self._rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise APIError({"message": "injected failure", "code": "503"})
+
+    def write_stats(self, path: str) -> None:
+        with self._lock:
+            stats = {"requests": self.request_count, "by_table": dict(self.request_counts)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+
+    def query(self, sql: str, params: Sequence[Any]) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def write(self, sql: str, rows: Sequence[Sequence[Any]]) -> List[Dict]:
+        """rows を1トランザクションで書き込み、実際に書き込まれた行を返す"""
+        written = []
+        with self._lock:
+            try:
+                for params in rows:
+                    written.extend(dict(row) for row in self._conn.execute(sql, params))
+                self._conn.commit()
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                raise APIError({"message": str(e), "code": "23505"}) from None
+        return written
@@ -0,0 +1,434 @@
+"""
+Prometheus 形式のメトリクス（外部ライブラリなし）
+
+カウンタ・ゲージ・ヒストグラムをプロセス内の REGISTRY に登録し、
+テキスト形式（text/plain; version=0.0.4）で書き出す。公開方法は環境変数で選ぶ。
+    METRICS_PORT=9464                         別スレッドの HTTP サーバで /metrics を公開
+                                              （METRICS_HOST、既定は 127.0.0.1 のみ）
+    METRICS_TEXTFILE=/path/to/git_vocab.prom  node_exporter の textfile collector 用に
+                                              METRICS_TEXTFILE_INTERVAL 秒ごとに書き出す
+
+記録側（inc / observe）はラベルの組み合わせごとの子を先に引いておけば、
+ロック1回と数回の加算だけで済む。キャッシュのヒット数やセッション数のように
+既に別の場所で数えている値は、書き出すときにコールバックで読む。
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from cache import take_lookup_hit
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+METRICS_TEXTFILE_INTERVAL = float(os.getenv("METRICS_TEXTFILE_INTERVAL", "15"))
+# この秒数以内に再実行のあったセッションを「接続中」として数える
+METRICS_SESSION_WINDOW = float(os.getenv("METRICS_SESSION_WINDOW", "300"))
+
+# 通信・再実行の時間向け（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# ==============================
+# メトリクス
+# ==============================
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """ラベル値の組み合わせごとの子（同じ組み合わせには同じ子を返す）"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ラベルは {self.labelnames} です")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[Sample]:
+        out: List[Sample] = []
+        for key, child in list(self._children.items()):
+            out.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return out
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        return [(name, labels, self.value)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # バケットごとの件数（累積は書き出すときに計算する）。最後は +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        out: List[Sample] = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            out.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        out.append((f"{name}_sum", labels, total))
+        out.append((f"{name}_count", labels, cumulative))
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+
+# ==============================
+# レジストリ
+# ==============================
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # 登録キー -> (名前, 種類, 説明, 書き出し時に値を返す関数)
+        self._callbacks: Dict[Hashable, Tuple[str, str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        kind: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+        key: Optional[Hashable] = None,
+    ) -> None:
+        """
+        書き出すときに collect() を呼んで (ラベル, 値) を得るメトリクス
+
+        同じ key で登録し直すと前の collect を置き換える（st.cache_resource の
+        作り直しなどで同じ系列が重複しない）。
+        """
+        with self._lock:
+            self._callbacks[key if key is not None else object()] = (
+                name, kind, documentation, collect,
+            )
+
+    def exposition(self) -> str:
+        """Prometheus のテキスト形式"""
+        families: Dict[str, Tuple[str, str, List[Sample]]] = {}
+        for metric in list(self._metrics):
+            families[metric.name] = (metric.kind, metric.documentation, metric.samples())
+        for name, kind, documentation, collect in list(self._callbacks.values()):
+            try:
+                values = list(collect())
+            except Exception:  # 読めない値があっても他のメトリクスは出す
+                continue
+            _, _, samples = families.setdefault(name, (kind, documentation, []))
+            samples.extend((name, labels, value) for labels, value in values)
+
+        lines = []
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(
+                f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+                for sample_name, labels, value in samples
+            )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ==============================
+# アプリのメトリクス
+# ==============================
+DB_REQUESTS = REGISTRY.counter(
+    "git_vocab_db_requests_total",
+    "データアクセス関数の呼び出し回数（cached=\"true\" はキャッシュから返した分）",
+    ("function", "table", "operation", "cached", "status"),
+)
+DB_DURATION = REGISTRY.histogram(
+    "git_vocab_db_request_duration_seconds",
+    "データアクセス関数の所要時間（cached=\"true\" はキャッシュから返した分）",
+    ("function", "table", "operation", "cached"),
+)
+RERUNS = REGISTRY.counter(
+    "git_vocab_reruns_total", "スクリプト全体の再実行回数（学習モード別）", ("mode",)
+)
+RERUN_DURATION = REGISTRY.histogram(
+    "git_vocab_rerun_duration_seconds", "スクリプト全体の再実行時間（学習モード別）", ("mode",)
+)
+
+
+def observed(table: str, operation: str, cached: bool = False) -> Callable[[Callable], Callable]:
+    """
+    データアクセス関数の回数と時間を記録するデコレータ
+
+    cached=True の関数は最後に TTLCache.get_or_load で値を返すもの。ヒットした呼び出しは
+    cached="true" で記録し、通信した呼び出しのレイテンシと混ぜない。
+    """
+
+    def decorator(func: Callable) -> Callable:
+        name = func.__name__
+        outcomes = (False, True) if cached else (False,)
+        ok = {hit: DB_REQUESTS.labels(name, table, operation, str(hit).lower(), "ok") for hit in outcomes}
+        error = DB_REQUESTS.labels(name, table, operation, "false", "error")
+        duration = {hit: DB_DURATION.labels(name, table, operation, str(hit).lower()) for hit in outcomes}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if cached:
+                take_lookup_hit()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                duration[False].observe(time.perf_counter() - start)
+                error.inc()
+                raise
+            hit = cached and take_lookup_hit()
+            duration[hit].observe(time.perf_counter() - start)
+            ok[hit].inc()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def register_cache(cache: str, stats: Callable[[], Dict], labels: Optional[Dict[str, str]] = None) -> None:
+    """
+    hits / misses を返す stats() のキャッシュをヒット率つきで書き出す
+
+    同じ cache・labels で登録し直すと前の stats を置き換える。
+    """
+    labels = {"cache": cache, **(labels or {})}
+    key = tuple(sorted(labels.items()))
+
+    def counts() -> Tuple[int, int]:
+        s = stats()
+        return int(s["hits"]), int(s["misses"])
+
+    REGISTRY.callback(
+        "git_vocab_cache_hits_total", "counter", "キャッシュのヒット数",
+        lambda: [(labels, counts()[0])],
+        key=("git_vocab_cache_hits_total", key),
+    )
+    REGISTRY.callback(
+        "git_vocab_cache_misses_total", "counter", "キャッシュのミス数",
+        lambda: [(labels, counts()[1])],
+        key=("git_vocab_cache_misses_total", key),
+    )
+
+    def hit_ratio() -> List[Tuple[Dict[str, str], float]]:
+        hits, misses = counts()
+        return [(labels, hits / (hits + misses) if hits + misses else 0.0)]
+
+    REGISTRY.callback(
+        "git_vocab_cache_hit_ratio", "gauge", "キャッシュのヒット率", hit_ratio,
+        key=("git_vocab_cache_hit_ratio", key),
+    )
+
+
+class RecentSessions:
+    """直近 window 秒に再実行のあったセッションを数える（Streamlit の内部 API を使わない）"""
+
+    def __init__(self, window: float = METRICS_SESSION_WINDOW):
+        self.window = window
+        self._seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_key: str) -> None:
+        with self._lock:
+            self._seen[session_key] = time.monotonic()
+
+    def count(self) -> int:
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            for key in [k for k, seen in self._seen.items() if seen < cutoff]:
+                del self._seen[key]
+            return len(self._seen)
+
+
+ACTIVE_SESSIONS = RecentSessions()
+REGISTRY.callback(
+    "git_vocab_active_sessions",
+    "gauge",
+    "直近 METRICS_SESSION_WINDOW 秒に再実行のあったセッション数",
+    lambda: [({}, ACTIVE_SESSIONS.count())],
+)
+
+
+# ==============================
+# 公開（HTTP / textfile）
+# ==============================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # スクレイプのたびにアクセスログを出さない
+        pass
+
+
+def write_textfile(path: str) -> None:
+    """一時ファイルに書いてから置き換える（読み取り途中のファイルを見せない）"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.exposition())
+    os.replace(tmp, path)
+
+
+def _textfile_loop(path: str, interval: float) -> None:
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            logger.warning("Metrics textfile write failed: %s", e)
+        time.sleep(interval)
+
+
+_exporter_lock = threading.Lock()
+_http_started = False
+_textfile_started = False
+
+
+def start_exporter(
+    host: str = METRICS_HOST,
+    port: int = METRICS_PORT,
+    textfile: Optional[str] = METRICS_TEXTFILE,
+    interval: float = METRICS_TEXTFILE_INTERVAL,
+) -> None:
+    """
+    設定に応じて /metrics の HTTP サーバと textfile の書き出しを開始する（プロセスで1回）
+
+    ポートを確保できなかったときは警告を出してアプリはそのまま動かし、
+    次の呼び出しでもう一度試す。
+    """
+    global _http_started, _textfile_started
+    with _exporter_lock:
+        if port and not _http_started:
+            try:
+                server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint could not bind %s:%s: %s", host, port, e)
+            else:
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+                _http_started = True
+                logger.info("Metrics endpoint started: http://%s:%s/metrics", host, port)
+        if textfile and not _textfile_started:
+            threading.Thread(
+                target=_textfile_loop, args=(textfile, interval), name="metrics-textfile", daemon=True
+            ).start()
+            _textfile_started = True
+            logger.info("Metrics textfile: %s（%.0f秒ごと）", textfile, interval)
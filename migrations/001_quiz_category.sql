@@ -0,0 +1,7 @@
+-- クイズ問題のカテゴリ（辞書の CATEGORIES と同じ値）
+-- カテゴリ別のランダム出題で id 一覧を keyset ページングするための索引も作る
+alter table git_quiz_questions
+    add column if not exists category text;
+
+create index if not exists git_quiz_questions_category_id_idx
+    on git_quiz_questions (category, id);
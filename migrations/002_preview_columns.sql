@@ -0,0 +1,23 @@
+-- 一覧表示用の計算列（PostgREST では select=note_preview のように列として取得できる）
+-- 長文は先頭だけ返し、全文は展開時に id 指定で取得する
+
+create or replace function note_preview(learning_notes)
+returns text
+language sql stable
+as $$
+    select left($1.note_text, 120)
+$$;
+
+create or replace function note_length(learning_notes)
+returns integer
+language sql stable
+as $$
+    select char_length($1.note_text)
+$$;
+
+create or replace function question_preview(git_quiz_questions)
+returns text
+language sql stable
+as $$
+    select left($1.question_text, 120)
+$$;
@@ -0,0 +1,8 @@
+-- 重複登録防止用の冪等キー（問題文と選択肢を正規化した sha256、quiz.quiz_content_hash）
+-- 登録は on_conflict=content_hash の upsert（ignore duplicates）で行う
+-- 既存の行は NULL のままなので、適用後に python -m quiz_hash_backfill で埋め戻す
+alter table git_quiz_questions
+    add column if not exists content_hash text;
+
+create unique index if not exists git_quiz_questions_content_hash_key
+    on git_quiz_questions (content_hash);
@@ -0,0 +1,8 @@
+-- 学習ノートの冪等キー（スプールがノートごとに付ける UUID、note_spool.py）
+-- 送信は成功したが送信済みの記録前に落ちた場合の再送で、同じノートを二重に登録しない
+-- 登録は on_conflict=client_id の upsert（ignore duplicates）で行う
+alter table learning_notes
+    add column if not exists client_id uuid;
+
+create unique index if not exists learning_notes_client_id_key
+    on learning_notes (client_id);
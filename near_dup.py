@@ -0,0 +1,256 @@
+"""
+クイズ問題の類似重複検出（MinHash + LSH）
+
+問題文と選択肢を正規化した文字 3-gram（シングル）の集合を MinHash 署名にし、
+署名をバンドに分けたハッシュ表（LSH）で候補を引く。全件と比較しないので
+10 万件を超えても1問あたりの検索コストはほぼ一定。
+
+署名はローカルの SQLite に1問ずつ追記して保存し、起動時は前回 sync() で取り込んだ
+位置より新しい問題だけを取り込む（毎回作り直さない）。
+内容ハッシュ（quiz.quiz_content_hash）も一緒に持ち、完全に同じ内容の問題は
+「似ている」ではなく登録済みとして扱えるようにする。
+
+インデックスは追記のみで、テーブルから削除した問題も残る（find_similar /
+find_duplicate が削除済みの id を返すことがある）。まとめて削除したあとは
+NEAR_DUP_INDEX_PATH のファイルを消せば、次の起動時に全件から作り直す。
+"""
+import os
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from quiz import quiz_content_hash
+
+# 保存先と判定のしきい値（環境変数で上書き可能）
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", ".near_dup_index.sqlite3")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+
+NUM_PERM = 64
+BANDS = 16  # 1バンド 4 行。類似度 0.7 の問題が候補に入る確率は約 99%
+SHINGLE = 3
+SEED = 1
+# signatures テーブルの形式（変えたら作り直す）
+FORMAT = 3
+
+# 順列のハッシュ (a * x + b) mod p の p。2^61 ≡ 1 (mod p) なので剰余をシフトと加算で取れる
+_MERSENNE_PRIME = (1 << 61) - 1
+_P = np.uint64(_MERSENNE_PRIME)
+_LOW29 = np.uint64((1 << 29) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_SCHEMA = """
+create table if not exists meta (key text primary key, value text not null);
+create table if not exists signatures (
+    id integer primary key,
+    signature blob not null,
+    content_hash text
+);
+"""
+
+
+def _normalize(text: str) -> str:
+    return "".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def question_shingles(row: Dict) -> set:
+    """問題文と選択肢の文字 3-gram 集合"""
+    text = "|".join(
+        _normalize(str(row.get(name) or ""))
+        for name in ("question_text", "choice_1", "choice_2", "choice_3", "choice_4")
+    )
+    if len(text) < SHINGLE:
+        return {text}
+    return {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+
+
+def _mod_p(x: np.ndarray) -> np.ndarray:
+    """x mod p（x < 2^64）"""
+    x = (x & _P) + (x >> np.uint64(61))
+    return np.where(x >= _P, x - _P, x)
+
+
+def _mul_mod_p(x: np.ndarray, a: np.ndarray) -> np.ndarray:
+    """
+    x * a mod p（x < 2^32、a < p）を uint64 からあふれさせずに計算する
+
+    a を上位 29bit と下位 32bit に分け、それぞれの積（< 2^64）を p で畳む。
+    上位の積に掛ける 2^32 は、2^61 ≡ 1 を使って畳んだ値の並べ替えで済ませる。
+    """
+    low = _mod_p(x * (a & _MAX_HASH))
+    high = _mod_p(x * (a >> np.uint64(32)))
+    high = _mod_p((high >> np.uint64(29)) + ((high & _LOW29) << np.uint64(32)))
+    return _mod_p(low + high)
+
+
+def _hash_key(content_hash: str) -> int:
+    # 64 文字の16進を全部持たず、先頭 64bit だけで引く
+    return int(content_hash[:16], 16)
+
+
+class MinHashLSH:
+    """MinHash 署名の LSH インデックス（メモリ上、追加のみ、スレッドセーフ）"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = SEED):
+        assert num_perm % bands == 0
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        # バンドごとの {バンドの内容: [問題 id, ...]}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, np.ndarray] = {}
+        self.max_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self._signatures
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        """シングル集合の MinHash 署名（uint32 × num_perm）"""
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # (a * x + b) mod p を全順列まとめて計算し、列ごとの最小値をとる
+        values = _mod_p(_mul_mod_p(hashes[:, None], self._a) + self._b)
+        return (values & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def _bands_of(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, question_id: int, signature: np.ndarray) -> None:
+        with self._lock:
+            if question_id in self._signatures:
+                return
+            self._signatures[question_id] = signature
+            for band, key in enumerate(self._bands_of(signature)):
+                self._buckets[band].setdefault(key, []).append(question_id)
+            self.max_id = max(self.max_id, question_id)
+
+    def query(self, signature: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+        """推定類似度が threshold 以上の (問題 id, 類似度) を類似度順で返す"""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._bands_of(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            scored = [
+                (question_id, float(np.mean(self._signatures[question_id] == signature)))
+                for question_id in candidates
+            ]
+        return sorted(
+            ((qid, sim) for qid, sim in scored if sim >= threshold),
+            key=lambda x: -x[1],
+        )
+
+
+class NearDuplicateIndex:
+    """git_quiz_questions 用の類似重複インデックス（SQLite に追記保存。削除した問題も残る）"""
+
+    def __init__(self, path: str = NEAR_DUP_INDEX_PATH, threshold: float = NEAR_DUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.lsh = MinHashLSH()
+        # 内容ハッシュ（先頭 64bit）-> 問題 id
+        self._hashes: Dict[int, int] = {}
+        # sync() で取り込み済みの位置。add_many() では進めない
+        # （自分で登録した行より小さい id を他のプロセスが登録していることがある）
+        self.synced_id = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute(
+                "create table if not exists meta (key text primary key, value text not null)"
+            )
+            params = f"{NUM_PERM}:{BANDS}:{SHINGLE}:{SEED}:{FORMAT}"
+            saved = dict(self._conn.execute("select key, value from meta").fetchall())
+            if saved.get("params") != params:
+                # 署名の作り方や保存形式が変わったら作り直す
+                self._conn.execute("drop table if exists signatures")
+                self._conn.execute("delete from meta where key = 'synced_id'")
+                saved.pop("synced_id", None)
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("insert or replace into meta values ('params', ?)", (params,))
+            self._conn.commit()
+            rows = self._conn.execute("select id, signature, content_hash from signatures").fetchall()
+        self.synced_id = int(saved.get("synced_id", 0))
+
+        for question_id, blob, content_hash in rows:
+            self.lsh.add(question_id, np.frombuffer(blob, dtype=np.uint32))
+            if content_hash:
+                self._hashes[_hash_key(content_hash)] = question_id
+
+    def __len__(self) -> int:
+        return len(self.lsh)
+
+    def add_many(self, rows: Iterable[Dict]) -> int:
+        """
+        id つきの問題行を取り込んで保存し、追加した件数を返す
+
+        取り込み済みの問題は、内容ハッシュが新しく分かった場合だけ保存し直す。
+        """
+        records = []
+        hash_updates = []
+        for row in rows:
+            content_hash = row.get("content_hash")
+            if row["id"] in self.lsh:
+                if content_hash and self._hashes.get(_hash_key(content_hash)) != row["id"]:
+                    self._hashes[_hash_key(content_hash)] = row["id"]
+                    hash_updates.append((content_hash, row["id"]))
+                continue
+            signature = self.lsh.signature(question_shingles(row))
+            self.lsh.add(row["id"], signature)
+            if content_hash:
+                self._hashes[_hash_key(content_hash)] = row["id"]
+            records.append((row["id"], signature.tobytes(), content_hash))
+        if records or hash_updates:
+            with self._lock:
+                self._conn.executemany(
+                    "insert or ignore into signatures (id, signature, content_hash)"
+                    " values (?, ?, ?)",
+                    records,
+                )
+                self._conn.executemany(
+                    "update signatures set content_hash = ? where id = ?", hash_updates
+                )
+                self._conn.commit()
+        return len(records)
+
+    def sync(self, fetch_since: Callable[[int], List[Dict]]) -> int:
+        """
+        前回取り込んだ位置より新しい問題を取り込み、取り込んだ件数を返す
+
+        fetch_since(last_id) は id > last_id の行を id 昇順で1ページ返す関数。
+        """
+        added = 0
+        while True:
+            rows = fetch_since(self.synced_id)
+            if not rows:
+                return added
+            added += self.add_many(rows)
+            self.synced_id = max(self.synced_id, rows[-1]["id"])
+            with self._lock:
+                self._conn.execute(
+                    "insert or replace into meta values ('synced_id', ?)", (str(self.synced_id),)
+                )
+                self._conn.commit()
+
+    def find_duplicate(self, row: Dict) -> Optional[int]:
+        """row と同じ内容（同じ content_hash）の登録済み問題の id"""
+        content_hash = row.get("content_hash") or quiz_content_hash(row)
+        return self._hashes.get(_hash_key(content_hash))
+
+    def find_similar(self, row: Dict) -> List[Tuple[int, float]]:
+        """row に似ている登録済みの問題 (id, 推定類似度) を類似度順で返す（削除済みの id を含むことがある）"""
+        return self.lsh.query(self.lsh.signature(question_shingles(row)), self.threshold)
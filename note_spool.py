@@ -0,0 +1,237 @@
+"""
+学習ノートの書き込みキュー（ローカル SQLite スプール + バックグラウンド送信）
+
+「ノートを保存」はスプールへの INSERT だけで返し、Supabase への送信は
+ワーカースレッドがまとめて行う。スプールはファイルなので Streamlit を
+再起動しても未送信のノートは残り、次の起動時に送信される。
+
+各ノートには client_id（UUID）を付けて送り、learning_notes 側の一意制約で
+同じノートの二重登録を防ぐ（送信は成功したが synced の記録前に落ちた場合など）。
+失敗したバッチの先頭のノートは次から1件だけで送り、NOTE_SPOOL_MAX_ATTEMPTS 回
+失敗したら failed にして後ろのノートを先に進める。
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from db import save_learning_notes_batch
+
+logger = logging.getLogger(__name__)
+
+# スプールの保存先と送信設定（環境変数で上書き可能）
+NOTE_SPOOL_PATH = os.getenv("NOTE_SPOOL_PATH", ".note_spool.sqlite3")
+NOTE_SPOOL_BATCH_SIZE = int(os.getenv("NOTE_SPOOL_BATCH_SIZE", "20"))
+NOTE_SPOOL_MAX_BACKOFF = float(os.getenv("NOTE_SPOOL_MAX_BACKOFF", "60"))
+NOTE_SPOOL_MAX_ATTEMPTS = int(os.getenv("NOTE_SPOOL_MAX_ATTEMPTS", "10"))
+
+PENDING = "pending"
+SYNCED = "synced"
+# 送信を諦めたノート（retry_failed で pending に戻せる）
+FAILED = "failed"
+
+_SCHEMA = """
+create table if not exists note_spool (
+    local_id    integer primary key autoincrement,
+    note_text   text    not null,
+    created_at  text    not null,
+    status      text    not null default 'pending',
+    attempts    integer not null default 0,
+    last_error  text,
+    synced_at   text,
+    client_id   text
+);
+create index if not exists note_spool_status_idx on note_spool (status, local_id);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class NoteSpool:
+    """ノートの永続キューと送信ワーカー"""
+
+    def __init__(
+        self,
+        path: str,
+        sender: Callable[[List[Dict]], None],
+        batch_size: int = NOTE_SPOOL_BATCH_SIZE,
+        base_backoff: float = 1.0,
+        max_backoff: float = NOTE_SPOOL_MAX_BACKOFF,
+        max_attempts: int = NOTE_SPOOL_MAX_ATTEMPTS,
+    ):
+        self.path = path
+        self.sender = sender
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self._conn.execute("pragma table_info(note_spool)")]
+        if "client_id" not in columns:
+            # client_id を持たない古いスプールファイル
+            self._conn.execute("alter table note_spool add column client_id text")
+        self._conn.execute(
+            "update note_spool set client_id = lower(hex(randomblob(16))) where client_id is null"
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._failures = 0
+
+    # ------------------------------
+    # 画面側から呼ぶ操作
+    # ------------------------------
+    def enqueue(self, note_text: str) -> int:
+        """ノートをスプールに追加してローカル id を返す（通信はしない）"""
+        with self._lock:
+            cur = self._conn.execute(
+                "insert into note_spool (note_text, created_at, client_id) values (?, ?, ?)",
+                (note_text, _now(), str(uuid.uuid4())),
+            )
+        self._wakeup.set()
+        return cur.lastrowid
+
+    def statuses(self, local_ids: Iterable[int]) -> Dict[int, Dict]:
+        """ローカル id ごとの送信状態（status / attempts / last_error）"""
+        ids = list(local_ids)
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                "select local_id, note_text, created_at, status, attempts, last_error"
+                f" from note_spool where local_id in ({placeholders})",
+                ids,
+            ).fetchall()
+        return {
+            row[0]: {
+                "note_text": row[1],
+                "created_at": row[2],
+                "status": row[3],
+                "attempts": row[4],
+                "last_error": row[5],
+            }
+            for row in rows
+        }
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "select count(*) from note_spool where status = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def retry_failed(self, local_ids: Iterable[int]) -> int:
+        """failed のノートを pending に戻し、戻した件数を返す"""
+        ids = list(local_ids)
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            cur = self._conn.execute(
+                "update note_spool set status = ?, attempts = 0"
+                f" where status = ? and local_id in ({placeholders})",
+                [PENDING, FAILED, *ids],
+            )
+        self._wakeup.set()
+        return cur.rowcount
+
+    # ------------------------------
+    # 送信
+    # ------------------------------
+    def flush_once(self) -> int:
+        """未送信のノートを1バッチ送信し、送信した件数を返す（失敗時は例外）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "select local_id, note_text, client_id, attempts from note_spool"
+                " where status = ? order by local_id limit ?",
+                (PENDING, self.batch_size),
+            ).fetchall()
+        if not rows:
+            return 0
+        if rows[0][3]:
+            # 前回失敗したノートは1件だけで送る（受け付けられない1件が後ろを巻き込まない）
+            rows = rows[:1]
+
+        local_ids = [row[0] for row in rows]
+        placeholders = ",".join("?" * len(local_ids))
+        try:
+            self.sender([{"note_text": row[1], "client_id": row[2]} for row in rows])
+        except Exception as e:
+            # 1件だけで送っても上限回数まで失敗したら諦める
+            give_up = len(rows) == 1 and rows[0][3] + 1 >= self.max_attempts
+            with self._lock:
+                self._conn.execute(
+                    "update note_spool set attempts = attempts + 1, last_error = ?, status = ?"
+                    f" where local_id in ({placeholders})",
+                    [str(e)[:500], FAILED if give_up else PENDING, *local_ids],
+                )
+            raise
+
+        with self._lock:
+            self._conn.execute(
+                "update note_spool set status = ?, synced_at = ?, last_error = null"
+                f" where local_id in ({placeholders})",
+                [SYNCED, _now(), *local_ids],
+            )
+        return len(rows)
+
+    def _backoff(self) -> float:
+        delay = min(self.base_backoff * (2 ** (self._failures - 1)), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent = self.flush_once()
+            except Exception as e:  # noqa: BLE001 - 送信エラーは再試行する
+                self._failures += 1
+                delay = self._backoff()
+                logger.warning("note spool: send failed (%s); retry in %.1fs", e, delay)
+                self._stop.wait(delay)
+                continue
+
+            self._failures = 0
+            if not sent:
+                # 新しいノートが来るまで待つ（取りこぼし対策で定期的にも確認）
+                self._wakeup.wait(5.0)
+                self._wakeup.clear()
+
+    def start(self) -> None:
+        """送信ワーカーを起動する（起動済みなら何もしない）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="note-spool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_spool: Optional[NoteSpool] = None
+_spool_lock = threading.Lock()
+
+
+def get_note_spool() -> NoteSpool:
+    """プロセス内で共有するスプールを返す（初回にワーカーも起動）"""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                spool = NoteSpool(NOTE_SPOOL_PATH, sender=save_learning_notes_batch)
+                spool.start()
+                _spool = spool
+    return _spool
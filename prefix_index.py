@@ -0,0 +1,88 @@
+"""
+用語名の前方一致インデックス（インクリメンタル検索用）
+
+用語名と読み（ローマ字）を語に分けた検索キーをソート済み配列で持ち、
+前方一致の範囲を bisect で求める。1文字打ち足したときは、直前のクエリの範囲
+の中だけを二分探索すればよいので、範囲をクエリごとに覚えておいて使い回す。
+"""
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from search_index import normalize_text, reading_key
+
+_WORD_SPLIT = re.compile(r"[\s()（）・/]+")
+
+# 覚えておくクエリ範囲の数
+RANGE_CACHE_SIZE = 4096
+
+
+def name_keys(term: Dict) -> List[str]:
+    """用語の前方一致キー（名前全体・名前の各語・読みの各語）"""
+    name = normalize_text(term["name"])
+    keys = [name]
+    keys.extend(w for w in _WORD_SPLIT.split(name) if w)
+    keys.extend(w for w in _WORD_SPLIT.split(reading_key(term["name"])) if w)
+    return list(dict.fromkeys(keys))
+
+
+class PrefixIndex:
+    """ソート済みキー配列による前方一致検索"""
+
+    def __init__(self, terms: Iterable[Dict]):
+        pairs = sorted(
+            (key, pos) for pos, term in enumerate(terms) for key in name_keys(term)
+        )
+        self._keys: List[str] = [k for k, _ in pairs]
+        self._positions = np.array([p for _, p in pairs], dtype=np.int32)
+        self._num_terms = int(self._positions.max()) + 1 if len(pairs) else 0
+        self._ranges: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key_range(self, prefix: str) -> Tuple[int, int]:
+        """prefix で始まるキーの範囲 [lo, hi)"""
+        lo, hi = 0, len(self._keys)
+        with self._lock:
+            # 覚えている中で最も長い prefix の先頭部分の範囲から絞り込む
+            for end in range(len(prefix), 0, -1):
+                known = self._ranges.get(prefix[:end])
+                if known is not None:
+                    self._ranges.move_to_end(prefix[:end])
+                    if end == len(prefix):
+                        return known
+                    lo, hi = known
+                    break
+
+        lo = bisect_left(self._keys, prefix, lo, hi)
+        # prefix で始まる最後のキーの次（prefix + 最大の文字より前）
+        hi = bisect_right(self._keys, prefix + "\U0010ffff", lo, hi)
+        with self._lock:
+            self._ranges[prefix] = (lo, hi)
+            while len(self._ranges) > RANGE_CACHE_SIZE:
+                self._ranges.popitem(last=False)
+        return lo, hi
+
+    def search(self, query: str, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """名前か読みのどれかの語が query で始まる用語の位置（昇順）"""
+        prefix = normalize_text(query.strip())
+        if not prefix:
+            return np.empty(0, dtype=np.int32)
+        # 1用語が複数のキーで当たるので、bool 配列に立ててから位置に戻す
+        hit = np.zeros(self._num_terms, dtype=bool)
+        lo, hi = self.key_range(prefix)
+        hit[self._positions[lo:hi]] = True
+        # かなで打ったクエリ（"こみ" など）はローマ字の読みの語にも当てる
+        reading = reading_key(query.strip())
+        if reading != prefix:
+            lo, hi = self.key_range(reading)
+            hit[self._positions[lo:hi]] = True
+        if allowed is not None:
+            hit &= allowed[:self._num_terms]
+        return np.flatnonzero(hit)
@@ -0,0 +1,210 @@
+"""
+再実行（rerun）のプロファイリング
+
+1回の実行を Trace とし、その中の区間を Span として記録する。
+    discard_trace()                実行の先頭で、中断された前回の実行のトレースを捨てる
+    start_trace("辞書モード")     実行の先頭で開始
+    section("サイドバー")          トップレベルの区間を切り替える（前の区間は閉じる）
+    with span("フィルタ"): ...     入れ子の区間
+    @traced("db.load_quiz_question")  関数全体を区間にする
+    finish_trace()                 実行の最後で終了して Trace を返す
+
+トレース中でないスレッド（バックグラウンドの送信スレッドなど）では何もしない。
+記録したトレースは JSON と Chrome のトレース形式（chrome://tracing / Perfetto）で書き出せる。
+"""
+import functools
+import html
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("profiling_trace", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    # トレース開始からの経過（ミリ秒）
+    start_ms: float
+    end_ms: Optional[float] = None
+    depth: int = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ms or self.start_ms) - self.start_ms
+
+
+@dataclass
+class Trace:
+    label: str
+    # 開始時刻（UNIX 時間、秒）
+    started_at: float = field(default_factory=time.time)
+    spans: List[Span] = field(default_factory=list)
+    duration_ms: float = 0.0
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+    _stack: List[int] = field(default_factory=list, repr=False)
+    _section: Optional[int] = field(default=None, repr=False)
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def open(self, name: str) -> int:
+        self.spans.append(Span(name, self._now_ms(), depth=len(self._stack)))
+        self._stack.append(len(self.spans) - 1)
+        return self._stack[-1]
+
+    def close(self, index: int) -> None:
+        # 内側で閉じ忘れた区間もまとめて閉じる
+        while self._stack:
+            top = self._stack.pop()
+            self.spans[top].end_ms = self._now_ms()
+            if top == index:
+                return
+
+    def switch_section(self, name: str) -> None:
+        if self._section is not None:
+            self.close(self._section)
+        self._section = self.open(name)
+
+    def finish(self) -> None:
+        while self._stack:
+            self.close(self._stack[-1])
+        self.duration_ms = self._now_ms()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": [asdict(s) for s in self.spans],
+        }
+
+
+def start_trace(label: str) -> Trace:
+    """この実行のトレースを開始する"""
+    trace = Trace(label)
+    _current.set(trace)
+    return trace
+
+
+def discard_trace() -> None:
+    """
+    記録中のトレースを終了せずに捨てる
+
+    st.rerun() などで実行が途中で止まると finish_trace() まで届かず、次の実行にも
+    同じトレースが残る（プロファイリングをやめたあとも記録し続ける）。
+    """
+    _current.set(None)
+
+
+def finish_trace() -> Optional[Trace]:
+    """この実行のトレースを終了して返す（開始していなければ None）"""
+    trace = _current.get()
+    if trace is None:
+        return None
+    trace.finish()
+    _current.set(None)
+    return trace
+
+
+def section(name: str) -> None:
+    """トップレベルの区間を name に切り替える"""
+    trace = _current.get()
+    if trace is not None:
+        trace.switch_section(name)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    index = trace.open(name)
+    try:
+        yield
+    finally:
+        trace.close(index)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """関数の呼び出しを区間として記録するデコレータ"""
+
+    def decorator(func: Callable) -> Callable:
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            index = trace.open(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.close(index)
+
+        return wrapper
+
+    return decorator
+
+
+# ==============================
+# 書き出し・表示
+# ==============================
+def to_chrome_trace(traces: Sequence[Trace]) -> Dict[str, Any]:
+    """Chrome のトレース形式（"X" イベント、マイクロ秒）"""
+    events = []
+    for trace in traces:
+        base_us = trace.started_at * 1_000_000
+        events.append(
+            {
+                "name": trace.label,
+                "ph": "X",
+                "ts": base_us,
+                "dur": trace.duration_ms * 1000,
+                "pid": 1,
+                "tid": 1,
+            }
+        )
+        for s in trace.spans:
+            events.append(
+                {
+                    "name": s.name,
+                    "ph": "X",
+                    "ts": base_us + s.start_ms * 1000,
+                    "dur": s.duration_ms * 1000,
+                    "pid": 1,
+                    "tid": 1,
+                }
+            )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def flame_html(trace: Trace, row_height: int = 22) -> str:
+    """区間を深さごとの横棒で並べた HTML（幅は実行全体に対する割合）"""
+    total = trace.duration_ms or 1.0
+    depth = max((s.depth for s in trace.spans), default=-1) + 2
+    label = html.escape(trace.label)
+    bars = [
+        f'<div title="{label} {trace.duration_ms:.1f} ms" style="position:absolute;'
+        f"left:0;width:100%;top:0;height:{row_height - 2}px;background:#fbcfe8;"
+        f'font-size:12px;overflow:hidden;white-space:nowrap;">'
+        f"{label} {trace.duration_ms:.1f} ms</div>"
+    ]
+    for s in trace.spans:
+        name = html.escape(s.name)
+        left = s.start_ms / total * 100
+        width = max(s.duration_ms / total * 100, 0.2)
+        bars.append(
+            f'<div title="{name} {s.duration_ms:.1f} ms" style="position:absolute;'
+            f"left:{left:.2f}%;width:{width:.2f}%;top:{(s.depth + 1) * row_height}px;"
+            f"height:{row_height - 2}px;background:{'#bfdbfe' if s.depth % 2 else '#93c5fd'};"
+            f'border-right:1px solid #fff;font-size:12px;overflow:hidden;white-space:nowrap;">'
+            f"{name} {s.duration_ms:.1f} ms</div>"
+        )
+    return (
+        f'<div style="position:relative;height:{depth * row_height}px;">' + "".join(bars) + "</div>"
+    )
@@ -0,0 +1,130 @@
+"""
+クイズセッション
+
+出題する問題セットを1回だけ取得して session_state に固定し、
+回答・採点はその固定したセットに対して行う（ラジオ操作のたびに再取得しない）。
+"""
+import hashlib
+import itertools
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+_session_counter = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class QuizQuestion:
+    """出題用に整形した1問（正解は取得時に計算済み）"""
+
+    id: int
+    question_text: str
+    choices: Tuple[str, str, str, str]
+    correct_index: int
+    explanation: str = ""
+
+    @property
+    def correct_text(self) -> str:
+        return self.choices[self.correct_index]
+
+    @classmethod
+    def from_row(cls, row: Dict) -> "QuizQuestion":
+        correct_index = (row.get("correct_choice") or 1) - 1
+        correct_index = max(0, min(correct_index, 3))
+        return cls(
+            id=row["id"],
+            question_text=row["question_text"],
+            choices=(row["choice_1"], row["choice_2"], row["choice_3"], row["choice_4"]),
+            correct_index=correct_index,
+            explanation=row.get("explanation") or "",
+        )
+
+
+@dataclass(frozen=True)
+class QuizResult:
+    question: QuizQuestion
+    user_answer: Optional[str]
+
+    @property
+    def is_correct(self) -> bool:
+        return self.user_answer == self.question.correct_text
+
+
+@dataclass
+class QuizSession:
+    """1回分のクイズ（問題セットと回答用ウィジェットキー）"""
+
+    questions: List[QuizQuestion]
+    session_no: int = field(default_factory=lambda: next(_session_counter))
+
+    @classmethod
+    def start(cls, loader: Callable[[], List[Dict]]) -> "QuizSession":
+        """loader で問題を1回だけ取得して新しいセッションを作る"""
+        return cls([QuizQuestion.from_row(row) for row in loader()])
+
+    def answer_key(self, question: QuizQuestion) -> str:
+        """ラジオボタンの key（セッションごとに変えて前回の回答を持ち越さない）"""
+        return f"quiz_q_{self.session_no}_{question.id}"
+
+    def grade(self, answers: Dict[str, Optional[str]]) -> List[QuizResult]:
+        """answers（answer_key -> 回答）で採点する"""
+        return [QuizResult(q, answers.get(self.answer_key(q))) for q in self.questions]
+
+    @staticmethod
+    def score(results: List[QuizResult]) -> int:
+        return sum(1 for r in results if r.is_correct)
+
+
+# ==============================
+# 登録時の入力チェック（フォーム・一括登録で共通）
+# ==============================
+def validate_quiz_question(row: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    登録用の1問をチェックして (整形済みの行, None) か (None, エラーメッセージ) を返す
+
+    問題文があること、4つの選択肢がすべてあること、正解番号が 1〜4 であること。
+    """
+    def text(name: str) -> str:
+        value = row.get(name)
+        return "" if value is None else str(value).strip()
+
+    question_text = text("question_text")
+    if not question_text:
+        return None, "問題文を入力してください。"
+
+    choices = [text(f"choice_{no}") for no in range(1, 5)]
+    if not all(choices):
+        return None, "4つすべての選択肢を入力してください。"
+
+    try:
+        correct_choice = int(text("correct_choice"))
+    except ValueError:
+        correct_choice = 0
+    if not 1 <= correct_choice <= 4:
+        return None, "正解の選択肢番号は 1〜4 で指定してください。"
+
+    return (
+        {
+            "question_text": question_text,
+            "choice_1": choices[0],
+            "choice_2": choices[1],
+            "choice_3": choices[2],
+            "choice_4": choices[3],
+            "correct_choice": correct_choice,
+            "explanation": text("explanation"),
+            "category": text("category") or None,
+        },
+        None,
+    )
+
+
+def _normalize_for_hash(text: str) -> str:
+    # 全角半角・大文字小文字・空白の違いは同じ内容とみなす
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def quiz_content_hash(row: Dict) -> str:
+    """問題文と4つの選択肢から作る重複判定用のハッシュ（冪等キー）"""
+    parts = [row.get("question_text") or ""] + [row.get(f"choice_{no}") or "" for no in range(1, 5)]
+    joined = "\x1f".join(_normalize_for_hash(str(p)) for p in parts)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
@@ -0,0 +1,159 @@
+"""
+登録済みクイズ問題の content_hash の埋め戻し（migrations/003 の適用後に1回実行）
+
+003 で追加した content_hash 列は既存の行では NULL のままなので、一意制約が
+登録済みの問題と一致しない。content_hash が NULL の行を id 順に読み、
+quiz.quiz_content_hash で計算した値を書き込む。
+
+    python -m quiz_hash_backfill
+    python -m quiz_hash_backfill --dry-run
+
+既存の行どうしで内容が同じものは、id が最も小さい行（またはすでにハッシュを
+持っている行）にだけ書き込み、残りは NULL のまま一覧に出す（確認して削除する）。
+途中で止まっても、もう一度実行すれば残りの行から続ける。
+実行したホストの類似重複インデックスにもハッシュを入れる。他のホストでは
+インデックスのファイル（NEAR_DUP_INDEX_PATH）を消すと次の起動時に作り直される。
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from db import PAGE_SIZE, get_client, get_near_dup_index
+from quiz import quiz_content_hash
+
+# in_ で一度に問い合わせるハッシュの数（URL が長くなりすぎないように）
+HASH_LOOKUP_CHUNK = 100
+
+# 一意制約違反（PostgreSQL の unique_violation）
+UNIQUE_VIOLATION = "23505"
+
+
+@dataclass
+class BackfillReport:
+    """埋め戻しの結果"""
+
+    updated: int = 0
+    # (NULL のまま残した行の id, 同じ内容の行の id)。後者は分からない場合 None
+    duplicates: List[Tuple[int, Optional[int]]] = field(default_factory=list)
+    rows_read: int = 0
+    elapsed: float = 0.0
+
+
+def _existing_hash_ids(hashes: List[str]) -> Dict[str, int]:
+    """登録済みのハッシュ -> その行の id"""
+    found: Dict[str, int] = {}
+    for i in range(0, len(hashes), HASH_LOOKUP_CHUNK):
+        rows = (
+            get_client().table("git_quiz_questions")
+            .select("id,content_hash")
+            .in_("content_hash", hashes[i:i + HASH_LOOKUP_CHUNK])
+            .execute()
+            .data
+            or []
+        )
+        found.update((row["content_hash"], row["id"]) for row in rows)
+    return found
+
+
+def _write(rows: List[Dict], report: BackfillReport) -> List[Dict]:
+    """
+    content_hash がまだ NULL の行にだけ値を書き込み、書き込んだ行を返す
+
+    行ごとに値が違うので1行1リクエスト。id と content_hash is null で絞るので
+    他の列は書き換えず、別の実行がすでに埋めた行もそのままにする。
+    """
+    written = []
+    for row in rows:
+        try:
+            written.extend(
+                get_client().table("git_quiz_questions")
+                .update({"content_hash": row["content_hash"]})
+                .eq("id", row["id"])
+                .is_("content_hash", "null")
+                .execute()
+                .data
+                or []
+            )
+        except APIError as e:
+            if e.code != UNIQUE_VIOLATION:
+                raise
+            # 確認してから書き込むまでに同じ内容の問題が登録された
+            report.duplicates.append((row["id"], None))
+    return written
+
+
+def backfill_content_hashes(page_size: int = PAGE_SIZE, dry_run: bool = False) -> BackfillReport:
+    """content_hash が NULL の行に値を入れる（dry_run では書き込まずに件数だけ数える）"""
+    report = BackfillReport()
+    start = time.perf_counter()
+    last_id = 0
+    # この実行で書き込んだ（dry_run では書き込むはずの）ハッシュ -> id
+    claimed: Dict[str, int] = {}
+    while True:
+        rows = (
+            get_client().table("git_quiz_questions")
+            .select("*")
+            .is_("content_hash", "null")
+            .gt("id", last_id)
+            .order("id")
+            .limit(page_size)
+            .execute()
+            .data
+            or []
+        )
+        if not rows:
+            break
+        report.rows_read += len(rows)
+        last_id = rows[-1]["id"]
+
+        hashes = {row["id"]: quiz_content_hash(row) for row in rows}
+        owners = _existing_hash_ids(sorted(set(hashes.values())))
+        to_write = []
+        for row in rows:
+            content_hash = hashes[row["id"]]
+            owner = owners.get(content_hash, claimed.get(content_hash))
+            if owner is not None:
+                report.duplicates.append((row["id"], owner))
+                continue
+            claimed[content_hash] = row["id"]
+            to_write.append({**row, "content_hash": content_hash})
+
+        if to_write and not dry_run:
+            written = _write(to_write, report)
+            report.updated += len(written)
+            # このホストの類似重複インデックスにもハッシュを入れる
+            get_near_dup_index().add_many(written)
+        elif dry_run:
+            report.updated += len(to_write)
+
+        report.elapsed = time.perf_counter() - start
+        print(f"\rid {last_id} まで確認（更新 {report.updated} 件）", end="", file=sys.stderr)
+
+    print(file=sys.stderr)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="登録済みクイズ問題の content_hash を埋め戻します。")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに件数だけ表示する")
+    args = parser.parse_args(argv)
+
+    report = backfill_content_hashes(args.page_size, args.dry_run)
+    for row_id, owner in report.duplicates:
+        same = f"id {owner} と同じ内容" if owner is not None else "同じ内容の問題が登録済み"
+        print(f"id {row_id}: {same}のため NULL のままにしました")
+    print(
+        f"{'更新予定' if args.dry_run else '更新'} {report.updated} 件 / "
+        f"重複 {len(report.duplicates)} 件 / {report.rows_read} 行を {report.elapsed:.1f} 秒"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
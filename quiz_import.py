@@ -0,0 +1,231 @@
+"""
+クイズ問題の一括登録（CSV / JSONL）
+
+ファイルを1行ずつ読みながらフォームと同じチェックをかけ、batch_size 件ずつ
+まとめて git_quiz_questions に INSERT する。途中で送信に失敗した場合は
+最後に成功した行番号から再開できる。
+
+    python -m quiz_import questions.csv --batch-size 500
+    python -m quiz_import questions.jsonl --resume
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from db import find_similar_quiz_questions, insert_quiz_questions_batch
+from near_dup import NearDuplicateIndex
+from quiz import quiz_content_hash, validate_quiz_question
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class ImportReport:
+    """一括登録の結果"""
+
+    inserted: int = 0
+    # 登録済み・ファイル内で重複していたため追加しなかった件数
+    duplicates: int = 0
+    # (行番号, エラーメッセージ)。行番号はデータ行の 1 始まり
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    # 登録済みとみなせる最後の行番号（再開時はこの次の行から）
+    last_committed_row: int = 0
+    # 送信に失敗して中断した場合のエラー
+    aborted: Optional[str] = None
+    elapsed: float = 0.0
+    rows_read: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(filename: str) -> str:
+    """拡張子から "csv" / "jsonl" を判定"""
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def iter_quiz_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(行番号, 行データ, 読み取りエラー) を1行ずつ返す"""
+    if fmt == "csv":
+        for row_no, row in enumerate(csv.DictReader(stream), start=1):
+            yield row_no, row, None
+        return
+
+    row_no = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, None, f"JSON として読めません: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield row_no, None, "1行に1つの JSON オブジェクトを書いてください。"
+            continue
+        yield row_no, row, None
+
+
+def import_quiz_questions(
+    stream: IO[str],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_after_row: int = 0,
+    inserter: Callable[[List[Dict]], int] = insert_quiz_questions_batch,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+    similar_check: Optional[Callable[[Dict], List[Tuple[int, float]]]] = None,
+) -> ImportReport:
+    """
+    stream の問題を batch_size 件ずつ登録する
+
+    start_after_row までの行は読み飛ばす（前回の last_committed_row を渡すと再開）。
+    チェックに通らない行は errors に記録して登録しない。
+    similar_check を渡すと、似ている登録済み問題がある行と、ファイル内の前の行に
+似ている行もエラーとして登録しない（完全に同じ内容の行は重複として数える）。
+    バッチの送信に失敗した時点で中断し、aborted にエラーを入れて返す。
+    """
+    report = ImportReport(last_committed_row=start_after_row)
+    batch: List[Dict] = []
+    batch_last_row = start_after_row
+    start = time.perf_counter()
+    # ファイル内でまだ登録していない行どうしの類似判定用（id は行番号）
+    file_index = NearDuplicateIndex(":memory:") if similar_check else None
+
+    def flush() -> bool:
+        nonlocal batch
+        if batch:
+            try:
+                inserted = inserter(batch)
+            except Exception as e:  # noqa: BLE001 - 送信エラーは結果として返す
+                report.aborted = str(e)
+                return False
+            report.inserted += inserted
+            report.duplicates += len(batch) - inserted
+            batch = []
+        report.last_committed_row = batch_last_row
+        report.elapsed = time.perf_counter() - start
+        if on_progress:
+            on_progress(report)
+        return True
+
+    for row_no, row, read_error in iter_quiz_rows(stream, fmt):
+        if row_no <= start_after_row:
+            continue
+        report.rows_read += 1
+        batch_last_row = row_no
+
+        if read_error:
+            report.errors.append((row_no, read_error))
+        else:
+            cleaned, error = validate_quiz_question(row)
+            similar = similar_check(cleaned) if cleaned and similar_check else None
+            similar_in_file = None
+            if cleaned and file_index is not None and not similar:
+                cleaned["content_hash"] = quiz_content_hash(cleaned)
+                # 完全に同じ内容の行は insert_quiz_questions_batch が重複として数える
+                if file_index.find_duplicate(cleaned) is None:
+                    similar_in_file = file_index.find_similar(cleaned)
+            if error:
+                report.errors.append((row_no, error))
+            elif similar:
+                question_id, score = similar[0]
+                report.errors.append(
+                    (row_no, f"似ている問題が登録済みです（id {question_id}、類似度 {score:.0%}）")
+                )
+            elif similar_in_file:
+                other_row, score = similar_in_file[0]
+                report.errors.append(
+                    (row_no, f"{other_row} 行目と似ています（類似度 {score:.0%}）")
+                )
+            else:
+                if file_index is not None:
+                    file_index.add_many([{**cleaned, "id": row_no}])
+                batch.append(cleaned)
+
+        if len(batch) >= batch_size and not flush():
+            break
+    else:
+        flush()
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+# ==============================
+# CLI
+# ==============================
+def _progress_path(path: str) -> str:
+    return path + ".progress"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="クイズ問題を CSV / JSONL から一括登録します。")
+    parser.add_argument("path", help="CSV または JSONL ファイル")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="省略時は拡張子で判定")
+    parser.add_argument(
+        "--allow-similar",
+        action="store_true",
+        help="似ている問題が登録済みでも登録する（完全に同じ内容は常に登録しない）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="前回中断した位置（<path>.progress）から再開する",
+    )
+    args = parser.parse_args(argv)
+
+    start_after_row = 0
+    progress_path = _progress_path(args.path)
+    if args.resume and os.path.exists(progress_path):
+        with open(progress_path, encoding="utf-8") as f:
+            start_after_row = json.load(f)["last_committed_row"]
+        print(f"{start_after_row} 行目まで登録済みのため、その次の行から再開します。")
+
+    def save_progress(report: ImportReport) -> None:
+        with open(progress_path, "w", encoding="utf-8") as f:
+            json.dump({"last_committed_row": report.last_committed_row}, f)
+        print(
+            f"\r{report.last_committed_row} 行目まで完了"
+            f"（登録 {report.inserted} 件 / {report.rows_per_sec:.0f} 行/秒）",
+            end="",
+            file=sys.stderr,
+        )
+
+    with open(args.path, encoding="utf-8-sig", newline="") as stream:
+        report = import_quiz_questions(
+            stream,
+            args.format or detect_format(args.path),
+            batch_size=args.batch_size,
+            start_after_row=start_after_row,
+            on_progress=save_progress,
+            similar_check=None if args.allow_similar else find_similar_quiz_questions,
+        )
+    print(file=sys.stderr)
+
+    for row_no, error in report.errors:
+        print(f"{row_no} 行目: {error}")
+    print(
+        f"登録 {report.inserted} 件 / 重複 {report.duplicates} 件 / エラー {len(report.errors)} 件 / "
+        f"{report.rows_read} 行を {report.elapsed:.1f} 秒（{report.rows_per_sec:.0f} 行/秒）"
+    )
+
+    if report.aborted:
+        print(f"送信に失敗したため中断しました: {report.aborted}")
+        print("--resume を付けて再実行すると続きから登録します。")
+        return 1
+
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+用語検索用の n-gram 転置インデックス
+
+日本語は単語境界がないため、文字単位の 1〜3-gram で転置インデックスを作り、
+クエリの n-gram の積集合で候補を絞ってから部分一致で確認する。
+ポスティングはフィールドごとに昇順の numpy 配列で持ち、積集合は numpy で取る。
+
+検索キーは構築時に1回だけ作る（NFKC・大文字小文字・カタカナ→ひらがな、
+用語名はローマ字読みも）。クエリも同じ関数で正規化するので
+「コミット」「こみっと」「komitto」「ｃｏｍｍｉｔ」が同じ用語に当たる。
+完全一致が足りないときは、用語名に対して編集距離で打ち間違いを許す検索を
+FUZZY_MAX_CELLS の計算量の範囲で行う（時間で打ち切らないので、同じクエリには
+いつも同じ結果を返し、結果をキャッシュしてよい）。
+"""
+import unicodedata
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from kana import katakana_to_hiragana, to_romaji
+
+# 検索対象フィールドとスコア（名前一致 > 名前の読み > 一言説明 > 詳細説明 > 使用例）
+SEARCH_FIELDS: Tuple[Tuple[str, int], ...] = (
+    ("name", 100),
+    ("name_reading", 90),
+    ("short_description", 30),
+    ("full_description", 10),
+    ("examples", 5),
+)
+
+MAX_GRAM = 3
+
+# 打ち間違いを許す検索（用語名と読みのみ）
+FUZZY_FIELDS = ("name", "name_reading")
+FUZZY_MIN_QUERY = 3
+FUZZY_MAX_CANDIDATES = 200
+# 編集距離の表のマス数（クエリ長 × 用語名の長さ）の合計の上限。数 ms 程度
+FUZZY_MAX_CELLS = 10_000
+# 1文字違いは 2、2文字違いは 1（完全一致のどのフィールドよりも下）
+FUZZY_WEIGHT = 3
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def normalize_text(text: str) -> str:
+    """検索用の正規化（全角半角・大文字小文字・カタカナとひらがなを区別しない）"""
+    return katakana_to_hiragana(unicodedata.normalize("NFKC", text).casefold())
+
+
+def reading_key(text: str) -> str:
+    """読みのキー（正規化したうえでかなをローマ字にする）"""
+    return to_romaji(normalize_text(text))
+
+
+# フィールドごとの (元にする項目, キー関数)。クエリにも同じキー関数をかける
+_FIELD_KEYS: Dict[str, Tuple[str, Callable[[str], str]]] = {
+    "name_reading": ("name", reading_key),
+}
+
+
+def _key_func(field: str) -> Callable[[str], str]:
+    return _FIELD_KEYS.get(field, (field, normalize_text))[1]
+
+
+def _field_text(term: Dict, field: str) -> str:
+    source, key_func = _FIELD_KEYS.get(field, (field, normalize_text))
+    value = term.get(source) or ""
+    if isinstance(value, (list, tuple)):
+        value = "\n".join(str(v) for v in value)
+    return key_func(str(value))
+
+
+def _max_typos(query: str) -> int:
+    return 1 if len(query) <= 5 else 2
+
+
+def _substring_distance(query: str, text: str, max_dist: int) -> int:
+    """text のどこかの部分文字列と query の最小編集距離（max_dist を超えたら max_dist + 1）"""
+    prev = [0] * (len(text) + 1)
+    for i, qc in enumerate(query, start=1):
+        cur = [i]
+        for j, tc in enumerate(text, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (qc != tc)))
+        if min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return min(prev)
+
+
+def _all_grams(text: str) -> set:
+    return {
+        text[i:i + n]
+        for n in range(1, MAX_GRAM + 1)
+        for i in range(len(text) - n + 1)
+    }
+
+
+def _query_grams(query: str) -> List[str]:
+    """クエリ長に応じた n-gram（短いクエリは 1-gram / 2-gram）"""
+    n = min(len(query), MAX_GRAM)
+    return list(dict.fromkeys(query[i:i + n] for i in range(len(query) - n + 1)))
+
+
+class NgramIndex:
+    """用語リストに対する文字 n-gram 転置インデックス"""
+
+    def __init__(self, terms: Sequence[Dict]):
+        self.terms = terms
+        # texts[field_no][doc_id]: 正規化済みテキスト（部分一致の確認用）
+        self._texts: List[List[str]] = [[] for _ in SEARCH_FIELDS]
+        # postings[field_no][gram]: その gram を含む用語インデックス（昇順）
+        self._postings: List[Dict[str, np.ndarray]] = []
+
+        building: List[Dict[str, List[int]]] = [{} for _ in SEARCH_FIELDS]
+        for doc_id, term in enumerate(terms):
+            for field_no, (field, _) in enumerate(SEARCH_FIELDS):
+                text = _field_text(term, field)
+                self._texts[field_no].append(text)
+                field_postings = building[field_no]
+                for gram in _all_grams(text):
+                    ids = field_postings.get(gram)
+                    if ids is None:
+                        field_postings[gram] = [doc_id]
+                    else:
+                        ids.append(doc_id)
+
+        for field_postings in building:
+            self._postings.append(
+                {gram: np.array(ids, dtype=np.int32) for gram, ids in field_postings.items()}
+            )
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _field_candidates(self, field_no: int, grams: List[str]) -> np.ndarray:
+        field_postings = self._postings[field_no]
+        arrays = []
+        for gram in grams:
+            ids = field_postings.get(gram)
+            if ids is None:
+                return _EMPTY
+            arrays.append(ids)
+        arrays.sort(key=len)
+        result = arrays[0]
+        for ids in arrays[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    @staticmethod
+    def _verified(
+        candidates: np.ndarray,
+        texts: List[str],
+        q: str,
+        needs_verify: bool,
+        need: Optional[int] = None,
+    ) -> Iterator[int]:
+        """候補のうち実際に部分一致するものを先頭から need 件まで返す"""
+        if not needs_verify:
+            if need is not None:
+                candidates = candidates[:need]
+            yield from candidates.tolist()
+            return
+        found = 0
+        for d in candidates.tolist():
+            if q in texts[d]:
+                yield d
+                found += 1
+                if need is not None and found >= need:
+                    return
+
+    def search_scored(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        クエリにヒットした (用語インデックス, スコア) をスコア順で返す
+
+        スコアは一致した最上位フィールドの重みで決まり、同順位は用語の登録順。
+        allowed（用語数と同じ長さの bool 配列）を渡すと、その用語だけを対象にする。
+        limit 件たまった時点で下位フィールドの確認を打ち切る。
+        """
+        query = query.strip()
+        if not normalize_text(query):
+            return []
+
+        seen = np.zeros(len(self.terms), dtype=bool)
+        hits: List[Tuple[int, int]] = []
+        keys = [_key_func(field)(query) for field, _ in SEARCH_FIELDS]
+
+        for field_no, (_, weight) in enumerate(SEARCH_FIELDS):
+            q = keys[field_no]
+            if not q:
+                continue
+            grams = _query_grams(q)
+            # クエリが MAX_GRAM 文字以下なら gram 自体がクエリなので確認不要
+            needs_verify = len(q) > MAX_GRAM
+            candidates = self._field_candidates(field_no, grams)
+            if not len(candidates):
+                continue
+            keep = ~seen[candidates]
+            if allowed is not None:
+                keep &= allowed[candidates]
+            candidates = candidates[keep]
+
+            texts = self._texts[field_no]
+            need = None if limit is None else limit - len(hits)
+            if field_no == 0:
+                # 名前の前方一致を先頭に（スコア +1）。前方一致だけで足りれば打ち切る
+                prefix: List[int] = []
+                matched = []
+                for d in self._verified(candidates, texts, q, needs_verify):
+                    if texts[d].startswith(q):
+                        prefix.append(d)
+                        if need is not None and len(prefix) >= need:
+                            break
+                    else:
+                        matched.append(d)
+                hits.extend((d, weight + 1) for d in prefix)
+                seen[prefix] = True
+            else:
+                matched = list(self._verified(candidates, texts, q, needs_verify, need))
+
+            hits.extend((d, weight) for d in matched)
+            seen[matched] = True
+            if limit is not None and len(hits) >= limit:
+                return hits[:limit]
+
+        need = None if limit is None else limit - len(hits)
+        hits.extend(self._fuzzy(keys, need, allowed, seen))
+        return hits if limit is None else hits[:limit]
+
+    def _fuzzy(
+        self,
+        keys: List[str],
+        need: Optional[int],
+        allowed: Optional[np.ndarray],
+        seen: np.ndarray,
+    ) -> List[Tuple[int, int]]:
+        """
+        用語名・読みに対する打ち間違いを許す検索（完全一致しなかった用語のみ）
+
+        共有する 2-gram の数（q-gram 補題の下限）で候補を絞り、多い順に
+        FUZZY_MAX_CANDIDATES 件まで編集距離を確認する。計算したマス数が
+        FUZZY_MAX_CELLS を超えたらそこまでの結果で打ち切る。
+        """
+        cells = 0
+        distances: Dict[int, int] = {}
+        field_nos = [no for no, (field, _) in enumerate(SEARCH_FIELDS) if field in FUZZY_FIELDS]
+
+        for field_no in field_nos:
+            q = keys[field_no]
+            if len(q) < FUZZY_MIN_QUERY:
+                continue
+            max_dist = _max_typos(q)
+            # 1文字の編集で壊れる 2-gram は最大2つ。短いクエリでは下限が 0 以下になるので、
+            # 少なくとも1つは共有する用語だけを候補にする（真ん中の1文字違いは拾えない）
+            min_shared = max(1, len(q) - 1 - 2 * max_dist)
+            field_postings = self._postings[field_no]
+            arrays = [
+                field_postings[gram]
+                for gram in dict.fromkeys(q[i:i + 2] for i in range(len(q) - 1))
+                if gram in field_postings
+            ]
+            if not arrays:
+                continue
+            counts = np.bincount(np.concatenate(arrays), minlength=len(self.terms))
+            counts[seen] = 0
+            if allowed is not None:
+                counts[~allowed] = 0
+            candidates = np.flatnonzero(counts >= min_shared)
+            if len(candidates) > FUZZY_MAX_CANDIDATES:
+                order = np.argsort(-counts[candidates], kind="stable")
+                candidates = candidates[order[:FUZZY_MAX_CANDIDATES]]
+
+            texts = self._texts[field_no]
+            for d in candidates.tolist():
+                cells += len(q) * len(texts[d])
+                if cells > FUZZY_MAX_CELLS:
+                    break
+                dist = _substring_distance(q, texts[d], max_dist)
+                if dist <= max_dist and dist < distances.get(d, max_dist + 1):
+                    distances[d] = dist
+
+        ranked = sorted(distances, key=lambda d: (distances[d], d))
+        if need is not None:
+            ranked = ranked[:need]
+        return [(d, FUZZY_WEIGHT - distances[d]) for d in ranked]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """クエリにヒットした用語をスコア順で返す"""
+        return [self.terms[doc_id] for doc_id, _ in self.search_scored(query, limit)]
@@ -0,0 +1,87 @@
+"""
+辞書モードの用語フィルタ
+
+用語一覧を列指向の DataFrame（category はカテゴリ型）として1度だけ持ち、
+カテゴリ・応用用語の有無は bool マスクで絞り込む。検索語は用語名・読みの
+前方一致（PrefixIndex）を先頭に、残りを n-gram インデックスの部分一致で埋める。
+同じ条件の結果は LRU に残して再計算しない。
+"""
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from prefix_index import PrefixIndex
+from search_index import NgramIndex
+
+ALL_CATEGORIES = "すべて"
+
+# 一覧表タブの列名
+TABLE_COLUMNS = {
+    "id": "ID",
+    "name": "用語",
+    "category": "カテゴリ",
+    "short_description": "一言説明",
+}
+
+
+class TermFilter:
+    """用語の絞り込み（カテゴリ・応用用語・検索語・最大件数）"""
+
+    def __init__(
+        self,
+        terms: Sequence[Dict],  # dict のリストまたは TermStore
+        categories: Sequence[str],
+        advanced_categories: Sequence[str],
+        cache_size: int = 256,
+    ):
+        self.terms = terms
+        self.index = NgramIndex(terms)
+        self.prefix_index = PrefixIndex(terms)
+        self.frame = pd.DataFrame(
+            {
+                "id": [t["id"] for t in terms],
+                "name": [t["name"] for t in terms],
+                "category": pd.Categorical(
+                    [t["category"] for t in terms], categories=list(categories)
+                ),
+                "short_description": [t["short_description"] for t in terms],
+            }
+        )
+        codes = self.frame["category"].cat.codes.to_numpy()
+        self._codes = codes
+        self._category_code = {c: i for i, c in enumerate(self.frame["category"].cat.categories)}
+        advanced_codes = [self._category_code[c] for c in advanced_categories if c in self._category_code]
+        self._basic_mask = ~np.isin(codes, advanced_codes)
+        self._positions = np.arange(len(terms))
+        self.filter = lru_cache(maxsize=cache_size)(self._filter)
+
+    def _filter(
+        self, category: str, include_advanced: bool, query: str, max_items: int
+    ) -> Tuple[int, ...]:
+        """条件に合う用語の位置（検索時は前方一致 → スコア順、それ以外は登録順）"""
+        mask = np.ones(len(self.terms), dtype=bool)
+        if category != ALL_CATEGORIES:
+            mask &= self._codes == self._category_code.get(category, -2)
+        if not include_advanced:
+            mask &= self._basic_mask
+
+        if query.strip():
+            prefix_hits = self.prefix_index.search(query, allowed=mask)[:max_items]
+            rest: Tuple[int, ...] = ()
+            if len(prefix_hits) < max_items:
+                mask[prefix_hits] = False
+                hits = self.index.search_scored(
+                    query, limit=max_items - len(prefix_hits), allowed=mask
+                )
+                rest = tuple(doc_id for doc_id, _ in hits)
+            return tuple(prefix_hits.tolist()) + rest
+        return tuple(self._positions[mask][:max_items].tolist())
+
+    def terms_at(self, positions: Sequence[int]) -> List[Dict]:
+        return [self.terms[i] for i in positions]
+
+    def table(self, positions: Sequence[int]) -> pd.DataFrame:
+        """一覧表タブ用に frame の該当行をそのまま切り出す"""
+        return self.frame.iloc[list(positions)].rename(columns=TABLE_COLUMNS).reset_index(drop=True)
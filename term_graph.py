@@ -0,0 +1,92 @@
+"""
+関連用語グラフ
+
+related_terms を用語の位置どうしの隣接リスト（順方向・逆方向）に変換して持つ。
+存在しない id への参照は読み込み時に dangling に集めてグラフからは除く。
+学習ルート（A から B まで）は関連の向きを無視した双方向 BFS で探す。
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from term_store import TermRecord, TermStore
+
+
+class TermGraph:
+    """用語ストアの関連用語グラフ"""
+
+    def __init__(self, store: TermStore):
+        self.store = store
+        n = len(store)
+        forward: List[List[int]] = [[] for _ in range(n)]
+        reverse: List[List[int]] = [[] for _ in range(n)]
+        # {参照元の id: [存在しない参照先の id, ...]}
+        self.dangling: Dict[str, List[str]] = {}
+
+        for pos, term in enumerate(store):
+            seen = set()
+            for related_id in term.related_terms:
+                related_pos = store.position(related_id)
+                if related_pos is None:
+                    self.dangling.setdefault(term.id, []).append(related_id)
+                    continue
+                if related_pos == pos or related_pos in seen:
+                    continue
+                seen.add(related_pos)
+                forward[pos].append(related_pos)
+                reverse[related_pos].append(pos)
+
+        self._forward: List[Tuple[int, ...]] = [tuple(a) for a in forward]
+        self._reverse: List[Tuple[int, ...]] = [tuple(a) for a in reverse]
+        # 向きを無視した隣接（学習ルート用）
+        self._undirected: List[Tuple[int, ...]] = [
+            tuple(dict.fromkeys(f + r)) for f, r in zip(self._forward, self._reverse)
+        ]
+
+    def related(self, term_id: str) -> List[TermRecord]:
+        """term_id の related_terms（存在するものだけ）"""
+        pos = self.store.position(term_id)
+        return [] if pos is None else [self.store[p] for p in self._forward[pos]]
+
+    def referenced_by(self, term_id: str) -> List[TermRecord]:
+        """term_id を related_terms に挙げている用語"""
+        pos = self.store.position(term_id)
+        return [] if pos is None else [self.store[p] for p in self._reverse[pos]]
+
+    def learning_path(self, source_id: str, target_id: str) -> Optional[List[TermRecord]]:
+        """source から target までの最短の関連用語のつながり（たどれなければ None）"""
+        source = self.store.position(source_id)
+        target = self.store.position(target_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [self.store[source]]
+
+        # 両端から1段ずつ広げ、小さい方の前線を先に進める
+        parents: Tuple[Dict[int, int], Dict[int, int]] = ({source: -1}, {target: -1})
+        frontiers: List[Sequence[int]] = [[source], [target]]
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own, other = parents[side], parents[1 - side]
+            next_frontier = []
+            for pos in frontiers[side]:
+                for neighbor in self._undirected[pos]:
+                    if neighbor in own:
+                        continue
+                    own[neighbor] = pos
+                    if neighbor in other:
+                        return self._join(neighbor, parents)
+                    next_frontier.append(neighbor)
+            frontiers[side] = next_frontier
+        return None
+
+    def _join(self, meeting: int, parents: Tuple[Dict[int, int], Dict[int, int]]) -> List[TermRecord]:
+        path = []
+        pos = meeting
+        while pos != -1:
+            path.append(pos)
+            pos = parents[0][pos]
+        path.reverse()
+        pos = parents[1][meeting]
+        while pos != -1:
+            path.append(pos)
+            pos = parents[1][pos]
+        return [self.store[p] for p in path]
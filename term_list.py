@@ -0,0 +1,243 @@
+"""
+辞書ビューの用語リスト（ウィンドウ表示）
+
+件数が多いときは用語ごとの st.button ではなく、1つのカスタムコンポーネントに
+表示する。Python からは今のスクロール位置の前後 BUFFER_ROWS 行だけを送り、
+ブラウザ側は見えている行とその前後 OVERSCAN_ROWS 行だけを DOM に置く。
+スクロールで送った範囲を外れそうになるとスクロール位置を Python に返し、
+その位置の前後を送り直す。カテゴリ見出しはリストの上部に固定して表示する。
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+ROW_HEIGHT = 40
+VIEW_HEIGHT = 600
+BUFFER_ROWS = 200
+OVERSCAN_ROWS = 10
+# これ以下の件数なら従来どおり用語ごとのボタンで表示する
+BUTTON_LIST_MAX = 50
+
+# 最後に報告されたスクロール位置 (コンポーネントの key, 先頭の行番号)
+_SCROLL_STATE = "term_list_scroll"
+
+_HTML = '<div class="vlist"><div class="vlist-sticky"></div><div class="vlist-body"></div></div>'
+
+_CSS = """
+.vlist {
+    position: relative;
+    overflow-y: auto;
+    border: 1px solid #e5e7eb;
+    border-radius: 0.5rem;
+}
+.vlist-sticky {
+    position: sticky;
+    top: 0;
+    z-index: 2;
+    height: 0;
+}
+.vlist-sticky div, .vlist-row.header {
+    background: #e5f0ff;
+    color: #1d4ed8;
+    font-weight: 700;
+    padding: 0 0.75rem;
+    border-bottom: 1px solid #bfdbfe;
+}
+.vlist-body {
+    position: relative;
+}
+.vlist-row {
+    position: absolute;
+    left: 0;
+    right: 0;
+    box-sizing: border-box;
+    display: flex;
+    align-items: center;
+    padding: 0 0.75rem;
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.vlist-row.term {
+    cursor: pointer;
+    color: #1e3a8a;
+    border-bottom: 1px solid #f3f4f6;
+}
+.vlist-row.term:hover {
+    background: #eff6ff;
+}
+.vlist-row.term.selected {
+    background: #dbeafe;
+    font-weight: 700;
+}
+.vlist-row.pending {
+    color: #9ca3af;
+}
+"""
+
+_JS = """
+export default function(component) {
+    const { data, parentElement, setStateValue, setTriggerValue } = component;
+    const root = parentElement.querySelector(".vlist");
+    const sticky = root.querySelector(".vlist-sticky");
+    const body = root.querySelector(".vlist-body");
+    const rowHeight = data.row_height;
+
+    root.style.height = data.view_height + "px";
+    body.style.height = data.total * rowHeight + "px";
+    if (root.dataset.listKey !== data.list_key) {
+        root.dataset.listKey = data.list_key;
+        root.scrollTop = data.scroll * rowHeight;
+    }
+
+    let reportTimer = null;
+
+    function headerFor(index) {
+        let current = null;
+        for (const [headerIndex, label] of data.headers) {
+            if (headerIndex > index) break;
+            current = label;
+        }
+        return current;
+    }
+
+    function render() {
+        const first = Math.floor(root.scrollTop / rowHeight);
+        const visible = Math.ceil(data.view_height / rowHeight);
+        const from = Math.max(0, first - data.overscan);
+        const to = Math.min(data.total, first + visible + data.overscan);
+        const bufferEnd = data.offset + data.rows.length;
+
+        const fragment = document.createDocumentFragment();
+        for (let i = from; i < to; i++) {
+            const row = document.createElement("div");
+            row.style.top = i * rowHeight + "px";
+            row.style.height = rowHeight + "px";
+            const item = i >= data.offset && i < bufferEnd ? data.rows[i - data.offset] : null;
+            if (item === null) {
+                row.className = "vlist-row pending";
+                row.textContent = "…";
+            } else if (item.header) {
+                row.className = "vlist-row header";
+                row.textContent = item.header;
+            } else {
+                row.className = "vlist-row term" + (item.id === data.selected ? " selected" : "");
+                row.textContent = item.label;
+                row.title = item.label;
+                row.onclick = () => setTriggerValue("selected", item.id);
+            }
+            fragment.appendChild(row);
+        }
+        body.replaceChildren(fragment);
+
+        const label = headerFor(first);
+        sticky.replaceChildren();
+        if (label !== null) {
+            const header = document.createElement("div");
+            header.style.height = rowHeight + "px";
+            header.style.lineHeight = rowHeight + "px";
+            header.textContent = label;
+            sticky.appendChild(header);
+        }
+
+        // 送られている範囲の外が見えそうになったら、スクロール位置を返して送り直してもらう
+        const needsMore = (from < data.offset && data.offset > 0) || (to > bufferEnd && bufferEnd < data.total);
+        clearTimeout(reportTimer);
+        if (needsMore) {
+            reportTimer = setTimeout(() => setStateValue("scroll", first), 120);
+        }
+    }
+
+    root.onscroll = () => window.requestAnimationFrame(render);
+    render();
+
+    return () => {
+        clearTimeout(reportTimer);
+        root.onscroll = null;
+    };
+}
+"""
+
+
+def list_key(*conditions: object) -> str:
+    """絞り込み条件からコンポーネントの key を作る"""
+    digest = hashlib.sha1(repr(conditions).encode("utf-8")).hexdigest()[:12]
+    return f"term_list_{digest}"
+
+
+_term_list_component = st.components.v2.component(
+    "virtual_term_list", html=_HTML, css=_CSS, js=_JS
+)
+
+
+def build_list_items(
+    terms: Sequence[Dict], list_mode: str, categories: Sequence[str]
+) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    """
+    リストの行（見出し行・用語行）と見出しの位置を作る
+
+    カテゴリ別は categories の順に見出し → 用語、名前順は見出しなし。
+    """
+    if list_mode == "名前順":
+        ordered = sorted(terms, key=lambda t: t["name"])
+        return [_term_row(t) for t in ordered], []
+
+    by_category: Dict[str, List[Dict]] = {c: [] for c in categories}
+    for term in terms:
+        by_category.setdefault(term["category"], []).append(term)
+
+    items: List[Dict] = []
+    headers: List[Tuple[int, str]] = []
+    for category, cat_terms in by_category.items():
+        if not cat_terms:
+            continue
+        headers.append((len(items), category))
+        items.append({"header": category})
+        items.extend(_term_row(t) for t in cat_terms)
+    return items, headers
+
+
+def _term_row(term: Dict) -> Dict:
+    return {"id": term["id"], "label": f"{term['name']}：{term['short_description']}"}
+
+
+def virtual_term_list(
+    items: List[Dict],
+    headers: List[Tuple[int, str]],
+    selected_id: Optional[str],
+    key: str,
+) -> Optional[str]:
+    """
+    ウィンドウ表示の用語リストを描画し、クリックされた用語の id を返す
+
+    key は絞り込み条件ごとに変える（条件が変わったらスクロール位置を先頭に戻す）。
+    """
+    def remember_scroll() -> None:
+        # コンポーネントの状態は描画前には読めないので、変化したときに控えておく
+        st.session_state[_SCROLL_STATE] = (key, st.session_state[key]["scroll"])
+
+    saved_key, scroll = st.session_state.get(_SCROLL_STATE) or (None, 0)
+    scroll = min(int(scroll), max(len(items) - 1, 0)) if saved_key == key else 0
+    offset = max(0, scroll - BUFFER_ROWS)
+    view_height = min(VIEW_HEIGHT, max(len(items), 1) * ROW_HEIGHT)
+    result = _term_list_component(
+        key=key,
+        data={
+            "list_key": key,
+            "total": len(items),
+            "offset": offset,
+            "rows": items[offset:scroll + BUFFER_ROWS],
+            "headers": headers,
+            "selected": selected_id,
+            "scroll": scroll,
+            "row_height": ROW_HEIGHT,
+            "view_height": view_height,
+            "overscan": OVERSCAN_ROWS,
+        },
+        default={"scroll": 0},
+        height=view_height + 2,
+        on_scroll_change=remember_scroll,
+        on_selected_change=lambda: None,
+    )
+    return result.selected
@@ -0,0 +1,113 @@
+"""
+用語ストア
+
+用語を id → 位置 の索引つきで持ち、詳細ペインの用語探しを O(1) にする。
+1件は __slots__ の小さなレコードで、カテゴリ文字列は intern して共有する。
+長い項目（full_description / examples）は BLOCK_SIZE 件ずつ JSON + zlib で
+圧縮して持ち、読まれたときにブロック単位で展開する（直近のブロックだけ保持）。
+
+レコードは term["name"] / term.get("examples") のように dict と同じ書き方で読める。
+"""
+import json
+import sys
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+BLOCK_SIZE = 64
+# 展開済みのまま残すブロック数
+DECODED_BLOCKS = 16
+
+LONG_FIELDS = ("full_description", "examples")
+
+
+class TermRecord:
+    """用語1件（長い項目は参照されたときにストアから展開する）"""
+
+    __slots__ = ("_store", "_pos", "id", "name", "category", "short_description", "related_terms")
+
+    def __init__(self, store: "TermStore", pos: int, term: Dict):
+        self._store = store
+        self._pos = pos
+        self.id: str = term["id"]
+        self.name: str = term["name"]
+        self.category: str = sys.intern(term["category"])
+        self.short_description: str = term["short_description"]
+        self.related_terms: Tuple[str, ...] = tuple(term.get("related_terms") or ())
+
+    @property
+    def full_description(self) -> str:
+        return self._store.long_fields(self._pos)[0]
+
+    @property
+    def examples(self) -> List[str]:
+        return self._store.long_fields(self._pos)[1]
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __repr__(self) -> str:
+        return f"TermRecord({self.id!r})"
+
+
+class TermStore:
+    """用語の一覧（位置でも id でも引ける）"""
+
+    def __init__(self, terms: Sequence[Dict]):
+        self._records: List[TermRecord] = []
+        self._positions: Dict[str, int] = {}
+        self._blocks: List[bytes] = []
+
+        for start in range(0, len(terms), BLOCK_SIZE):
+            chunk = terms[start:start + BLOCK_SIZE]
+            long_values = [
+                [t.get("full_description") or "", list(t.get("examples") or ())] for t in chunk
+            ]
+            self._blocks.append(
+                zlib.compress(json.dumps(long_values, ensure_ascii=False).encode("utf-8"))
+            )
+            for offset, term in enumerate(chunk):
+                pos = start + offset
+                if term["id"] in self._positions:
+                    raise ValueError(f"用語 id が重複しています: {term['id']}")
+                self._positions[term["id"]] = pos
+                self._records.append(TermRecord(self, pos, term))
+
+        self._decode_block = lru_cache(maxsize=DECODED_BLOCKS)(self._decode_block_uncached)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[TermRecord]:
+        return iter(self._records)
+
+    def __getitem__(self, pos: int) -> TermRecord:
+        return self._records[pos]
+
+    def __contains__(self, term_id: str) -> bool:
+        return term_id in self._positions
+
+    def get(self, term_id: str) -> Optional[TermRecord]:
+        """id の用語（なければ None）"""
+        pos = self._positions.get(term_id)
+        return None if pos is None else self._records[pos]
+
+    def position(self, term_id: str) -> Optional[int]:
+        return self._positions.get(term_id)
+
+    def _decode_block_uncached(self, block_no: int) -> List[Tuple[str, List[str]]]:
+        values = json.loads(zlib.decompress(self._blocks[block_no]).decode("utf-8"))
+        return [(full, examples) for full, examples in values]
+
+    def long_fields(self, pos: int) -> Tuple[str, List[str]]:
+        """(full_description, examples)"""
+        block_no, offset = divmod(pos, BLOCK_SIZE)
+        full, examples = self._decode_block(block_no)[offset]
+        # 呼び出し側で変更されてもキャッシュが壊れないようにコピーを返す
+        return full, list(examples)
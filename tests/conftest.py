@@ -0,0 +1,58 @@
+"""
+テスト共通の準備
+
+backend は db.py のクライアントをメモリ上の LocalBackend に差し替え、キャッシュと
+類似重複インデックスもテストごとに作り直す（ネットワークなしで動く）。
+"""
+import pytest
+
+import db
+from cache import RecentKeys, TTLCache
+from local_backend import LocalBackend
+from near_dup import NearDuplicateIndex
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch) -> LocalBackend:
+    local = LocalBackend(":memory:")
+    monkeypatch.setattr(db, "_client", local)
+    monkeypatch.setattr(db, "READ_CACHE", TTLCache())
+    monkeypatch.setattr(db, "QUIZ_ID_POOL_CACHE", TTLCache(maxsize=16, ttl=600))
+    monkeypatch.setattr(db, "RECENT_QUIZ_HASHES", RecentKeys())
+    monkeypatch.setattr(
+        db, "_near_dup_index", NearDuplicateIndex(str(tmp_path / "near_dup.sqlite3"))
+    )
+    monkeypatch.setattr(db, "_near_dup_synced_at", 0.0)
+    monkeypatch.setattr(db, "NEAR_DUP_SYNC_INTERVAL", 0.0)
+    return local
+
+
+def quiz_row(question_text: str, **overrides) -> dict:
+    """登録用のクイズ問題1行"""
+    row = {
+        "question_text": question_text,
+        "choice_1": "git add",
+        "choice_2": "git commit",
+        "choice_3": "git push",
+        "choice_4": "git pull",
+        "correct_choice": 1,
+        "explanation": "",
+        "category": None,
+    }
+    row.update(overrides)
+    return row
+
+
+def term(term_id: str, name: str, category: str = "基本操作", **overrides) -> dict:
+    """辞書の用語1件"""
+    row = {
+        "id": term_id,
+        "name": name,
+        "category": category,
+        "short_description": f"{name}の説明",
+        "full_description": "",
+        "examples": [],
+        "related_terms": [],
+    }
+    row.update(overrides)
+    return row
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from cache import RecentKeys, TTLCache, take_lookup_hit
+
+
+def test_hit_miss_and_expiry():
+    cache = TTLCache(ttl=0.05)
+    calls = []
+    load = lambda: calls.append(1) or len(calls)  # noqa: E731
+
+    assert cache.get_or_load(("t", "a"), load) == 1
+    assert cache.get_or_load(("t", "a"), load) == 1
+
+    time.sleep(0.06)
+    assert cache.get_or_load(("t", "a"), load) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_ratio"] == pytest.approx(1 / 3)
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    for key in ("a", "b"):
+        cache.get_or_load(("t", key), lambda: key)
+    # a を使ったので、次に追い出されるのは b
+    cache.get_or_load(("t", "a"), lambda: "reloaded")
+    cache.get_or_load(("t", "c"), lambda: "c")
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load(("t", "a"), lambda: "reloaded") == "a"
+    assert cache.get_or_load(("t", "b"), lambda: "reloaded") == "reloaded"
+
+
+def test_invalidate_only_drops_that_table():
+    cache = TTLCache()
+    cache.get_or_load(("notes", 1), lambda: "n")
+    cache.get_or_load(("notes", 2), lambda: "n")
+    cache.get_or_load(("quiz", 1), lambda: "q")
+
+    assert cache.invalidate("notes") == 2
+    assert cache.get_or_load(("notes", 1), lambda: "n2") == "n2"
+    assert cache.get_or_load(("quiz", 1), lambda: "q2") == "q"
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_loader_error_is_not_cached():
+    cache = TTLCache()
+
+    def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load(("t", 1), failing)
+    assert cache.get_or_load(("t", 1), lambda: "ok") == "ok"
+
+
+def test_recent_keys_forgets_oldest():
+    keys = RecentKeys(maxsize=2)
+    for key in ("a", "b", "a", "c"):
+        keys.add(key)
+    # a は2回目の add で新しくなったので、忘れるのは b
+    assert "b" not in keys
+    assert "a" in keys and "c" in keys
+
+
+# ==============================
+# 読み込み中の invalidate / 同時ミス / update
+# ==============================
+def start_slow_load(cache, key, value):
+    """loader が止まった状態で get_or_load を別スレッドで始める"""
+    started = threading.Event()
+    release = threading.Event()
+    result = []
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return value
+
+    worker = threading.Thread(target=lambda: result.append(cache.get_or_load(key, slow_load)))
+    worker.start()
+    started.wait(5)
+    return release, worker, result
+
+
+def test_load_started_before_invalidate_is_not_stored():
+    cache = TTLCache()
+    release, worker, result = start_slow_load(cache, ("t", 1), "old")
+    # 読み込み中に書き込みがあった
+    cache.invalidate("t")
+    release.set()
+    worker.join(5)
+
+    # 呼び出し元には返すが、キャッシュには残さない
+    assert result == ["old"]
+    assert cache.get_or_load(("t", 1), lambda: "new") == "new"
+    assert cache.stats()["stale_loads"] == 1
+
+
+def test_concurrent_misses_call_loader_once():
+    cache = TTLCache()
+    calls = []
+    release = threading.Event()
+
+    def slow_load():
+        calls.append(1)
+        release.wait(5)
+        return "v"
+
+    results = []
+    workers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load(("t", 1), slow_load)))
+        for _ in range(5)
+    ]
+    for w in workers:
+        w.start()
+    # 全員がミスして待ち合わせに入るまで待つ
+    deadline = time.monotonic() + 5
+    while cache.stats()["misses"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for w in workers:
+        w.join(5)
+
+    assert results == ["v"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_waiters_see_the_loader_error():
+    cache = TTLCache()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_load(("t", 1), failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    workers = [threading.Thread(target=call) for _ in range(3)]
+    for w in workers:
+        w.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["misses"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for w in workers:
+        w.join(5)
+    assert errors == ["boom"] * 3
+
+
+def test_update_patches_stored_and_in_flight_entries():
+    cache = TTLCache()
+    cache.get_or_load(("t", "stored"), lambda: [1])
+    cache.get_or_load(("other", "stored"), lambda: [1])
+    release, worker, _ = start_slow_load(cache, ("t", "loading"), [1])
+
+    add_two = lambda key, value: value if 2 in value else value + [2]  # noqa: E731
+    assert cache.update("t", add_two) == 1
+    release.set()
+    worker.join(5)
+
+    assert cache.get_or_load(("t", "stored"), lambda: None) == [1, 2]
+    assert cache.get_or_load(("t", "loading"), lambda: None) == [1, 2]
+    assert cache.get_or_load(("other", "stored"), lambda: None) == [1]
+
+
+def test_take_lookup_hit_reports_the_last_lookup_once():
+    cache = TTLCache()
+    cache.get_or_load(("t", 1), lambda: "a")
+    assert take_lookup_hit() is False
+    cache.get_or_load(("t", 1), lambda: "b")
+    assert take_lookup_hit() is True
+    # 読んだら消える
+    assert take_lookup_hit() is False
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import pickle
+
+import pytest
+
+import content_pack
+from conftest import term
+from content_pack import ContentPackError, list_packs, load_pack
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(content_pack, "PACK_CACHE_DIR", str(path))
+    return path
+
+
+def write_pack(pack_dir, name="sample", **overrides) -> str:
+    data = {
+        "name": name,
+        "title": "サンプル",
+        "version": 1,
+        "categories": ["基本操作", "応用操作"],
+        "advanced_categories": ["応用操作", "存在しないカテゴリ"],
+        "terms": [term("commit", "コミット", extra="無視される"), term("rebase", "リベース", "応用操作")],
+    }
+    data.update(overrides)
+    pack_dir.mkdir(exist_ok=True)
+    path = pack_dir / f"{name}.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_bundled_packs_are_valid():
+    for name in list_packs():
+        pack = load_pack(name)
+        assert pack.terms
+        assert set(pack.advanced_categories) <= set(pack.categories)
+
+
+def test_load_keeps_known_fields_only(tmp_path):
+    write_pack(tmp_path / "packs")
+    pack = load_pack("sample", str(tmp_path / "packs"))
+
+    assert pack.title == "サンプル"
+    assert [t["id"] for t in pack.terms] == ["commit", "rebase"]
+    assert "extra" not in pack.terms[0]
+    # categories にないカテゴリは応用カテゴリから外す
+    assert pack.advanced_categories == ["応用操作"]
+
+
+def test_second_load_reads_the_cache(tmp_path, monkeypatch):
+    pack_dir = str(tmp_path / "packs")
+    write_pack(tmp_path / "packs")
+    first = load_pack("sample", pack_dir)
+
+    def no_source(path):
+        raise AssertionError("キャッシュがあるのに元ファイルを読んだ")
+
+    monkeypatch.setattr(content_pack, "_read_source", no_source)
+    assert load_pack("sample", pack_dir) == first
+
+
+def test_changed_source_invalidates_the_cache(tmp_path):
+    pack_dir = str(tmp_path / "packs")
+    path = write_pack(tmp_path / "packs")
+    load_pack("sample", pack_dir)
+
+    write_pack(tmp_path / "packs", title="変更後のタイトル")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_pack("sample", pack_dir).title == "変更後のタイトル"
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        b"not a pickle",
+        # 今はないモジュールのクラスを参照している
+        b"\x80\x04cremoved_module\nOldPack\n.",
+        pickle.dumps(42),
+        pickle.dumps(("key", "not a pack")),
+    ],
+    ids=["garbage", "missing_class", "not_a_tuple", "other_key"],
+)
+def test_unreadable_cache_is_rebuilt(tmp_path, cache_dir, contents):
+    pack_dir = str(tmp_path / "packs")
+    write_pack(tmp_path / "packs")
+    load_pack("sample", pack_dir)
+    for cache_file in cache_dir.iterdir():
+        cache_file.write_bytes(contents)
+
+    assert load_pack("sample", pack_dir).title == "サンプル"
+
+
+def test_cache_is_separate_per_pack_path(tmp_path, cache_dir):
+    write_pack(tmp_path / "a")
+    write_pack(tmp_path / "b", title="別のチェックアウト")
+    assert load_pack("sample", str(tmp_path / "a")).title == "サンプル"
+    assert load_pack("sample", str(tmp_path / "b")).title == "別のチェックアウト"
+    assert len(list(cache_dir.iterdir())) == 2
+    assert load_pack("sample", str(tmp_path / "a")).title == "サンプル"
+
+
+def test_dangling_related_terms_are_logged_at_load(tmp_path, caplog):
+    pack_dir = str(tmp_path / "packs")
+    write_pack(
+        tmp_path / "packs",
+        terms=[term("commit", "コミット", related_terms=["rebase", "gone"]), term("rebase", "リベース")],
+    )
+    with caplog.at_level(logging.WARNING, logger="content_pack"):
+        load_pack("sample", pack_dir)
+        # キャッシュから読んだときも出す
+        load_pack("sample", pack_dir)
+    assert [r.getMessage() for r in caplog.records] == [
+        "Content pack sample: commit の関連用語 gone が見つかりません",
+    ] * 2
+
+
+@pytest.mark.parametrize(
+    "overrides, message",
+    [
+        ({"terms": [term("a", "A"), term("a", "B")]}, "重複"),
+        ({"terms": [term("a", "A", "未知のカテゴリ")]}, "categories にありません"),
+        ({"terms": [{"id": "a", "name": "A"}]}, "1 件目の用語に"),
+    ],
+)
+def test_invalid_terms_are_rejected(tmp_path, overrides, message):
+    write_pack(tmp_path / "packs", **overrides)
+    with pytest.raises(ContentPackError, match=message):
+        load_pack("sample", str(tmp_path / "packs"))
+
+
+def test_missing_pack_field_is_rejected(tmp_path):
+    path = tmp_path / "packs" / "sample.json"
+    write_pack(tmp_path / "packs")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    del data["title"]
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    with pytest.raises(ContentPackError, match="title がありません"):
+        load_pack("sample", str(tmp_path / "packs"))
+
+
+def test_unknown_pack(tmp_path):
+    write_pack(tmp_path / "packs")
+    assert list(list_packs(str(tmp_path / "packs"))) == ["sample"]
+    with pytest.raises(ContentPackError):
+        load_pack("missing", str(tmp_path / "packs"))
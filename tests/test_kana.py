@@ -0,0 +1,29 @@
+import pytest
+
+from kana import katakana_to_hiragana, to_romaji
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("こみっと", "komitto"),
+        ("コミット", "komitto"),
+        ("ブランチ", "buranchi"),
+        ("ちぇっくあうと", "chekkuauto"),
+        ("きゃっしゅ", "kyasshu"),
+        ("しんぶん", "shinbun"),
+        # 長音は読みから外す
+        ("まーじ", "maji"),
+        ("リベース", "ribesu"),
+    ],
+)
+def test_to_romaji(text, expected):
+    assert to_romaji(text) == expected
+
+
+def test_to_romaji_keeps_non_kana():
+    assert to_romaji("git こみっと 2") == "git komitto 2"
+
+
+def test_katakana_to_hiragana():
+    assert katakana_to_hiragana("マージ ab") == "まーじ ab"
@@ -0,0 +1,254 @@
+import io
+import json
+
+import pytest
+from postgrest.exceptions import APIError
+
+import db
+from conftest import quiz_row
+from local_backend import LocalBackend
+from metrics import DB_REQUESTS
+from quiz_import import import_quiz_questions
+
+QUESTION = "作業ツリーの変更をステージングエリアに追加するコマンドはどれですか？"
+
+
+@pytest.fixture
+def local() -> LocalBackend:
+    return LocalBackend(":memory:")
+
+
+def add_notes(backend: LocalBackend, *texts: str) -> list:
+    return backend.table("learning_notes").insert(
+        [{"note_text": text} for text in texts]
+    ).execute().data
+
+
+def test_insert_returns_rows_with_defaults(local):
+    rows = add_notes(local, "a", "b")
+    assert [r["note_text"] for r in rows] == ["a", "b"]
+    assert rows[0]["id"] < rows[1]["id"]
+    assert rows[0]["created_at"]
+
+
+def test_filters_order_and_limit(local):
+    ids = [row["id"] for row in add_notes(local, "a", "b", "c", "d")]
+
+    def notes():
+        # クエリビルダーは条件を積み重ねるので、1クエリごとに作る
+        return local.table("learning_notes").select("id")
+
+    assert [r["id"] for r in notes().eq("id", ids[1]).execute().data] == [ids[1]]
+    assert [r["id"] for r in notes().gt("id", ids[1]).order("id").execute().data] == ids[2:]
+    assert [r["id"] for r in notes().lt("id", ids[2]).order("id", desc=True).limit(1)
+            .execute().data] == [ids[1]]
+    assert sorted(r["id"] for r in notes().in_("id", [ids[0], ids[3]]).execute().data) \
+        == [ids[0], ids[3]]
+    assert notes().in_("id", []).execute().data == []
+
+
+def test_select_columns_include_computed_columns(local):
+    add_notes(local, "あ" * 200)
+    row = local.table("learning_notes").select(db.NOTE_LIST_COLUMNS).execute().data[0]
+    assert set(row) == {c.strip() for c in db.NOTE_LIST_COLUMNS.split(",")}
+    assert row["note_length"] == 200
+    assert len(row["note_preview"]) < 200
+
+
+def test_unknown_table_or_column_raises_api_error(local):
+    with pytest.raises(APIError):
+        local.table("missing")
+    with pytest.raises(APIError):
+        local.table("learning_notes").select("missing").execute()
+    with pytest.raises(APIError):
+        local.table("learning_notes").insert({"missing": 1}).execute()
+
+
+def test_upsert_ignores_duplicates(local):
+    rows = [{**quiz_row("問題1"), "content_hash": "h1"}]
+    first = local.table("git_quiz_questions").upsert(
+        rows, on_conflict="content_hash", ignore_duplicates=True
+    ).execute().data
+    again = local.table("git_quiz_questions").upsert(
+        rows + [{**quiz_row("問題2"), "content_hash": "h2"}],
+        on_conflict="content_hash",
+        ignore_duplicates=True,
+    ).execute().data
+    assert len(first) == 1
+    assert [r["content_hash"] for r in again] == ["h2"]
+
+
+def test_is_filter(local):
+    local.table("git_quiz_questions").insert(
+        [quiz_row("問題1", content_hash="h1"), quiz_row("問題2")]
+    ).execute()
+    rows = local.table("git_quiz_questions").select("id").is_("content_hash", "null").execute().data
+    assert [r["id"] for r in rows] == [2]
+    with pytest.raises(APIError):
+        local.table("git_quiz_questions").select("id").is_("content_hash", "maybe")
+
+
+def test_upsert_ignores_duplicate_client_ids(local):
+    first = local.table("learning_notes").upsert(
+        [{"note_text": "a", "client_id": "x"}], on_conflict="client_id", ignore_duplicates=True
+    ).execute().data
+    again = local.table("learning_notes").upsert(
+        [{"note_text": "a", "client_id": "x"}, {"note_text": "b", "client_id": "y"}],
+        on_conflict="client_id",
+        ignore_duplicates=True,
+    ).execute().data
+    assert len(first) == 1
+    assert [r["client_id"] for r in again] == ["y"]
+    assert len(local.table("learning_notes").select("id").execute().data) == 2
+
+
+def test_update_only_touches_filtered_rows(local):
+    local.table("git_quiz_questions").insert(
+        [quiz_row("問題1"), quiz_row("問題2", content_hash="h2"), quiz_row("問題3")]
+    ).execute()
+    updated = (
+        local.table("git_quiz_questions")
+        .update({"content_hash": "h1"}).eq("id", 1).is_("content_hash", "null").execute().data
+    )
+    assert [(r["id"], r["content_hash"], r["question_text"]) for r in updated] == [(1, "h1", "問題1")]
+    # 条件に合わない行は書き換えず、空を返す
+    assert local.table("git_quiz_questions").update({"content_hash": "x"}) \
+        .eq("id", 2).is_("content_hash", "null").execute().data == []
+    rows = local.table("git_quiz_questions").select("id,content_hash").order("id").execute().data
+    assert [r["content_hash"] for r in rows] == ["h1", "h2", None]
+
+    with pytest.raises(APIError) as e:
+        local.table("git_quiz_questions").update({"content_hash": "h1"}).eq("id", 3).execute()
+    assert e.value.code == "23505"
+    with pytest.raises(APIError):
+        local.table("git_quiz_questions").update({"missing": 1}).eq("id", 3).execute()
+
+
+def test_unique_violation_raises_api_error(local):
+    row = {**quiz_row("問題1"), "content_hash": "h1"}
+    local.table("git_quiz_questions").insert(row).execute()
+    with pytest.raises(APIError) as e:
+        local.table("git_quiz_questions").insert(row).execute()
+    assert e.value.code == "23505"
+
+
+def test_injected_failures(local):
+    failing = LocalBackend(":memory:", failure_rate=1.0)
+    with pytest.raises(APIError) as e:
+        failing.table("learning_notes").select("id").execute()
+    assert e.value.code == "503"
+    assert failing.request_count == 1
+
+
+# ==============================
+# db.py 経由（conftest の backend で差し替え）
+# ==============================
+def test_notes_round_trip(backend):
+    db.save_learning_notes_batch(
+        [{"note_text": "a", "client_id": "x"}, {"note_text": "b", "client_id": "y"}]
+    )
+    page = db.load_learning_notes_page(limit=1)
+    assert [n["note_preview"] for n in page] == ["b"]
+    older = db.load_learning_notes_page(before_id=page[0]["id"])
+    assert [n["note_preview"] for n in older] == ["a"]
+    assert db.load_learning_note(page[0]["id"])["note_text"] == "b"
+
+
+def test_save_learning_notes_batch_is_idempotent(backend):
+    notes = [{"note_text": "a", "client_id": "x"}, {"note_text": "b", "client_id": "y"}]
+    db.save_learning_notes_batch(notes)
+    # 応答が届かずに送り直しても二重に保存しない
+    db.save_learning_notes_batch(notes)
+    assert [n["note_preview"] for n in db.load_learning_notes_page()] == ["b", "a"]
+
+
+def test_insert_quiz_question_statuses(backend):
+    args = dict(quiz_row(QUESTION))
+    assert db.insert_quiz_question_to_supabase(**args).status == db.INSERTED
+    assert db.insert_quiz_question_to_supabase(**args).status == db.DUPLICATE
+    # メモリ上の記録がなくても、完全に同じ内容は SIMILAR ではなく DUPLICATE
+    db.RECENT_QUIZ_HASHES._keys.clear()
+    assert db.insert_quiz_question_to_supabase(**args).status == db.DUPLICATE
+
+    similar = dict(args, question_text=QUESTION.replace("どれですか", "どれでしょうか"))
+    result = db.insert_quiz_question_to_supabase(**similar)
+    assert result.status == db.SIMILAR
+    assert result.similar[0][0] == 1
+    assert db.insert_quiz_question_to_supabase(**similar, allow_similar=True).status == db.INSERTED
+
+
+def test_insert_quiz_questions_batch_skips_duplicates(backend):
+    rows = [quiz_row("問題1"), quiz_row("問題1"), quiz_row("問題2")]
+    assert db.insert_quiz_questions_batch(rows) == 2
+    assert db.insert_quiz_questions_batch([quiz_row("問題2"), quiz_row("問題3")]) == 1
+    assert len(db.load_quiz_questions_from_supabase(limit=10)) == 3
+
+
+def observed_requests(table: str) -> float:
+    return sum(
+        child.value for key, child in DB_REQUESTS._children.items() if key[1] == table
+    )
+
+
+def test_each_request_is_observed_once(backend, monkeypatch):
+    # 類似重複インデックスの取り込みを数に入れない
+    monkeypatch.setattr(db, "NEAR_DUP_SYNC_INTERVAL", 3600.0)
+    db.get_near_dup_index()
+
+    before = observed_requests("git_quiz_questions")
+    db.insert_quiz_questions_batch([quiz_row("問題1")])
+    db.insert_quiz_question_to_supabase(**quiz_row("問題2"), allow_similar=True)
+    assert observed_requests("git_quiz_questions") - before == 2
+
+    # id 一覧の読み込みと選んだ行の取得で2リクエスト
+    before = observed_requests("git_quiz_questions")
+    db.load_quiz_questions_from_supabase(limit=2)
+    assert observed_requests("git_quiz_questions") - before == 2
+
+
+def test_request_counts_and_stats_file(tmp_path):
+    local = LocalBackend(":memory:")
+    add_notes(local, "a")
+    local.table("learning_notes").select("id").execute()
+    local.table("learning_notes").select("id").execute()
+    assert local.request_counts == {"learning_notes.insert": 1, "learning_notes.select": 2}
+
+    path = tmp_path / "stats.json"
+    local.write_stats(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["requests"] == 3
+
+
+def test_insert_extends_cached_quiz_id_pool(backend, monkeypatch):
+    # 類似重複インデックスの取り込みを数に入れない
+    monkeypatch.setattr(db, "NEAR_DUP_SYNC_INTERVAL", 3600.0)
+    db.insert_quiz_questions_batch([quiz_row("問題1", category="basic")])
+    assert len(db.load_quiz_questions_from_supabase(limit=10, category="basic")) == 1
+    requests = backend.request_counts["git_quiz_questions.select"]
+
+    db.insert_quiz_questions_batch([quiz_row("問題2", category="basic"), quiz_row("問題3")])
+    assert len(db.load_quiz_questions_from_supabase(limit=10, category="basic")) == 2
+    assert len(db.load_quiz_questions_from_supabase(limit=10)) == 3
+    # id 一覧は読み直さず、選んだ行の取得だけ（カテゴリなしの一覧は初回の読み込み）
+    assert backend.request_counts["git_quiz_questions.select"] == requests + 3
+
+
+def test_import_compares_rows_within_the_file(backend):
+    rows = [
+        quiz_row(QUESTION),
+        quiz_row(QUESTION),
+        quiz_row(QUESTION.replace("どれですか", "どれでしょうか")),
+        quiz_row("リモートの変更を取り込むコマンドは？"),
+    ]
+    stream = io.StringIO("\n".join(json.dumps(r, ensure_ascii=False) for r in rows))
+    report = import_quiz_questions(stream, "jsonl", similar_check=db.find_similar_quiz_questions)
+
+    # 完全に同じ行は重複、言い換えた行は前の行と似ているエラー
+    assert (report.inserted, report.duplicates) == (2, 1)
+    assert len(report.errors) == 1
+    assert report.errors[0][0] == 3
+    assert report.errors[0][1].startswith("1 行目と似ています")
+
+    # 登録済みの問題と同じ内容の行も重複として数える
+    stream = io.StringIO(json.dumps(rows[0], ensure_ascii=False))
+    again = import_quiz_questions(stream, "jsonl", similar_check=db.find_similar_quiz_questions)
+    assert (again.inserted, again.duplicates, again.errors) == (0, 1, [])
@@ -0,0 +1,173 @@
+import logging
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import metrics
+from cache import TTLCache
+from metrics import (
+    DB_DURATION,
+    DB_REQUESTS,
+    RecentSessions,
+    Registry,
+    observed,
+    register_cache,
+    write_textfile,
+)
+
+
+def sample_lines(registry: Registry) -> list:
+    return [line for line in registry.exposition().splitlines() if not line.startswith("#")]
+
+
+def test_counter_and_gauge_exposition():
+    registry = Registry()
+    requests = registry.counter("requests_total", "説明", ("path",))
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    registry.gauge("temperature", "温度").labels().set(1.5)
+
+    text = registry.exposition()
+    assert "# HELP requests_total 説明\n# TYPE requests_total counter\n" in text
+    assert sample_lines(registry) == ['requests_total{path="/a\\"b"} 3', "temperature 1.5"]
+
+
+def test_labels_must_match_labelnames():
+    registry = Registry()
+    counter = registry.counter("c", "", ("a", "b"))
+    assert counter.labels("x", "y") is counter.labels("x", "y")
+    with pytest.raises(ValueError):
+        counter.labels("x")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels().observe(value)
+
+    assert sample_lines(registry) == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_callbacks_are_read_at_exposition_and_failures_skipped():
+    registry = Registry()
+    value = {"n": 1}
+    registry.callback("sessions", "gauge", "", lambda: [({}, value["n"])])
+    registry.callback("broken", "gauge", "", lambda: 1 / 0)
+    value["n"] = 5
+    assert sample_lines(registry) == ["sessions 5"]
+
+
+def test_observed_counts_calls_and_errors():
+    @observed("test_table", "select")
+    def ok():
+        return "ok"
+
+    @observed("test_table", "select")
+    def fails():
+        raise RuntimeError
+
+    assert ok() == "ok"
+    with pytest.raises(RuntimeError):
+        fails()
+
+    assert DB_REQUESTS.labels("ok", "test_table", "select", "false", "ok").value == 1
+    assert DB_REQUESTS.labels("fails", "test_table", "select", "false", "error").value == 1
+    assert DB_DURATION.labels("ok", "test_table", "select", "false").counts[-1] == 0
+    assert sum(DB_DURATION.labels("ok", "test_table", "select", "false").counts) == 1
+    assert sum(DB_DURATION.labels("fails", "test_table", "select", "false").counts) == 1
+
+
+def test_observed_cached_splits_hits_from_loads():
+    cache = TTLCache()
+
+    @observed("test_table", "select", cached=True)
+    def load_cached():
+        return cache.get_or_load(("test_table",), lambda: "rows")
+
+    for _ in range(3):
+        assert load_cached() == "rows"
+
+    def requests(hit: str) -> float:
+        return DB_REQUESTS.labels("load_cached", "test_table", "select", hit, "ok").value
+
+    assert (requests("false"), requests("true")) == (1, 2)
+    assert sum(DB_DURATION.labels("load_cached", "test_table", "select", "true").counts) == 2
+
+
+def test_register_cache(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    register_cache("read", lambda: {"hits": 3, "misses": 1})
+    assert sample_lines(registry) == [
+        'git_vocab_cache_hits_total{cache="read"} 3',
+        'git_vocab_cache_misses_total{cache="read"} 1',
+        'git_vocab_cache_hit_ratio{cache="read"} 0.75',
+    ]
+
+    # 作り直したキャッシュを同じ名前で登録すると置き換わる
+    register_cache("read", lambda: {"hits": 0, "misses": 0})
+    assert sample_lines(registry) == [
+        'git_vocab_cache_hits_total{cache="read"} 0',
+        'git_vocab_cache_misses_total{cache="read"} 0',
+        'git_vocab_cache_hit_ratio{cache="read"} 0',
+    ]
+
+
+def test_recent_sessions_forget_idle_sessions(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(metrics.time, "monotonic", lambda: now["t"])
+    sessions = RecentSessions(window=60)
+    sessions.touch("a")
+    sessions.touch("a")
+    now["t"] += 30
+    sessions.touch("b")
+    assert sessions.count() == 2
+    now["t"] += 45
+    assert sessions.count() == 1
+
+
+def test_exporter_binds_localhost_by_default():
+    assert metrics.METRICS_HOST == "127.0.0.1"
+
+
+def test_http_handler_and_textfile(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), metrics._MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as res:
+            assert res.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "git_vocab_db_requests_total" in res.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    path = tmp_path / "metrics.prom"
+    write_textfile(str(path))
+    assert path.read_text(encoding="utf-8") == metrics.REGISTRY.exposition()
+
+
+def test_exporter_bind_failure_is_logged_and_retried(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "_http_started", False)
+    taken = ThreadingHTTPServer(("127.0.0.1", 0), metrics._MetricsHandler)
+    try:
+        port = taken.server_address[1]
+        with caplog.at_level(logging.WARNING, logger="metrics"):
+            metrics.start_exporter(host="127.0.0.1", port=port, textfile=None)
+        assert "could not bind" in caplog.text
+        # 開始済みにしないので、次の呼び出しでもう一度試す
+        assert metrics._http_started is False
+    finally:
+        taken.server_close()
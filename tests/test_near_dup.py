@@ -0,0 +1,129 @@
+import random
+import sqlite3
+import zlib
+
+import numpy as np
+
+from conftest import quiz_row
+from near_dup import MinHashLSH, NearDuplicateIndex, _mul_mod_p, question_shingles
+from quiz import quiz_content_hash
+
+QUESTION = "作業ツリーの変更をステージングエリアに追加するコマンドはどれですか？"
+REPHRASED = QUESTION.replace("どれですか", "どれでしょうか")
+
+
+def with_id(question_id: int, question_text: str, **overrides) -> dict:
+    row = {**quiz_row(question_text, **overrides), "id": question_id}
+    row["content_hash"] = quiz_content_hash(row)
+    return row
+
+
+def paged(rows, page_size=2):
+    """fetch_since の代わり（id > last_id の行を id 昇順で1ページ）"""
+
+    def fetch_since(last_id):
+        return [r for r in sorted(rows, key=lambda r: r["id"]) if r["id"] > last_id][:page_size]
+
+    return fetch_since
+
+
+def test_shingles_ignore_width_case_and_spacing():
+    assert question_shingles(quiz_row("Git の 変更")) == question_shingles(quiz_row("ｇｉｔの変更"))
+
+
+def test_signature_similarity_tracks_jaccard():
+    lsh = MinHashLSH()
+    a = question_shingles(quiz_row(QUESTION))
+    b = question_shingles(quiz_row(REPHRASED))
+    jaccard = len(a & b) / len(a | b)
+    estimate = float((lsh.signature(a) == lsh.signature(b)).mean())
+    assert abs(estimate - jaccard) < 0.2
+    assert (lsh.signature(a) == lsh.signature(a)).all()
+
+
+def test_permutation_hash_is_exact_mod_mersenne_prime():
+    p = (1 << 61) - 1
+    rng = random.Random(0)
+    x = np.array([0, (1 << 32) - 1] + [rng.getrandbits(32) for _ in range(50)], dtype=np.uint64)
+    a = np.array([1, p - 1] + [rng.randrange(1, p) for _ in range(50)], dtype=np.uint64)
+    expected = [[int(xi) * int(ai) % p for ai in a] for xi in x]
+    assert _mul_mod_p(x[:, None], a).tolist() == expected
+
+    lsh = MinHashLSH()
+    shingles = question_shingles(quiz_row(QUESTION))
+    crcs = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    expected_signature = [
+        min((int(a) * c + int(b)) % p & 0xFFFFFFFF for c in crcs) for a, b in zip(lsh._a, lsh._b)
+    ]
+    assert lsh.signature(shingles).tolist() == expected_signature
+
+
+def test_find_similar(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite3"))
+    index.add_many([with_id(1, QUESTION), with_id(2, "リモートの変更を取り込むコマンドは？")])
+
+    similar = index.find_similar(quiz_row(REPHRASED))
+    assert [question_id for question_id, _ in similar] == [1]
+    assert similar[0][1] >= index.threshold
+    assert index.find_similar(quiz_row("ブランチを削除する方法を説明してください")) == []
+
+
+def test_sync_reads_all_pages_and_persists(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    rows = [with_id(i, f"{QUESTION} その{i}") for i in range(1, 6)]
+    index = NearDuplicateIndex(path)
+
+    assert index.sync(paged(rows)) == 5
+    assert index.synced_id == 5
+    assert index.sync(paged(rows)) == 0
+
+    reopened = NearDuplicateIndex(path)
+    assert len(reopened) == 5
+    assert reopened.synced_id == 5
+    assert reopened.find_duplicate(rows[2]) == 3
+    assert reopened.find_similar(rows[2])[0] == (3, 1.0)
+
+
+def test_changed_params_rebuild_the_index(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    NearDuplicateIndex(path).add_many([with_id(1, QUESTION)])
+    with sqlite3.connect(path) as conn:
+        conn.execute("update meta set value = 'old' where key = 'params'")
+
+    assert len(NearDuplicateIndex(path)) == 0
+
+
+def test_find_duplicate(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite3"))
+    index.add_many([with_id(1, QUESTION)])
+
+    # 全角・空白の違いだけなら同じ内容（content_hash がなければ計算する）
+    assert index.find_duplicate(quiz_row(" " + QUESTION, choice_1="ｇｉｔ add")) == 1
+    assert index.find_duplicate(quiz_row(REPHRASED)) is None
+
+
+def test_add_many_does_not_move_the_sync_position(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite3"))
+    # このプロセスが id 3 を登録した時点では、他のプロセスの id 2 はまだ見えていない
+    index.sync(paged([with_id(1, QUESTION)]))
+    index.add_many([with_id(3, "リモートの変更を取り込むコマンドは？")])
+    assert index.synced_id == 1
+
+    other = with_id(2, "直前のコミットを取り消すコマンドは？")
+    all_rows = [with_id(1, QUESTION), other, with_id(3, "リモートの変更を取り込むコマンドは？")]
+    assert index.sync(paged(all_rows)) == 1
+    assert index.find_duplicate(other) == 2
+    assert index.synced_id == 3
+
+
+def test_add_many_records_hash_learned_later(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    index = NearDuplicateIndex(path)
+    row = with_id(1, QUESTION)
+    index.add_many([{k: v for k, v in row.items() if k != "content_hash"}])
+    assert index.find_duplicate(quiz_row(QUESTION)) is None
+
+    # 後から content_hash つきで読んだ（埋め戻し後の sync など）
+    assert index.add_many([row]) == 0
+    assert index.find_duplicate(quiz_row(QUESTION)) == 1
+    assert NearDuplicateIndex(path).find_duplicate(quiz_row(QUESTION)) == 1
@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from note_spool import FAILED, PENDING, SYNCED, NoteSpool
+
+
+class Sender:
+    """送信したバッチの本文を記録し、reject に含まれるノートがあれば失敗する"""
+
+    def __init__(self, reject=()):
+        self.batches = []
+        self.reject = set(reject)
+
+    def __call__(self, notes):
+        self.batches.append([note["note_text"] for note in notes])
+        if any(note["note_text"] in self.reject for note in notes):
+            raise RuntimeError("rejected")
+
+
+def make_spool(tmp_path, sender, **kwargs) -> NoteSpool:
+    return NoteSpool(str(tmp_path / "spool.sqlite3"), sender, **kwargs)
+
+
+def test_flush_sends_pending_notes_in_batches(tmp_path):
+    sender = Sender()
+    spool = make_spool(tmp_path, sender, batch_size=2)
+    ids = [spool.enqueue(text) for text in ("a", "b", "c")]
+    assert spool.pending_count() == 3
+
+    assert spool.flush_once() == 2
+    assert spool.flush_once() == 1
+    assert spool.flush_once() == 0
+    assert sender.batches == [["a", "b"], ["c"]]
+    assert {s["status"] for s in spool.statuses(ids).values()} == {SYNCED}
+    assert spool.pending_count() == 0
+
+
+def test_failed_send_keeps_notes_pending(tmp_path):
+    def failing(notes):
+        raise RuntimeError("timeout")
+
+    spool = make_spool(tmp_path, failing)
+    local_id = spool.enqueue("a")
+    with pytest.raises(RuntimeError):
+        spool.flush_once()
+
+    status = spool.statuses([local_id])[local_id]
+    assert status["status"] == PENDING
+    assert status["attempts"] == 1
+    assert status["last_error"] == "timeout"
+
+
+def test_unsent_notes_survive_restart(tmp_path):
+    def failing(notes):
+        raise RuntimeError("offline")
+
+    make_spool(tmp_path, failing).enqueue("a")
+    sender = Sender()
+    assert make_spool(tmp_path, sender).flush_once() == 1
+    assert sender.batches == [["a"]]
+
+
+def test_worker_sends_in_background(tmp_path):
+    sender = Sender()
+    spool = make_spool(tmp_path, sender)
+    spool.start()
+    try:
+        local_id = spool.enqueue("a")
+        deadline = time.monotonic() + 5
+        while spool.statuses([local_id])[local_id]["status"] != SYNCED:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        spool.stop()
+    assert sender.batches == [["a"]]
+
+
+def test_notes_carry_client_ids(tmp_path):
+    received = []
+    spool = make_spool(tmp_path, received.extend)
+    for text in ("a", "b"):
+        spool.enqueue(text)
+
+    assert spool.flush_once() == 2
+    assert [note["note_text"] for note in received] == ["a", "b"]
+    assert len({note["client_id"] for note in received}) == 2
+
+
+def test_resend_keeps_client_id(tmp_path):
+    received = []
+
+    def flaky(notes):
+        received.append([note["client_id"] for note in notes])
+        if len(received) == 1:
+            raise RuntimeError("timeout")
+
+    spool = make_spool(tmp_path, flaky)
+    spool.enqueue("a")
+    with pytest.raises(RuntimeError):
+        spool.flush_once()
+    assert spool.flush_once() == 1
+    assert received[0] == received[1]
+
+
+def test_poison_note_does_not_block_later_notes(tmp_path):
+    sender = Sender(reject={"bad"})
+    spool = make_spool(tmp_path, sender, max_attempts=3)
+    bad = spool.enqueue("bad")
+    good = [spool.enqueue(text) for text in ("a", "b")]
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            spool.flush_once()
+    # バッチで1回、単独で2回失敗して諦める
+    assert sender.batches == [["bad", "a", "b"], ["bad"], ["bad"]]
+    status = spool.statuses([bad])[bad]
+    assert status["status"] == FAILED
+    assert status["attempts"] == 3
+    assert status["last_error"] == "rejected"
+
+    # 同じバッチで失敗したノートも1件ずつ送り直す
+    assert spool.flush_once() == 1
+    assert spool.flush_once() == 1
+    assert sender.batches[3:] == [["a"], ["b"]]
+    assert {s["status"] for s in spool.statuses(good).values()} == {SYNCED}
+    assert spool.pending_count() == 0
+
+
+def test_retry_failed(tmp_path):
+    sender = Sender(reject={"bad"})
+    spool = make_spool(tmp_path, sender, max_attempts=1)
+    bad = spool.enqueue("bad")
+    with pytest.raises(RuntimeError):
+        spool.flush_once()
+    assert spool.statuses([bad])[bad]["status"] == FAILED
+
+    sender.reject.clear()
+    assert spool.retry_failed([bad]) == 1
+    status = spool.statuses([bad])[bad]
+    assert (status["status"], status["attempts"]) == (PENDING, 0)
+    assert spool.flush_once() == 1
+    assert spool.statuses([bad])[bad]["status"] == SYNCED
+    # failed でないノートは戻さない
+    assert spool.retry_failed([bad]) == 0
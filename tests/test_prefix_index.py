@@ -0,0 +1,46 @@
+import numpy as np
+
+from prefix_index import PrefixIndex, name_keys
+
+TERMS = [
+    {"name": "git commit"},
+    {"name": "git checkout"},
+    {"name": "cherry-pick"},
+    {"name": "コミット"},
+    {"name": "プルリクエスト (Pull Request)"},
+]
+
+
+def test_name_keys_include_words_and_reading():
+    # カタカナはひらがなにそろえる
+    assert name_keys({"name": "コミット"}) == ["こみっと", "komitto"]
+    assert name_keys({"name": "Git Commit"}) == ["git commit", "git", "commit"]
+
+
+def test_search_matches_any_word_prefix():
+    index = PrefixIndex(TERMS)
+    assert index.search("git c").tolist() == [0, 1]
+    assert index.search("ch").tolist() == [1, 2]
+    assert index.search("pull").tolist() == [4]
+    assert index.search("   ").tolist() == []
+
+
+def test_kana_query_matches_reading():
+    index = PrefixIndex(TERMS)
+    assert index.search("こみ").tolist() == [3]
+    assert index.search("kom").tolist() == [3]
+
+
+def test_narrowing_query_reuses_range():
+    index = PrefixIndex(TERMS)
+    lo, hi = index.key_range("c")
+    assert (lo, hi) == index.key_range("c")
+    narrowed = index.key_range("ch")
+    assert lo <= narrowed[0] <= narrowed[1] <= hi
+    assert index.search("che").tolist() == [1, 2]
+
+
+def test_allowed_mask():
+    index = PrefixIndex(TERMS)
+    allowed = np.array([False, True, True, True, True])
+    assert index.search("git", allowed).tolist() == [1]
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from profiling import (
+    discard_trace,
+    finish_trace,
+    flame_html,
+    section,
+    span,
+    start_trace,
+    to_chrome_trace,
+    traced,
+)
+
+
+@traced("work")
+def work(seconds: float = 0.0) -> str:
+    time.sleep(seconds)
+    return "done"
+
+
+def names(trace):
+    return [(s.name, s.depth) for s in trace.spans]
+
+
+def test_sections_spans_and_traced_functions():
+    start_trace("辞書モード")
+    section("サイドバー")
+    with span("フィルタ"):
+        assert work() == "done"
+    section("本文")
+    work(0.01)
+    trace = finish_trace()
+
+    assert trace.label == "辞書モード"
+    assert names(trace) == [
+        ("サイドバー", 0), ("フィルタ", 1), ("work", 2), ("本文", 0), ("work", 1),
+    ]
+    assert all(s.end_ms is not None for s in trace.spans)
+    assert trace.spans[-1].duration_ms >= 10
+    assert trace.duration_ms >= trace.spans[-2].end_ms
+
+
+def test_nothing_is_recorded_outside_a_trace():
+    assert finish_trace() is None
+    section("ignored")
+    with span("ignored"):
+        assert work() == "done"
+    assert finish_trace() is None
+
+
+def test_exceptions_close_their_spans():
+    start_trace("t")
+
+    @traced()
+    def failing():
+        raise ValueError
+
+    try:
+        failing()
+    except ValueError:
+        pass
+    trace = finish_trace()
+    assert trace.spans[0].name.endswith("failing")
+    assert trace.spans[0].end_ms is not None
+
+
+def test_other_threads_do_not_write_into_the_trace():
+    start_trace("t")
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    assert finish_trace().spans == []
+
+
+def test_exports():
+    start_trace("<run>")
+    section("a & b")
+    trace = finish_trace()
+
+    events = to_chrome_trace([trace])["traceEvents"]
+    assert [e["name"] for e in events] == ["<run>", "a & b"]
+    assert all(e["ph"] == "X" for e in events)
+    assert trace.to_dict()["spans"][0]["name"] == "a & b"
+
+    html = flame_html(trace)
+    assert "&lt;run&gt;" in html and "a &amp; b" in html
+
+
+def test_discard_drops_an_interrupted_trace():
+    # st.rerun() などで finish_trace() まで届かなかった実行
+    interrupted = start_trace("中断")
+    section("本文")
+    discard_trace()
+
+    work()
+    assert finish_trace() is None
+    assert names(interrupted) == [("本文", 0)]
@@ -0,0 +1,90 @@
+from conftest import quiz_row
+from quiz import QuizQuestion, QuizSession, quiz_content_hash, validate_quiz_question
+
+
+def db_row(question_id: int, correct_choice=2, **overrides) -> dict:
+    row = {
+        "id": question_id,
+        "question_text": f"問題{question_id}",
+        "choice_1": "git add",
+        "choice_2": "git commit",
+        "choice_3": "git push",
+        "choice_4": "git pull",
+        "correct_choice": correct_choice,
+        "explanation": None,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_from_row():
+    question = QuizQuestion.from_row(db_row(1))
+    assert question.choices == ("git add", "git commit", "git push", "git pull")
+    assert question.correct_text == "git commit"
+    assert question.explanation == ""
+
+
+def test_from_row_clamps_correct_choice():
+    assert QuizQuestion.from_row(db_row(1, correct_choice=None)).correct_index == 0
+    assert QuizQuestion.from_row(db_row(1, correct_choice=9)).correct_index == 3
+
+
+def test_session_loads_once_and_grades():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [db_row(1), db_row(2, correct_choice=4)]
+
+    session = QuizSession.start(loader)
+    assert len(calls) == 1
+    first, second = session.questions
+    answers = {session.answer_key(first): "git commit", session.answer_key(second): "git add"}
+
+    results = session.grade(answers)
+    assert [r.is_correct for r in results] == [True, False]
+    assert QuizSession.score(results) == 1
+    # 未回答は不正解
+    assert QuizSession.score(session.grade({})) == 0
+
+
+def test_answer_keys_differ_between_sessions():
+    first = QuizSession.start(lambda: [db_row(1)])
+    second = QuizSession.start(lambda: [db_row(1)])
+    assert first.answer_key(first.questions[0]) != second.answer_key(second.questions[0])
+
+
+def test_validate_quiz_question():
+    cleaned, error = validate_quiz_question(quiz_row(" 問題 ", correct_choice="3", category=""))
+    assert error is None
+    assert cleaned["question_text"] == "問題"
+    assert cleaned["correct_choice"] == 3
+    assert cleaned["category"] is None
+
+
+def test_validate_quiz_question_errors():
+    assert validate_quiz_question(quiz_row(""))[1] == "問題文を入力してください。"
+    assert validate_quiz_question(quiz_row("問題", choice_2=" "))[1]
+    assert validate_quiz_question(quiz_row("問題", choice_4=None))[1]
+    for correct_choice in ("5", "0", "a", None):
+        cleaned, error = validate_quiz_question(quiz_row("問題", correct_choice=correct_choice))
+        assert cleaned is None and error
+
+
+def test_content_hash_ignores_width_case_and_spacing():
+    a = quiz_row("Git で 変更を記録する コマンドは？")
+    b = quiz_row(" ｇｉｔ　で 変更を記録する  コマンドは？ ", choice_1="GIT ADD")
+    assert quiz_content_hash(a) == quiz_content_hash(b)
+
+
+def test_content_hash_ignores_answer_and_explanation():
+    a = quiz_row("変更を記録するコマンドは？")
+    b = quiz_row("変更を記録するコマンドは？", correct_choice=2, explanation="説明")
+    assert quiz_content_hash(a) == quiz_content_hash(b)
+
+
+def test_content_hash_depends_on_choices_and_their_order():
+    a = quiz_row("変更を記録するコマンドは？")
+    b = quiz_row("変更を記録するコマンドは？", choice_4="git fetch")
+    c = quiz_row("変更を記録するコマンドは？", choice_1="git commit", choice_2="git add")
+    assert len({quiz_content_hash(a), quiz_content_hash(b), quiz_content_hash(c)}) == 3
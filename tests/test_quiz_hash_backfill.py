@@ -0,0 +1,63 @@
+import db
+import quiz_hash_backfill
+from conftest import quiz_row
+from quiz_hash_backfill import backfill_content_hashes
+
+QUESTION = "ファイルをステージに追加するコマンドはどれですか？"
+
+
+def null_hash_ids(backend) -> list:
+    rows = (
+        backend.table("git_quiz_questions")
+        .select("id").is_("content_hash", "null").order("id").execute().data
+    )
+    return [r["id"] for r in rows]
+
+
+def test_backfill_content_hashes(backend):
+    backend.table("git_quiz_questions").insert(
+        [quiz_row(QUESTION), quiz_row(QUESTION), quiz_row("問題2")]
+    ).execute()
+    assert null_hash_ids(backend) == [1, 2, 3]
+
+    dry = backfill_content_hashes(page_size=2, dry_run=True)
+    assert (dry.updated, dry.duplicates, dry.rows_read) == (2, [(2, 1)], 3)
+    assert null_hash_ids(backend) == [1, 2, 3]
+
+    report = backfill_content_hashes(page_size=2)
+    assert (report.updated, report.duplicates) == (2, [(2, 1)])
+    # 同じ内容の2行目は NULL のまま残す
+    assert null_hash_ids(backend) == [2]
+    # 埋め戻した行は登録時の重複判定に使われる
+    assert db.insert_quiz_question_to_supabase(**quiz_row(QUESTION)).status == db.DUPLICATE
+
+
+def test_backfill_skips_rows_matching_an_existing_hash(backend):
+    assert db.insert_quiz_question_to_supabase(**quiz_row(QUESTION)).status == db.INSERTED
+    backend.table("git_quiz_questions").insert([quiz_row(QUESTION), quiz_row("問題2")]).execute()
+
+    report = backfill_content_hashes()
+    assert (report.updated, report.duplicates) == (1, [(2, 1)])
+    assert null_hash_ids(backend) == [2]
+
+    # 2回目は残った行を読むだけで何も書かない
+    again = backfill_content_hashes()
+    assert (again.updated, again.duplicates) == (0, [(2, 1)])
+
+
+def test_backfill_does_not_overwrite_rows_filled_meanwhile(backend, monkeypatch):
+    backend.table("git_quiz_questions").insert([quiz_row(QUESTION), quiz_row("問題2")]).execute()
+    lookup = quiz_hash_backfill._existing_hash_ids
+    other = "f" * 64
+
+    def fill_first_row_then_lookup(hashes):
+        # 読んだあと、書き込む前に別の実行が id 1 を埋めた
+        backend.table("git_quiz_questions").update({"content_hash": other}).eq("id", 1).execute()
+        return lookup(hashes)
+
+    monkeypatch.setattr(quiz_hash_backfill, "_existing_hash_ids", fill_first_row_then_lookup)
+    report = backfill_content_hashes()
+    assert report.updated == 1
+    rows = backend.table("git_quiz_questions").select("id,content_hash").order("id").execute().data
+    assert rows[0]["content_hash"] == other
+    assert rows[1]["content_hash"] is not None
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+
+from conftest import quiz_row
+from quiz_import import detect_format, import_quiz_questions
+
+
+class Inserter:
+    """送信したバッチを記録する（fail_on 回目の呼び出しで失敗する）"""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, rows):
+        if len(self.batches) + 1 == self.fail_on:
+            self.fail_on = None
+            raise RuntimeError("connection reset")
+        self.batches.append([row["question_text"] for row in rows])
+        return len(rows)
+
+
+def jsonl(*rows) -> io.StringIO:
+    return io.StringIO("\n".join(json.dumps(r, ensure_ascii=False) for r in rows) + "\n")
+
+
+def test_detect_format():
+    assert detect_format("q.CSV") == "csv"
+    assert detect_format("q.jsonl") == "jsonl"
+    assert detect_format("q.ndjson") == "jsonl"
+
+
+def test_csv_rows_are_sent_in_batches():
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=list(quiz_row("").keys()))
+    writer.writeheader()
+    for no in range(1, 6):
+        writer.writerow(quiz_row(f"問題{no}"))
+    stream.seek(0)
+
+    inserter = Inserter()
+    progress = []
+    report = import_quiz_questions(
+        stream, "csv", batch_size=2, inserter=inserter,
+        on_progress=lambda r: progress.append(r.last_committed_row),
+    )
+    assert inserter.batches == [["問題1", "問題2"], ["問題3", "問題4"], ["問題5"]]
+    assert (report.inserted, report.rows_read, report.last_committed_row) == (5, 5, 5)
+    assert progress == [2, 4, 5]
+    assert report.aborted is None
+
+
+def test_invalid_rows_are_reported_and_skipped():
+    stream = io.StringIO(
+        json.dumps(quiz_row("問題1"), ensure_ascii=False) + "\n"
+        "{broken\n"
+        "\n"
+        "[1, 2]\n"
+        + json.dumps(quiz_row("問題4", correct_choice=7), ensure_ascii=False) + "\n"
+    )
+    inserter = Inserter()
+    report = import_quiz_questions(stream, "jsonl", inserter=inserter)
+
+    assert inserter.batches == [["問題1"]]
+    # 空行は数えない
+    assert [row_no for row_no, _ in report.errors] == [2, 3, 4]
+    assert report.errors[0][1].startswith("JSON として読めません")
+    assert report.last_committed_row == 4
+
+
+def test_failed_batch_aborts_and_resume_continues():
+    rows = [quiz_row(f"問題{no}") for no in range(1, 6)]
+    inserter = Inserter(fail_on=2)
+    report = import_quiz_questions(jsonl(*rows), "jsonl", batch_size=2, inserter=inserter)
+
+    assert report.aborted == "connection reset"
+    assert report.inserted == 2
+    # 失敗したバッチの行は登録済みにしない
+    assert report.last_committed_row == 2
+
+    resumed = import_quiz_questions(
+        jsonl(*rows), "jsonl", batch_size=2, start_after_row=report.last_committed_row,
+        inserter=inserter,
+    )
+    assert resumed.aborted is None
+    assert inserter.batches == [["問題1", "問題2"], ["問題3", "問題4"], ["問題5"]]
+    assert (resumed.rows_read, resumed.last_committed_row) == (3, 5)
+
+
+def test_rows_the_inserter_skips_are_counted_as_duplicates():
+    registered = {"問題1"}
+
+    def inserter(rows):
+        new = [r for r in rows if r["question_text"] not in registered]
+        registered.update(r["question_text"] for r in new)
+        return len(new)
+
+    rows = [quiz_row("問題1"), quiz_row("問題2"), quiz_row("問題2"), quiz_row("問題3")]
+    report = import_quiz_questions(jsonl(*rows), "jsonl", batch_size=2, inserter=inserter)
+    assert (report.inserted, report.duplicates) == (2, 2)
+
+
+def test_rows_similar_to_registered_questions_are_rejected():
+    def similar_check(row):
+        return [(42, 0.8)] if "似ている" in row["question_text"] else []
+
+    rows = [quiz_row("問題1"), quiz_row("似ている問題")]
+    inserter = Inserter()
+    report = import_quiz_questions(jsonl(*rows), "jsonl", inserter=inserter, similar_check=similar_check)
+
+    assert inserter.batches == [["問題1"]]
+    assert report.errors == [(2, "似ている問題が登録済みです（id 42、類似度 80%）")]
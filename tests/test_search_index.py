@@ -0,0 +1,138 @@
+import numpy as np
+
+import search_index
+from search_index import FUZZY_WEIGHT, SEARCH_FIELDS, NgramIndex
+
+TERMS = [
+    {
+        "name": "コミット (Commit)",
+        "short_description": "変更を記録すること",
+        "full_description": "ファイルの変更をリポジトリに記録する操作です。",
+        "examples": ["git commit -m \"メッセージ\""],
+    },
+    {
+        "name": "ブランチ (Branch)",
+        "short_description": "開発の流れを分けるもの",
+        "full_description": "コミットの履歴を枝分かれさせます。",
+        "examples": ["git branch feature"],
+    },
+    {
+        "name": "リベース (Rebase)",
+        "short_description": "コミットを付け替える",
+        "full_description": "ブランチの根元を移動します。",
+        "examples": [],
+    },
+    {
+        "name": "Commit メッセージ",
+        "short_description": "コミットの説明文",
+        "full_description": "",
+        "examples": None,
+    },
+]
+
+
+def names(hits):
+    return [TERMS[doc_id]["name"] for doc_id, _ in hits]
+
+
+def test_name_prefix_first_then_name_then_description():
+    index = NgramIndex(TERMS)
+    hits = index.search_scored("コミット")
+    # 名前の前方一致 > 一言説明（登録順） > 詳細説明
+    assert names(hits) == ["コミット (Commit)", "リベース (Rebase)", "Commit メッセージ", "ブランチ (Branch)"]
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_case_insensitive_and_examples_field():
+    index = NgramIndex(TERMS)
+    assert names(index.search_scored("COMMIT")) == ["Commit メッセージ", "コミット (Commit)"]
+    assert names(index.search_scored("feature")) == ["ブランチ (Branch)"]
+
+
+def test_limit_and_allowed():
+    index = NgramIndex(TERMS)
+    assert len(index.search_scored("コミット", limit=2)) == 2
+    allowed = np.array([False, True, True, True])
+    assert names(index.search_scored("コミット", allowed=allowed))[0] == "リベース (Rebase)"
+
+
+def test_no_match_and_empty_query():
+    index = NgramIndex(TERMS)
+    assert index.search_scored("存在しない語") == []
+    assert index.search_scored("   ") == []
+    assert index.search("ブランチ", limit=1) == [TERMS[1]]
+
+
+def test_matches_brute_force_substring_search():
+    index = NgramIndex(TERMS)
+    fields = ("name", "short_description", "full_description", "examples")
+
+    def text(term):
+        values = [term.get(f) or "" for f in fields]
+        return "\n".join("\n".join(v) if isinstance(v, list) else v for v in values).lower()
+
+    for query in ("コ", "コミ", "の", "ブランチの", "git", "rebase", "記録"):
+        expected = {i for i, term in enumerate(TERMS) if query.lower() in text(term)}
+        # 打ち間違いとしての一致（FUZZY_WEIGHT 以下）は除いて比べる
+        exact = {doc_id for doc_id, score in index.search_scored(query) if score > FUZZY_WEIGHT}
+        assert exact == expected, query
+
+
+# ==============================
+# 読み・表記ゆれ・打ち間違い
+# ==============================
+READING_TERMS = [
+    {"name": "コミット (Commit)", "short_description": "変更を記録する"},
+    {"name": "ブランチ (Branch)", "short_description": "作業の流れを分ける"},
+    {"name": "マージ (Merge)", "short_description": "ブランチを統合する"},
+    {"name": "タグ (Tag)", "short_description": "コミットに名前を付ける"},
+]
+
+
+def reading_names(query, **kwargs):
+    index = NgramIndex(READING_TERMS)
+    return [READING_TERMS[d]["name"] for d, _ in index.search_scored(query, **kwargs)]
+
+
+def test_kana_width_and_romaji_reach_the_same_term():
+    for query in ("コミット", "こみっと", "komitto", "ｃｏｍｍｉｔ", "ｺﾐｯﾄ"):
+        assert reading_names(query)[0] == "コミット (Commit)", query
+
+
+def test_reading_match_ranks_below_name_match():
+    index = NgramIndex(READING_TERMS)
+    by_name = dict(index.search_scored("コミット"))
+    by_reading = dict(index.search_scored("komitto"))
+    assert by_reading[0] < by_name[0]
+
+
+def test_typos_are_found_below_exact_matches():
+    index = NgramIndex(READING_TERMS)
+    hits = index.search_scored("brnach")
+    assert [READING_TERMS[d]["name"] for d, _ in hits] == ["ブランチ (Branch)"]
+    # 打ち間違いのスコアはどのフィールドの完全一致よりも低い
+    assert hits[0][1] < min(weight for _, weight in SEARCH_FIELDS)
+    assert reading_names("komito")[0] == "コミット (Commit)"
+
+
+def test_exact_matches_skip_typo_search():
+    # 完全一致で limit に届けば打ち間違いの候補は足さない
+    assert reading_names("ブランチ", limit=1) == ["ブランチ (Branch)"]
+
+
+def test_three_character_queries_allow_a_typo():
+    assert reading_names("tga") == []
+    assert reading_names("tax") == ["タグ (Tag)"]
+
+
+def test_typo_search_stops_at_the_cell_budget(monkeypatch):
+    terms = [{"name": f"branch{i:03d}", "short_description": ""} for i in range(50)]
+    index = NgramIndex(terms)
+    assert len(index.search_scored("brnach")) == 50
+
+    # 1件あたり 6 × 9 マス。打ち切り位置は計算量で決まり、何度実行しても同じ
+    monkeypatch.setattr(search_index, "FUZZY_MAX_CELLS", 6 * 9 * 10)
+    first = index.search_scored("brnach")
+    assert 0 < len(first) < 50
+    assert all(index.search_scored("brnach") == first for _ in range(5))
@@ -0,0 +1,66 @@
+from conftest import term
+from term_filter import ALL_CATEGORIES, TermFilter
+
+CATEGORIES = ["基本概念", "基本操作", "応用操作"]
+ADVANCED = ["応用操作"]
+TERMS = [
+    term("repository", "リポジトリ", "基本概念"),
+    term("commit", "コミット"),
+    term("push", "プッシュ", short_description="コミットを送る"),
+    term("rebase", "リベース", "応用操作", short_description="コミットを付け替える"),
+    term("cherry-pick", "チェリーピック", "応用操作"),
+]
+
+
+def ids(term_filter, positions):
+    return [t["id"] for t in term_filter.terms_at(positions)]
+
+
+def test_category_and_advanced_masks():
+    f = TermFilter(TERMS, CATEGORIES, ADVANCED)
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "", 100)) == [t["id"] for t in TERMS]
+    assert ids(f, f.filter(ALL_CATEGORIES, False, "", 100)) == ["repository", "commit", "push"]
+    assert ids(f, f.filter("応用操作", True, "", 100)) == ["rebase", "cherry-pick"]
+    # 応用用語を含めないなら応用カテゴリは空
+    assert f.filter("応用操作", False, "", 100) == ()
+    assert f.filter("存在しないカテゴリ", True, "", 100) == ()
+
+
+def test_max_items():
+    f = TermFilter(TERMS, CATEGORIES, ADVANCED)
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "", 2)) == ["repository", "commit"]
+
+
+def test_query_is_ranked_and_respects_masks():
+    f = TermFilter(TERMS, CATEGORIES, ADVANCED)
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "コミット", 100)) == ["commit", "push", "rebase"]
+    assert ids(f, f.filter(ALL_CATEGORIES, False, "コミット", 100)) == ["commit", "push"]
+    assert ids(f, f.filter("応用操作", True, "コミット", 100)) == ["rebase"]
+
+
+def test_results_are_cached():
+    f = TermFilter(TERMS, CATEGORIES, ADVANCED)
+    f.filter(ALL_CATEGORIES, True, "コミット", 100)
+    f.filter(ALL_CATEGORIES, True, "コミット", 100)
+    assert f.filter.cache_info().hits == 1
+
+
+def test_table():
+    f = TermFilter(TERMS, CATEGORIES, ADVANCED)
+    table = f.table(f.filter("応用操作", True, "", 100))
+    assert list(table.columns) == ["ID", "用語", "カテゴリ", "一言説明"]
+    assert table["ID"].tolist() == ["rebase", "cherry-pick"]
+    assert table.index.tolist() == [0, 1]
+
+
+def test_name_prefix_hits_come_first():
+    terms = [
+        term("stash", "スタッシュ", short_description="コミット前の変更を退避する"),
+        term("amend", "コミットの修正"),
+        term("commit", "コミット"),
+    ]
+    f = TermFilter(terms, CATEGORIES, ADVANCED)
+    # 前方一致（登録順）→ 残りを n-gram のスコア順
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "コミ", 100)) == ["amend", "commit", "stash"]
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "komi", 100)) == ["amend", "commit"]
+    assert ids(f, f.filter(ALL_CATEGORIES, True, "コミ", 1)) == ["amend"]
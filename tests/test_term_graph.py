@@ -0,0 +1,54 @@
+import content_pack
+from conftest import term
+from term_graph import TermGraph
+from term_store import TermStore
+
+
+def make_graph(edges: dict) -> TermGraph:
+    return TermGraph(TermStore([term(i, i.upper(), related_terms=r) for i, r in edges.items()]))
+
+
+def ids(records):
+    return None if records is None else [r.id for r in records]
+
+
+def test_related_and_referenced_by():
+    graph = make_graph({"a": ["b", "c", "b", "a"], "b": ["c"], "c": []})
+    # 重複と自分自身への参照は除く
+    assert ids(graph.related("a")) == ["b", "c"]
+    assert ids(graph.referenced_by("c")) == ["a", "b"]
+    assert graph.related("missing") == []
+    assert graph.referenced_by("missing") == []
+
+
+def test_dangling_references_are_collected():
+    graph = make_graph({"a": ["b", "gone"], "b": ["also-gone"]})
+    assert graph.dangling == {"a": ["gone"], "b": ["also-gone"]}
+    assert ids(graph.related("a")) == ["b"]
+
+
+def test_learning_path_ignores_direction():
+    # a -> b -> c、d -> c（d から a へは c, b を逆向きにたどる）
+    graph = make_graph({"a": ["b"], "b": ["c"], "c": [], "d": ["c"]})
+    assert ids(graph.learning_path("a", "c")) == ["a", "b", "c"]
+    assert ids(graph.learning_path("d", "a")) == ["d", "c", "b", "a"]
+    assert ids(graph.learning_path("a", "a")) == ["a"]
+
+
+def test_learning_path_is_shortest():
+    graph = make_graph({
+        "a": ["b", "x"], "b": ["c"], "c": ["d"], "d": ["e"], "x": ["e"], "e": [],
+    })
+    assert ids(graph.learning_path("a", "e")) == ["a", "x", "e"]
+
+
+def test_learning_path_unreachable():
+    graph = make_graph({"a": ["b"], "b": [], "c": []})
+    assert graph.learning_path("a", "c") is None
+    assert graph.learning_path("a", "missing") is None
+
+
+def test_bundled_pack_has_no_dangling_references(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_pack, "PACK_CACHE_DIR", str(tmp_path))
+    pack = content_pack.load_pack(content_pack.DEFAULT_PACK)
+    assert TermGraph(TermStore(pack.terms)).dangling == {}
@@ -0,0 +1,35 @@
+from conftest import term
+from term_list import build_list_items, list_key
+
+CATEGORIES = ["基本概念", "基本操作", "応用操作"]
+TERMS = [
+    term("push", "プッシュ"),
+    term("repository", "リポジトリ", "基本概念"),
+    term("add", "アド"),
+    term("other", "その他", "未分類"),
+]
+
+
+def test_by_category_groups_under_headers_in_category_order():
+    items, headers = build_list_items(TERMS, "カテゴリ別", CATEGORIES)
+
+    assert [item.get("header") or item["id"] for item in items] == [
+        "基本概念", "repository", "基本操作", "push", "add", "未分類", "other",
+    ]
+    # 用語のないカテゴリ（応用操作）は見出しも出さない
+    assert headers == [(0, "基本概念"), (2, "基本操作"), (5, "未分類")]
+    assert all(items[pos] == {"header": name} for pos, name in headers)
+
+
+def test_by_name_has_no_headers():
+    items, headers = build_list_items(TERMS, "名前順", CATEGORIES)
+    assert headers == []
+    # 名前の文字コード順（ひらがなはカタカナより前）
+    assert [item["id"] for item in items] == ["other", "add", "push", "repository"]
+    assert items[1]["label"] == "アド：アドの説明"
+
+
+def test_list_key_changes_with_conditions():
+    assert list_key("すべて", True, "") == list_key("すべて", True, "")
+    assert list_key("すべて", True, "") != list_key("すべて", False, "")
+    assert list_key("a").startswith("term_list_")
@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import term
+from term_filter import ALL_CATEGORIES, TermFilter
+from term_store import BLOCK_SIZE, TermStore
+
+
+def make_terms(count: int) -> list:
+    return [
+        term(
+            f"t{i}",
+            f"用語{i}",
+            full_description=f"用語{i}の詳しい説明",
+            examples=[f"例{i}-1", f"例{i}-2"],
+            related_terms=[f"t{i + 1}"],
+        )
+        for i in range(count)
+    ]
+
+
+def test_lookup_by_position_and_id():
+    terms = make_terms(BLOCK_SIZE * 2 + 5)
+    store = TermStore(terms)
+
+    assert len(store) == len(terms)
+    assert [r.id for r in store] == [t["id"] for t in terms]
+    record = store.get("t70")
+    assert record is store[70]
+    assert store.position("t70") == 70
+    assert "t70" in store
+    assert store.get("missing") is None
+    assert store.position("missing") is None
+
+
+def test_records_read_like_dicts():
+    terms = make_terms(BLOCK_SIZE + 1)
+    store = TermStore(terms)
+    record = store[BLOCK_SIZE]
+
+    assert record["name"] == terms[BLOCK_SIZE]["name"]
+    assert record.related_terms == (f"t{BLOCK_SIZE + 1}",)
+    assert record.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        record["missing"]
+
+
+def test_long_fields_round_trip_across_blocks():
+    terms = make_terms(BLOCK_SIZE * 3)
+    store = TermStore(terms)
+    for pos in (0, BLOCK_SIZE - 1, BLOCK_SIZE, len(terms) - 1):
+        assert store[pos]["full_description"] == terms[pos]["full_description"]
+        assert store[pos]["examples"] == terms[pos]["examples"]
+
+
+def test_examples_are_copies():
+    store = TermStore(make_terms(1))
+    store[0].examples.append("changed")
+    assert store[0].examples == ["例0-1", "例0-2"]
+
+
+def test_categories_are_interned():
+    store = TermStore(make_terms(2))
+    assert store[0].category is store[1].category
+
+
+def test_duplicate_id_is_rejected():
+    with pytest.raises(ValueError):
+        TermStore([term("a", "A"), term("a", "B")])
+
+
+def test_term_filter_accepts_a_store():
+    store = TermStore(make_terms(3))
+    f = TermFilter(store, ["基本操作"], [])
+    ids = [t.id for t in f.terms_at(f.filter(ALL_CATEGORIES, True, "用語1", 10))]
+    # 1文字違いの用語は打ち間違いの候補として後ろに並ぶ
+    assert ids == ["t1", "t0", "t2"]